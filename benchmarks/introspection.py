@@ -0,0 +1,124 @@
+"""
+Measures schema introspection time on generated graphs of interlinked models.
+
+Each generated model has a few foreign keys to random other models, so with
+reverse relations every model is reachable from any other one. Some models
+refer to themselves. Results of
+DjangoQLSchema.introspect() are compared with the former recursive
+implementation, which is timed too.
+
+Usage: python benchmarks/introspection.py
+"""
+from __future__ import print_function
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure(
+    INSTALLED_APPS=['django.contrib.contenttypes', 'djangoql'],
+    DATABASES={},
+    DJANGOQL_WARM_UP=False,
+)
+django.setup()
+
+from django.db import models  # noqa: E402
+
+from djangoql.schema import (  # noqa: E402
+    DjangoQLField, DjangoQLSchema, RelationField,
+)
+
+
+SIZES = (100, 300, 600)
+FOREIGN_KEYS = 3
+
+
+def make_models(count):
+    # Models must belong to an installed app, otherwise Django doesn't
+    # include them into reverse relations
+    rnd = random.Random(count)
+    result = []
+    for i in range(count):
+        attrs = {
+            '__module__': __name__,
+            'Meta': type('Meta', (), {'app_label': 'djangoql'}),
+            'name': models.CharField(max_length=10),
+        }
+        for j in range(min(FOREIGN_KEYS, i)):
+            attrs['fk%s' % j] = models.ForeignKey(
+                result[rnd.randrange(i)],
+                on_delete=models.CASCADE,
+                related_name='+' if j and rnd.random() < 0.3 else None,
+            )
+        if i % 10 == 0:
+            attrs['parent'] = models.ForeignKey(
+                'self',
+                null=True,
+                on_delete=models.CASCADE,
+            )
+        name = str('Graph%sModel%s' % (count, i))
+        result.append(type(name, (models.Model,), attrs))
+    return result
+
+
+class LegacySchema(DjangoQLSchema):
+    cache_introspection = False
+
+    def introspect(self, model, exclude=()):
+        fields = {}
+        result = {self.model_label(model): fields}
+        for field in self.get_fields(model):
+            if not isinstance(field, DjangoQLField):
+                field = self.get_field_instance(model, field)
+            if not field:
+                continue
+            if isinstance(field, RelationField):
+                if field.relation not in exclude:
+                    fields[field.name] = field
+                    result.update(self.introspect(
+                        model=field.related_model,
+                        exclude=tuple(exclude) + tuple(result.keys()),
+                    ))
+            else:
+                fields[field.name] = field
+        return result
+
+
+class Schema(DjangoQLSchema):
+    cache_introspection = False
+
+
+def summary(schema):
+    return [
+        (label, list(fields))
+        for label, fields in schema.introspect_models().items()
+    ]
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    for count in SIZES:
+        root = make_models(count)[-1]
+        result = summary(Schema(root))
+        print('%s models, %s reachable, same results: %s' % (
+            count,
+            len(result),
+            result == summary(LegacySchema(root)),
+        ))
+        for schema_cls in (Schema, LegacySchema):
+            seconds = min(timeit.repeat(
+                lambda: schema_cls(root).introspect_models(),
+                number=1,
+                repeat=3,
+            ))
+            print('  %-15s %8.1f ms' % (schema_cls.__name__, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Measures searches with large "in" and "not in" lists on SQLite.
+
+A table of 100000 rows is searched with lists of 1k, 10k and 100k values,
+half of which match, compiled as a plain IN and with each of large list
+strategies available for SQLite. Searches are parsed once, and the time of
+compiling SQL and counting results in the database is measured.
+
+Usage: python benchmarks/lists.py
+"""
+from __future__ import print_function
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure(
+    INSTALLED_APPS=['django.contrib.contenttypes', 'djangoql'],
+    DATABASES={
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        },
+    },
+    DJANGOQL_WARM_UP=False,
+    DJANGOQL_MAX_QUERY_LENGTH=None,
+    DJANGOQL_MAX_LIST_SIZE=None,
+)
+django.setup()
+
+from django.db import connection, models  # noqa: E402
+
+from djangoql.queryset import apply_search  # noqa: E402
+
+
+ROWS = 100000
+SIZES = (1000, 10000, 100000)
+STRATEGIES = ('plain', 'chunks', 'json')
+
+
+class Item(models.Model):
+    value = models.IntegerField(db_index=True)
+
+    class Meta:
+        app_label = 'djangoql'
+
+
+def setup():
+    with connection.schema_editor() as schema_editor:
+        schema_editor.create_model(Item)
+    Item.objects.bulk_create(
+        [Item(value=i * 2) for i in range(ROWS)],
+        batch_size=500,
+    )
+
+
+def search(operator, size):
+    rnd = random.Random(size)
+    values = rnd.sample(range(ROWS * 2), size)
+    return 'value %s (%s)' % (operator, ', '.join(str(v) for v in values))
+
+
+def queryset(query, strategy):
+    if strategy == 'plain':
+        settings.DJANGOQL_LARGE_LIST_THRESHOLD = None
+    else:
+        settings.DJANGOQL_LARGE_LIST_THRESHOLD = 0
+        settings.DJANGOQL_LARGE_LIST_STRATEGIES = {'sqlite': strategy}
+    return apply_search(Item.objects.all(), query)
+
+
+def main():
+    setup()
+    for operator in ('in', 'not in'):
+        for size in SIZES:
+            query = search(operator, size)
+            print('%-6s %6s values' % (operator, size), end='')
+            results = set()
+            for strategy in STRATEGIES:
+                qs = queryset(query, strategy)
+                results.add(qs.count())
+                seconds = min(timeit.repeat(
+                    lambda: qs.all().count(),
+                    number=1,
+                    repeat=3,
+                ))
+                print('  %s %7.1f ms' % (strategy, seconds * 1000), end='')
+            print('  same results: %s' % (len(results) == 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Compares SQLite query plans and timings of negated searches on Book model of
+test_project, compiled as negated Q-objects (default) and as explicit
+predicates (DJANGOQL_EXPLICIT_NEGATION = True).
+
+Books are generated for 1000 authors in 20 groups, with 30% of ratings and
+genres being NULL. Rating and name columns are indexed, so that plans show
+whether indexes can be used. For every search, EXPLAIN QUERY PLAN output and
+the best of 3 runs of counting results are printed for both modes.
+
+Usage: python benchmarks/negation.py
+"""
+from __future__ import print_function
+
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'test_project'))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure(
+    INSTALLED_APPS=[
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'djangoql',
+        'core',
+    ],
+    DATABASES={
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        },
+    },
+    DJANGOQL_WARM_UP=False,
+)
+django.setup()
+
+from django.contrib.auth.models import Group, User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from core.models import Book  # noqa: E402
+from djangoql.queryset import apply_search  # noqa: E402
+
+
+BOOKS = 100000
+AUTHORS = 1000
+GROUPS = 20
+SEARCHES = (
+    'name != "book7"',
+    'rating != 3',
+    'rating not in (1, 2, 3)',
+    'genre != 2 and rating != None',
+    'name !~ "77"',
+    'author.email != "user7@example.com"',
+    'author.groups.name != "group7"',
+)
+
+
+def setup():
+    call_command('migrate', verbosity=0)
+    rnd = random.Random(BOOKS)
+    Group.objects.bulk_create(
+        [Group(name='group%s' % i) for i in range(GROUPS)],
+    )
+    groups = list(Group.objects.all())
+    User.objects.bulk_create(
+        [User(username='user%s' % i, email='user%s@example.com' % i)
+         for i in range(AUTHORS)],
+        batch_size=500,
+    )
+    authors = list(User.objects.all())
+    Through = User.groups.through
+    Through.objects.bulk_create(
+        [Through(user=author, group=group)
+         for author in authors
+         for group in rnd.sample(groups, 2)],
+        batch_size=500,
+    )
+    Book.objects.bulk_create(
+        [Book(
+            name='book%s' % i,
+            author=rnd.choice(authors),
+            rating=rnd.randint(1, 5) if rnd.random() > 0.3 else None,
+            genre=rnd.randint(1, 3) if rnd.random() > 0.3 else None,
+        ) for i in range(BOOKS)],
+        batch_size=500,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE INDEX book_rating ON core_book (rating)')
+        cursor.execute('CREATE INDEX book_name ON core_book (name)')
+        cursor.execute('ANALYZE')
+
+
+def query_plan(qs):
+    sql, params = qs.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def measure(search, explicit):
+    with override_settings(DJANGOQL_EXPLICIT_NEGATION=explicit):
+        qs = apply_search(Book.objects.all(), search)
+        where = str(qs.query).split('WHERE', 1)[1].strip()
+        plan = query_plan(qs)
+        count = qs.count()
+        seconds = min(timeit.repeat(
+            lambda: qs.all().count(),
+            number=1,
+            repeat=3,
+        ))
+    return where, plan, count, seconds
+
+
+def main():
+    setup()
+    for search in SEARCHES:
+        print(search)
+        counts = set()
+        for explicit in (False, True):
+            where, plan, count, seconds = measure(search, explicit)
+            counts.add(count)
+            print('  %s %7.1f ms  WHERE %s' % (
+                'explicit' if explicit else 'default ',
+                seconds * 1000,
+                where,
+            ))
+            for line in plan:
+                print('    %s' % line)
+        print('  same results: %s' % (len(counts) == 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Compares throughput of PLY and hand-written parser backends.
+
+Usage: python benchmarks/parser.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from djangoql.parser import DjangoQLParser  # noqa: E402
+from djangoql.rdparser import DjangoQLRDParser  # noqa: E402
+
+
+def make_query(terms):
+    parts = []
+    for i in range(terms):
+        parts.append(
+            '(author.email ~ "user%s@example.com" and genre in (1, 2, 3)) '
+            'or rating >= %s.5' % (i, i)
+        )
+    return ' and '.join(parts)
+
+
+def main():
+    for terms in (1, 10, 100, 1000):
+        query = make_query(terms)
+        number = max(1, 1000 // terms)
+        print('%s terms, %s chars:' % (terms, len(query)))
+        for parser in (DjangoQLParser(), DjangoQLRDParser()):
+            seconds = min(timeit.repeat(
+                lambda: parser.parse(query),
+                number=number,
+                repeat=3,
+            ))
+            print('  %-20s %10.1f chars/ms' % (
+                parser.__class__.__name__,
+                len(query) * number / seconds / 1000,
+            ))
+
+
+if __name__ == '__main__':
+    main()
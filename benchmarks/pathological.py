@@ -0,0 +1,104 @@
+"""
+Measures worst-case lexing and parsing time on crafted and random inputs.
+
+For every kind of pathological input, time per character is printed for
+growing sizes. It should stay roughly flat, which means that time grows
+linearly with the size of input. Then random inputs are fuzzed, and the
+slowest ones are reported.
+
+Usage: python benchmarks/pathological.py [fuzz iterations]
+"""
+from __future__ import print_function
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from djangoql.exceptions import DjangoQLError  # noqa: E402
+from djangoql.parser import DjangoQLParser  # noqa: E402
+from djangoql.rdparser import DjangoQLRDParser  # noqa: E402
+
+
+CASES = [
+    ('long string', lambda n: 'a = "%s"' % ('x' * n)),
+    ('escaped string', lambda n: 'a = "%s"' % ('\\"\\u0041' * (n // 8))),
+    ('unterminated string', lambda n: 'a = "%s' % ('x' * n)),
+    ('long float', lambda n: 'a = 1.%s' % ('0' * n)),
+    ('long dotted name', lambda n: '%sb = 1' % ('a.' * (n // 2))),
+    ('many terms', lambda n: ' or '.join(['a = 1'] * (n // 10))),
+    ('deep nesting', lambda n: '(' * (n // 7) + 'a = 1' + ')' * (n // 7)),
+    ('huge list', lambda n: 'a in (%s)' % ', '.join(['1'] * (n // 3))),
+    ('many newlines', lambda n: 'a = 1' + '\n' * n + ' $'),
+]
+
+SIZES = (1000, 10000, 100000)
+
+ALPHABET = [
+    'a', 'b.c', ' ', '\n', '"', '\\', '\\u00', '(', ')', ',', '=', '!', '~',
+    '<', '>', '-', '1', '0', '.', 'e', 'and', 'or', 'in', 'not', 'None',
+    'True', '$',
+]
+
+
+def run(parser, text):
+    try:
+        parser.parse(text)
+    except DjangoQLError:
+        pass
+
+
+def measure(parser, text, number=1):
+    return min(timeit.repeat(
+        lambda: run(parser, text),
+        number=number,
+        repeat=3,
+    )) / number
+
+
+def crafted(parsers):
+    for name, make_input in CASES:
+        print('%s:' % name)
+        for size in SIZES:
+            text = make_input(size)
+            print('  %7s chars' % len(text), end='')
+            for parser in parsers:
+                seconds = measure(parser, text)
+                print('  %s %7.1f ns/char' % (
+                    parser.__class__.__name__,
+                    seconds / len(text) * 1e9,
+                ), end='')
+            print()
+
+
+def fuzz(parsers, iterations):
+    rnd = random.Random(42)
+    slowest = []
+    for _ in range(iterations):
+        size = rnd.randint(1, 2000)
+        text = ''.join(rnd.choice(ALPHABET) for _ in range(size))
+        for parser in parsers:
+            seconds = measure(parser, text)
+            slowest.append((seconds / len(text), parser, text))
+    slowest.sort(key=lambda item: item[0], reverse=True)
+    print('Slowest of %s random inputs:' % iterations)
+    for per_char, parser, text in slowest[:5]:
+        print('  %s %7.1f ns/char, %s chars: %r...' % (
+            parser.__class__.__name__,
+            per_char * 1e9,
+            len(text),
+            text[:40],
+        ))
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    parsers = (DjangoQLParser(), DjangoQLRDParser())
+    crafted(parsers)
+    fuzz(parsers, iterations)
+
+
+if __name__ == '__main__':
+    main()
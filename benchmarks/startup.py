@@ -0,0 +1,56 @@
+"""
+Measures import time of djangoql.parser and time of the first parse, in a
+fresh interpreter each time, for every way of constructing a parser.
+
+Usage: python benchmarks/startup.py
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import time
+t0 = time.time()
+from djangoql import parser, rdparser
+t1 = time.time()
+p = %s
+p.parse('id = 1 and name ~ "foo"')
+t2 = time.time()
+p = %s
+p.parse('id = 1 and name ~ "foo"')
+t3 = time.time()
+print('%%.1f %%.1f %%.1f' %% (
+    (t1 - t0) * 1000,
+    (t2 - t1) * 1000,
+    (t3 - t2) * 1000,
+))
+"""
+
+PARSERS = [
+    ('PLY, frozen tables', 'parser.DjangoQLParser()'),
+    ('PLY, yacc.yacc()', 'parser.DjangoQLParser(write_tables=False)'),
+    ('hand-written', 'rdparser.DjangoQLRDParser()'),
+]
+
+
+def main(runs=5):
+    print('%-20s %10s %12s %12s' % ('', 'import ms', 'first ms', 'next ms'))
+    for title, constructor in PARSERS:
+        results = []
+        for _ in range(runs):
+            output = subprocess.check_output(
+                [sys.executable, '-c', SCRIPT % (constructor, constructor)],
+                cwd=ROOT,
+            )
+            results.append([float(v) for v in output.split()])
+        best = [min(r[i] for r in results) for i in range(3)]
+        print('%-20s %10.1f %12.1f %12.1f' % tuple([title] + best))
+
+
+if __name__ == '__main__':
+    main()
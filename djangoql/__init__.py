@@ -1 +1,3 @@
 __version__ = '0.10.3'
+
+default_app_config = 'djangoql.apps.DjangoQLConfig'
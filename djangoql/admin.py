@@ -1,22 +1,37 @@
+import hashlib
 import json
+import re
+import time
 
 from django.conf.urls import url
 from django.contrib import messages
 from django.contrib.admin.views.main import ChangeList
 from django.core.exceptions import FieldError, ValidationError
 from django.forms import Media
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.text import compress_string
 from django.views.generic import TemplateView
 
 from .views import SavedQueryView, SavedQueryPostView
+from .cache import LRUCache
+from .ast import Name
 from .compat import text_type
-from .exceptions import DjangoQLError
-from .queryset import apply_search
+from .diagnostics import diagnose
+from .exceptions import DjangoQLError, DjangoQLLimitError, DjangoQLSchemaError
+from .queryset import apply_search, parse_search
 from .schema import DjangoQLSchema
+from .subqueries import needs_distinct
 
 
 DJANGOQL_SEARCH_MARKER = 'q-l'
 
+re_accepts_gzip = re.compile(r'\bgzip\b')
+
+# Serialized introspections, (schema, model, schema version) ->
+# (expires, etag, body, gzipped body)
+introspection_cache = LRUCache(maxsize=100)
+
 
 class DjangoQLChangeList(ChangeList):
     def get_filters_params(self, *args, **kwargs):
@@ -34,6 +49,12 @@ class DjangoQLSearchMixin(object):
     djangoql_completion = True
     djangoql_schema = DjangoQLSchema
     djangoql_syntax_help_template = 'djangoql/syntax_help.html'
+    # How long introspections can be cached by browsers and on the server,
+    # in seconds. They don't include suggestion options, which are loaded
+    # on demand, page by page.
+    djangoql_introspection_max_age = 60 * 60
+    djangoql_introspection_gzip = True
+    djangoql_suggestions_limit = 50
 
     def search_mode_toggle_enabled(self):
         # If search fields were defined on a child ModelAdmin instance,
@@ -58,16 +79,35 @@ class DjangoQLSearchMixin(object):
         if not search_term:
             return queryset, use_distinct
         try:
-            return (
-                apply_search(queryset, search_term, self.djangoql_schema),
-                use_distinct,
+            results = apply_search(
+                queryset,
+                search_term,
+                self.djangoql_schema,
+            )
+            # JOINs of to-many relations may duplicate rows, unless they're
+            # compiled into subqueries
+            use_distinct = needs_distinct(
+                parse_search(search_term),
+                self.djangoql_schema(queryset.model),
             )
-        except (DjangoQLError, ValueError, FieldError) as e:
-            msg = text_type(e)
+            return results, use_distinct
+        except DjangoQLLimitError as e:
+            msgs = [text_type(e)]
+        except DjangoQLError as e:
+            # Report all problems at once, so that a user could fix them
+            # without a page reload per error
+            errors = diagnose(
+                search_term,
+                self.djangoql_schema(queryset.model),
+            ) or [e]
+            msgs = [text_type(error) for error in errors]
+        except (ValueError, FieldError) as e:
+            msgs = [text_type(e)]
         except ValidationError as e:
-            msg = e.messages[0]
+            msgs = [e.messages[0]]
         queryset = queryset.none()
-        messages.add_message(request, messages.WARNING, msg)
+        for msg in msgs:
+            messages.add_message(request, messages.WARNING, msg)
         return queryset, use_distinct
 
     @property
@@ -96,12 +136,23 @@ class DjangoQLSearchMixin(object):
             custom_urls += [
                 url(
                     r'^introspect/$',
-                    self.admin_site.admin_view(self.introspect),
+                    self.admin_site.admin_view(
+                        self.introspect,
+                        cacheable=True,
+                    ),
                     name='%s_%s_djangoql_introspect' % (
                         self.model._meta.app_label,
                         self.model._meta.model_name,
                     ),
                 ),
+                url(
+                    r'^suggestions/$',
+                    self.admin_site.admin_view(self.suggestions),
+                    name='%s_%s_djangoql_suggestions' % (
+                        self.model._meta.app_label,
+                        self.model._meta.model_name,
+                    ),
+                ),
                 url(
                     r'^djangoql-saved-query/$',
                     self.admin_site.admin_view(SavedQueryView.as_view(model=self.model)),
@@ -129,8 +180,110 @@ class DjangoQLSearchMixin(object):
         return custom_urls + super(DjangoQLSearchMixin, self).get_urls()
 
     def introspect(self, request):
-        response = self.djangoql_schema(self.model).as_dict()
-        return HttpResponse(
-            content=json.dumps(response, indent=2),
-            content_type='application/json; charset=utf-8',
+        expires, etag, body, gzipped = self.get_introspection()
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        use_gzip = gzipped is not None and \
+            re_accepts_gzip.search(accept_encoding)
+        if use_gzip:
+            # Like GZipMiddleware does, the ETag is weakened, since gzipped
+            # body is not byte-for-byte identical to the uncompressed one
+            etag = 'W/' + etag
+        # Weak comparison, which ignores W/ prefixes
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if strip_weak(etag) in etags or '*' in etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                content=gzipped if use_gzip else body,
+                content_type='application/json; charset=utf-8',
+            )
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+            response['Content-Length'] = str(len(response.content))
+        response['ETag'] = etag
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=self.djangoql_introspection_max_age,
+        )
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def get_introspection(self):
+        """
+        Returns (expires, etag, body, gzipped body) of introspection.
+
+        Results are cached in process for djangoql_introspection_max_age
+        seconds, unless the schema opts out of introspection caching.
+        """
+        schema = self.djangoql_schema(self.model)
+        key = None
+        if schema.cache_introspection and self.djangoql_introspection_max_age:
+            key = (schema.__class__, self.model, schema.get_version())
+            cached = introspection_cache.get(key)
+            if cached is not None and cached[0] > time.time():
+                return cached
+        body = json.dumps(
+            schema.as_dict(options=False),
+            separators=(',', ':'),
+        ).encode('utf8')
+        gzipped = None
+        if self.djangoql_introspection_gzip:
+            gzipped = compress_string(body)
+        result = (
+            time.time() + self.djangoql_introspection_max_age,
+            '"%s"' % hashlib.sha1(body).hexdigest(),
+            body,
+            gzipped,
+        )
+        if key is not None:
+            introspection_cache.set(key, result)
+        return result
+
+    def suggestions(self, request):
+        """
+        Returns a page of suggestion options for a field.
+
+        GET parameters: field - dotted path to the field from current model,
+        prefix - beginning of the value typed so far, page - page number.
+        """
+        schema = self.djangoql_schema(self.model)
+        try:
+            field = schema.resolve_name(
+                Name(parts=request.GET.get('field', '').split('.')),
+            )
+        except DjangoQLSchemaError as e:
+            return JsonResponse({'error': text_type(e)}, status=400)
+        if field is None or not field.suggest_options:
+            return JsonResponse(
+                {'error': 'Field has no suggestion options'},
+                status=400,
+            )
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        limit = self.djangoql_suggestions_limit
+        items = field.get_suggestions(
+            prefix=request.GET.get('prefix', ''),
+            offset=(page - 1) * limit,
+            limit=limit + 1,  # to tell if there's a next page
         )
+        return JsonResponse({
+            'items': items[:limit],
+            'page': page,
+            'has_next': len(items) > limit,
+        })
+
+
+def parse_etags(header):
+    """
+    Returns entity tags of If-None-Match header, without W/ prefixes
+    """
+    return [
+        strip_weak(etag.strip()) for etag in header.split(',') if etag.strip()
+    ]
+
+
+def strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
@@ -0,0 +1,37 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class DjangoQLConfig(AppConfig):
+    name = 'djangoql'
+
+    def ready(self):
+        from .cache import options_cache, plan_cache
+        from .parser import parse, set_parser_class
+        from .queryset import parse_cache
+        parser_class = getattr(settings, 'DJANGOQL_PARSER', None)
+        if parser_class:
+            set_parser_class(import_string(parser_class))
+        parse_cache.resize(getattr(
+            settings,
+            'DJANGOQL_PARSE_CACHE_SIZE',
+            parse_cache.maxsize,
+        ))
+        plan_cache.resize(
+            getattr(settings, 'DJANGOQL_PLAN_CACHE_SIZE', plan_cache.maxsize),
+        )
+        options_cache.resize(getattr(
+            settings,
+            'DJANGOQL_OPTIONS_CACHE_SIZE',
+            options_cache.maxsize,
+        ))
+        options_cache.timeout = getattr(
+            settings,
+            'DJANGOQL_OPTIONS_CACHE_TIMEOUT',
+            options_cache.timeout,
+        )
+        if getattr(settings, 'DJANGOQL_WARM_UP', True):
+            # Load parsing tables and compile lexer rules now, so that worker
+            # processes forked after startup don't pay for it on first search
+            parse('id = 1')
@@ -1,12 +1,55 @@
 from __future__ import unicode_literals
 
-from .compat import text_type
+import weakref
+
+from .compat import intern, text_type
+
+
+# Names and operators are interned: parsing the same path or operator again
+# returns the same node instance, which saves memory in large caches of
+# parsed queries and makes comparisons of such nodes nearly free.
+_interned = weakref.WeakValueDictionary()
+
+_set = object.__setattr__
 
 
 class Node(object):
+    """
+    Immutable AST node.
+
+    Nodes are compared and hashed structurally, so they can be used as keys
+    in dicts and caches. Hashes are calculated once, when the node is created.
+    Unlike Python numbers, Const(1), Const(1.0) and Const(True) are not equal,
+    since they are validated and compiled differently.
+    """
+    __slots__ = ('_hash',)
+    fields = ()
+
+    def _init(self, *values):
+        for name, value in zip(self.fields, values):
+            _set(self, name, value)
+        _set(self, '_hash', hash(
+            (self.__class__.__name__,) +
+            tuple(_hash_value(value) for value in values)
+        ))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            '%s nodes are immutable' % self.__class__.__name__
+        )
+
+    def __delattr__(self, name):
+        raise AttributeError(
+            '%s nodes are immutable' % self.__class__.__name__
+        )
+
+    def __reduce__(self):
+        return self.__class__, tuple(getattr(self, k) for k in self.fields)
+
     def __str__(self):
         children = []
-        for k, v in self.__dict__.items():
+        for k in self.fields:
+            v = getattr(self, k)
             if isinstance(v, (list, tuple)):
                 v = '[%s]' % ', '.join([text_type(v) for v in v if v])
             children.append('%s=%s' % (k, v))
@@ -18,33 +61,92 @@ class Node(object):
 
     __repr__ = __str__
 
+    def __hash__(self):
+        return self._hash
+
     def __eq__(self, other):
-        if not isinstance(other, self.__class__):
+        if self is other:
+            return True
+        if not _same_node_type(self, other):
             return False
-        for k, v in self.__dict__.items():
-            if getattr(other, k) != v:
-                return False
+        # Walk both trees with an explicit stack, so that comparison of
+        # very deep trees is not limited by recursion depth
+        pending = [(self, other)]
+        while pending:
+            a, b = pending.pop()
+            for k in a.fields:
+                v1 = getattr(a, k)
+                v2 = getattr(b, k)
+                if isinstance(v1, tuple):
+                    if not isinstance(v2, tuple) or len(v1) != len(v2):
+                        return False
+                    pairs = zip(v1, v2)
+                else:
+                    pairs = ((v1, v2),)
+                for v1, v2 in pairs:
+                    if v1 is v2:
+                        continue
+                    if isinstance(v1, Node):
+                        if not _same_node_type(v1, v2):
+                            return False
+                        pending.append((v1, v2))
+                    elif v1 != v2 or type(v1) is not type(v2) and \
+                            isinstance(a, Const):
+                        return False
         return True
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
 
+def _hash_value(value):
+    if isinstance(value, Node):
+        return value._hash
+    return hash(value)
+
+
+def _same_node_type(a, b):
+    return b.__class__ is a.__class__ and b._hash == a._hash
+
+
+def _interned_node(cls, *values):
+    key = (cls,) + values
+    try:
+        return _interned[key]
+    except KeyError:
+        pass
+    node = object.__new__(cls)
+    node._init(*values)
+    return _interned.setdefault(key, node)
+
+
 class Expression(Node):
+    __slots__ = ('left', 'operator', 'right')
+    fields = __slots__
+
     def __init__(self, left, operator, right):
-        self.left = left
-        self.operator = operator
-        self.right = right
+        _set(self, 'left', left)
+        _set(self, 'operator', operator)
+        _set(self, 'right', right)
+        _set(self, '_hash', hash(
+            ('Expression', left._hash, operator._hash, right._hash),
+        ))
 
 
 class Name(Node):
-    def __init__(self, parts):
-        if isinstance(parts, list):
-            self.parts = parts
-        elif isinstance(parts, tuple):
-            self.parts = list(parts)
+    __slots__ = ('parts', '__weakref__')
+    fields = ('parts',)
+
+    def __new__(cls, parts):
+        if isinstance(parts, (list, tuple)):
+            parts = tuple(parts)
         else:
-            self.parts = [parts]
+            parts = (parts,)
+        try:
+            return _interned[cls, parts]
+        except KeyError:
+            pass
+        return _interned_node(cls, tuple(intern(p) for p in parts))
 
     @property
     def value(self):
@@ -52,13 +154,33 @@ class Name(Node):
 
 
 class Const(Node):
+    __slots__ = ('value',)
+    fields = __slots__
+
     def __init__(self, value):
-        self.value = value
+        _set(self, 'value', value)
+        _set(self, '_hash', hash(('Const', type(value), value)))
+
+
+class Param(Node):
+    """
+    Bind placeholder, like :uid in "author.id = :uid". Its value is passed
+    when the search is applied.
+    """
+    __slots__ = ('name',)
+    fields = __slots__
+
+    def __init__(self, name):
+        _set(self, 'name', name)
+        _set(self, '_hash', hash(('Param', name)))
 
 
 class List(Node):
+    __slots__ = ('items',)
+    fields = __slots__
+
     def __init__(self, items):
-        self.items = items
+        self._init(tuple(items))
 
     @property
     def value(self):
@@ -66,13 +188,53 @@ class List(Node):
 
 
 class Operator(Node):
-    def __init__(self, operator):
-        self.operator = operator
+    __slots__ = ('operator', '__weakref__')
+    fields = ('operator',)
+
+    def __new__(cls, operator):
+        try:
+            return _interned[cls, operator]
+        except KeyError:
+            pass
+        return _interned_node(cls, intern(operator))
 
 
 class Logical(Operator):
-    pass
+    __slots__ = ()
 
 
 class Comparison(Operator):
-    pass
+    __slots__ = ()
+
+
+class Truth(Node):
+    """
+    Expression known to match everything (value=True) or nothing
+    (value=False). Not produced by parsers, see djangoql.optimizer.
+    """
+    __slots__ = ('value',)
+    fields = __slots__
+    # Neither a logical expression, nor a comparison
+    operator = None
+
+    def __init__(self, value):
+        _set(self, 'value', bool(value))
+        _set(self, '_hash', hash(('Truth', bool(value))))
+
+
+def logical_operands(expr):
+    """
+    Returns operands of a chain of the same logical operator, in order
+    """
+    operator = expr.operator.operator
+    operands = []
+    pending = [expr]
+    while pending:
+        node = pending.pop()
+        if isinstance(node.operator, Logical) and \
+                node.operator.operator == operator:
+            pending.append(node.right)
+            pending.append(node.left)
+        else:
+            operands.append(node)
+    return operands
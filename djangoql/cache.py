@@ -0,0 +1,366 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+
+from . import __version__
+from .serializers import FORMAT_VERSION, dumps_binary, loads_binary
+
+
+class LRUCache(object):
+    """
+    Thread-safe mapping that keeps up to maxsize most recently used items
+    """
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            # Re-insert to mark the item as the most recently used one
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while self._data and len(self._data) > max(maxsize, 0):
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'maxsize': self.maxsize,
+            'size': len(self._data),
+        }
+
+
+logger = logging.getLogger(__name__)
+
+
+class OptionsCache(object):
+    """
+    Thread-safe cache of suggestion options with TTL and background refresh.
+
+    Keys are tuples that start with a model. They're indexed by concrete
+    model, so that options can be invalidated when instances of the model,
+    its proxies, parents or children in multi-table inheritance are saved
+    or deleted. Signals are connected only for models with cached options.
+    Up to maxsize most recently used keys are kept, and maxsize=0 disables
+    caching.
+
+    When a value is older than timeout seconds, it's still returned as is,
+    while a background thread loads a fresh one (stale-while-revalidate), so
+    that only the very first request for options waits for the database.
+    Expired values are reloaded one by one, by a single thread per cache.
+    With background_refresh=False, expired values are reloaded in place.
+    """
+    def __init__(self, maxsize=1000, timeout=300, background_refresh=True):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.background_refresh = background_refresh
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires, value)
+        self._keys = {}  # concrete model -> set of keys
+        self._watched = set()
+        # Concrete model -> models whose options change with its instances
+        self._families = {}
+        self._refreshing = set()
+        self._refresh_queue = deque()
+        self._refresh_thread = None
+        # Incremented on invalidation to discard values loaded before it
+        self._epoch = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, loader):
+        """
+        Returns cached value for given key, calling loader() if there's none
+        """
+        if self.maxsize <= 0:
+            return loader()
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._data[key] = entry
+                self.hits += 1
+            else:
+                self.misses += 1
+            generation = self._generation(key)
+        if entry is None:
+            value = loader()
+            self._store(key, value, generation)
+            return value
+        expires, value = entry
+        if expires is not None and expires <= time.time():
+            if self.background_refresh:
+                self.refresh(key, loader)
+            else:
+                value = loader()
+                self._store(key, value, generation)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            generation = self._generation(key)
+        self._store(key, value, generation)
+
+    def _generation(self, key):
+        return self._epoch, self._generations.get(concrete_model(key[0]), 0)
+
+    def _store(self, key, value, generation):
+        if self.maxsize <= 0:
+            return
+        model = concrete_model(key[0])
+        expires = None if self.timeout is None else time.time() + self.timeout
+        with self._lock:
+            if generation != self._generation(key):
+                # Invalidated while the value was loading, it may be outdated
+                return
+            self._data.pop(key, None)
+            self._data[key] = (expires, value)
+            self._keys.setdefault(model, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._unindex(self._data.popitem(last=False)[0])
+            watch = model not in self._watched
+            self._watched.add(model)
+        if watch:
+            self.watch(key[0])
+
+    def _unindex(self, key):
+        model = concrete_model(key[0])
+        keys = self._keys.get(model)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[model]
+
+    def watch(self, model):
+        """
+        Connects signals of models that change options of given model: the
+        model itself, its proxies, its parents and children in multi-table
+        inheritance, and their proxies
+        """
+        family = inheritance_family(concrete_model(model))
+        with self._lock:
+            for member in family:
+                self._families.setdefault(member, set()).update(family)
+        senders = set(model._meta.apps.get_models())
+        senders.update(family)
+        senders.add(model)
+        for sender in senders:
+            if concrete_model(sender) in family:
+                post_save.connect(self.on_change, sender=sender)
+                post_delete.connect(self.on_change, sender=sender)
+
+    def on_change(self, sender, **kwargs):
+        self.invalidate(sender)
+
+    def refresh(self, key, loader):
+        """
+        Reloads value for given key in a background thread
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._refresh_queue.append((key, loader, self._generation(key)))
+            if self._refresh_thread is not None:
+                return
+            self._refresh_thread = thread = threading.Thread(
+                target=self._refresh,
+            )
+        thread.daemon = True
+        thread.start()
+
+    def _refresh(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._refresh_queue:
+                        self._refresh_thread = None
+                        return
+                    key, loader, generation = self._refresh_queue.popleft()
+                try:
+                    self._store(key, loader(), generation)
+                except Exception:
+                    # Stale value is kept and will be refreshed next time
+                    logger.exception('Failed to refresh DjangoQL options')
+                finally:
+                    with self._lock:
+                        self._refreshing.discard(key)
+        finally:
+            connections.close_all()
+
+    def invalidate(self, model):
+        """
+        Removes all cached options of given model, including options of its
+        proxies, parents and children in multi-table inheritance
+        """
+        model = concrete_model(model)
+        with self._lock:
+            for member in self._families.get(model, (model,)):
+                self._generations[member] = \
+                    self._generations.get(member, 0) + 1
+                for key in self._keys.pop(member, ()):
+                    del self._data[key]
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while self._data and len(self._data) > max(maxsize, 0):
+                self._unindex(self._data.popitem(last=False)[0])
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self._data.clear()
+            self._keys.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'maxsize': self.maxsize,
+            'size': len(self._data),
+            'timeout': self.timeout,
+        }
+
+
+def concrete_model(model):
+    return model._meta.concrete_model
+
+
+def inheritance_family(model):
+    """
+    Returns a set with given concrete model, its concrete parents and
+    children, whose options change together with options of the model
+    """
+    family = set([model])
+    family.update(model._meta.get_parent_list())
+    for other in model._meta.apps.get_models():
+        if model in other._meta.get_parent_list():
+            family.add(concrete_model(other))
+    return family
+
+
+options_cache = OptionsCache()
+
+# Compiled plans of recently used search shapes, see djangoql.compiler. The
+# size can be configured with DJANGOQL_PLAN_CACHE_SIZE setting, 0 disables
+# caching. Plans are dropped with schema introspection results.
+plan_cache = LRUCache(maxsize=1000)
+
+
+class QueryCache(object):
+    """
+    Stores parsed and validated queries in Django cache framework.
+
+    Lets a fleet of worker processes share one parse and validation per query.
+    Cache keys include query text, schema class, its version and the current
+    model, so that changes in schema automatically invalidate stored queries.
+    """
+    key_prefix = 'djangoql'
+
+    def __init__(self, alias='default', timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def make_key(self, search, schema_instance):
+        schema_cls = schema_instance.__class__
+        return ':'.join([
+            self.key_prefix,
+            __version__,
+            str(FORMAT_VERSION),
+            '%s.%s' % (schema_cls.__module__, schema_cls.__name__),
+            schema_instance.model_label(schema_instance.current_model),
+            schema_instance.get_version(),
+            hashlib.sha1(search.encode('utf8')).hexdigest(),
+        ])
+
+    def get(self, search, schema_instance):
+        """
+        Returns validated AST for given search or None if it's not cached
+        """
+        data = self.cache.get(self.make_key(search, schema_instance))
+        if data is None:
+            return None
+        try:
+            return loads_binary(data)
+        except ValueError:
+            # Written by a different version of DjangoQL or Python
+            return None
+
+    def set(self, search, schema_instance, ast):
+        kwargs = {}
+        if self.timeout is not None:
+            kwargs['timeout'] = self.timeout
+        self.cache.set(
+            self.make_key(search, schema_instance),
+            dumps_binary(ast),
+            **kwargs
+        )
+
+
+def get_query_cache():
+    """
+    Returns QueryCache configured with DJANGOQL_QUERY_CACHE setting or None
+    """
+    alias = getattr(settings, 'DJANGOQL_QUERY_CACHE', None)
+    if not alias:
+        return None
+    return QueryCache(
+        alias=alias,
+        timeout=getattr(settings, 'DJANGOQL_QUERY_CACHE_TIMEOUT', None),
+    )
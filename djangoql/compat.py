@@ -8,3 +8,10 @@ if PY2:
 else:
     binary_type = bytes
     text_type = str
+
+if PY2:
+    def intern(value):
+        # Builtin intern() in Python 2 doesn't support unicode strings
+        return value
+else:
+    from sys import intern  # noqa: F401
@@ -0,0 +1,363 @@
+"""
+Compiled searches, parsed, validated and resolved once and applied many times.
+
+compile_search() returns an immutable CompiledSearch. Fields of all its
+comparisons are resolved, and lookup names and operators are computed, so
+applying it to a queryset only converts values and builds Q-objects:
+
+    plan = compile_search(Book, 'author.id = :uid and name ~ "war"')
+    books = plan.apply(Book.objects.all(), {'uid': request.user.id})
+
+Searches may contain bind placeholders, like :uid, whose values are passed
+when the search is applied, so one plan serves all users. Literal values
+are extracted from searches, too: searches that differ in values only, like
+'id = 1' and 'id = 2', have the same shape and share a cached plan, while
+each call of compile_search() returns a CompiledSearch with its own values.
+
+Comparisons over to-many relations are compiled into EXISTS subqueries with
+DJANGOQL_EXISTS_SUBQUERIES setting, like in apply_search(). Subqueries are
+chosen when a plan is applied, since they depend on values of bind
+placeholders: comparisons with None are left to Django. Negated comparisons
+follow DJANGOQL_EXPLICIT_NEGATION setting in the same way, see
+djangoql.negation. With DJANGOQL_OPTIMIZE setting, searches are validated
+and optimized before their shape is taken, so plans are cached by shapes of
+optimized searches.
+"""
+from __future__ import unicode_literals
+
+from collections import namedtuple
+
+from django.db import models
+
+from .ast import Logical, Param, Truth
+from .cache import plan_cache
+from .exceptions import DjangoQLSchemaError
+from .lists import list_operator
+from .negation import (
+    POSITIVE_OPERATORS, explicit_negation_enabled, negated_lookup,
+)
+from .optimizer import optimize, optimizer_enabled
+from .queryset import (
+    combine_relations, is_list_operator, logical_operands, param_value,
+    parse_search,
+)
+from .schema import DjangoQLField, DjangoQLSchema, has_default_lookup
+from .subqueries import (
+    NEGATED_OPERATORS, grouped_relations, subqueries_enabled,
+    to_many_relation,
+)
+
+
+_set = object.__setattr__
+
+
+class CompiledLookup(namedtuple('CompiledLookup', [
+    'name', 'field', 'operator', 'param', 'search', 'suffix', 'invert',
+    'relation',
+])):
+    """
+    Comparison of a compiled search with resolved field.
+
+    param is either Param node of a bind placeholder, or the index of
+    literal value. For fields with default get_lookup(), search and suffix
+    are parts of Django lookup, like "author__id" and "__in", and invert
+    tells if the lookup is negated. Fields with custom get_lookup() build
+    lookups themselves, and search is None for them. relation is
+    ToManyRelation of the first to-many relation in the name, or None, for
+    DJANGOQL_EXISTS_SUBQUERIES setting.
+    """
+    __slots__ = ()
+
+    @property
+    def lookup(self):
+        if self.search is None:
+            return None
+        return self.search + self.suffix
+
+    def validate(self, schema_instance, value):
+        schema_instance.validate_value(
+            self.name,
+            self.field,
+            value,
+            many=is_list_operator(self.operator),
+        )
+
+    def subquery_relation(self, value):
+        """
+        Returns ToManyRelation if the comparison with given value can be
+        compiled into EXISTS subquery, see subqueries.subquery_relation()
+        """
+        if self.operator in NEGATED_OPERATORS or value is None:
+            return None
+        return self.relation
+
+    def q(self, schema_instance, value, relation=None, joined=()):
+        """
+        Returns Q-object for given value. With relation, lookups are relative
+        to its model, for subqueries. Negated comparisons follow
+        DJANGOQL_EXPLICIT_NEGATION setting, like in apply_search(), and
+        joined are name parts of positive comparisons of the search.
+        """
+        if self.search is not None and self.field is not None and \
+                not relation and self.operator in POSITIVE_OPERATORS and \
+                explicit_negation_enabled():
+            q = negated_lookup(
+                schema_instance,
+                self.name,
+                self.field,
+                self.operator,
+                value,
+                joined,
+            )
+            if q is not None:
+                return q
+        offset = len(relation.prefix) if relation else 0
+        if self.search is None:
+            return self.field.get_lookup(
+                path=list(self.name.parts[offset:-1]),
+                operator=self.operator,
+                value=value,
+            )
+        search = self.search
+        if offset:
+            search = search[len('__'.join(relation.prefix)) + 2:]
+        suffix = self.suffix
+        # Field is None for comparisons of related models with None
+        if self.field is not None:
+            if is_list_operator(self.operator):
+                value = self.field.get_list_lookup_value(value)
+                suffix = list_operator(suffix, value)
+            else:
+                value = self.field.get_lookup_value(value)
+        q = models.Q(**{search + suffix: value})
+        return ~q if self.invert else q
+
+
+class CompiledSearch(object):
+    """
+    Immutable compiled search, see compile_search().
+
+    lookups are CompiledLookup instances for all comparisons, in order of
+    appearance, and params are names of bind placeholders.
+    """
+    __slots__ = ('model', 'schema', 'lookups', 'params', 'literals',
+                 '_program')
+
+    def __init__(self, model, schema_instance, lookups, program,
+                 literals=()):
+        _set(self, 'model', model)
+        _set(self, 'schema', schema_instance)
+        _set(self, 'lookups', tuple(lookups))
+        params = []
+        for lookup in self.lookups:
+            if isinstance(lookup.param, Param) and \
+                    lookup.param.name not in params:
+                params.append(lookup.param.name)
+        _set(self, 'params', tuple(params))
+        _set(self, 'literals', tuple(literals))
+        # Postfix program: lookup indexes and (operator, count) combinations
+        _set(self, '_program', tuple(program))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CompiledSearch is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('CompiledSearch is immutable')
+
+    @classmethod
+    def build(cls, model, schema_instance, shape):
+        """
+        Compiles a search of given shape, see search_shape()
+        """
+        lookups = []
+        program = []
+        for entry in shape:
+            if entry[0] == 'combine':
+                program.append(entry[1:])
+                continue
+            if entry[0] == 'truth':
+                program.append(Truth(entry[1]))
+                continue
+            _, name, operator, param = entry
+            field = schema_instance.resolve_name(name)
+            lookup_field = field
+            if lookup_field is None:
+                lookup_field = DjangoQLField(
+                    name=name.parts[-1],
+                    nullable=True,
+                )
+            if has_default_lookup(lookup_field):
+                search = '__'.join(
+                    list(name.parts[:-1]) + [lookup_field.get_lookup_name()],
+                )
+                suffix, invert = lookup_field.get_operator(operator)
+            else:
+                search, suffix, invert = None, None, None
+            program.append(len(lookups))
+            lookups.append(CompiledLookup(
+                name=name,
+                field=field,
+                operator=operator,
+                param=param,
+                search=search,
+                suffix=suffix,
+                invert=invert,
+                relation=to_many_relation(schema_instance, name),
+            ))
+        return cls(model, schema_instance, lookups, program)
+
+    def with_literals(self, literals):
+        """
+        Returns the same compiled search with other literal values, which
+        are validated first
+        """
+        for lookup in self.lookups:
+            if not isinstance(lookup.param, Param):
+                lookup.validate(self.schema, literals[lookup.param])
+        return CompiledSearch(
+            self.model,
+            self.schema,
+            self.lookups,
+            self._program,
+            literals,
+        )
+
+    def q(self, params=None):
+        """
+        Returns Q-object for given values of bind placeholders
+        """
+        unknown = set(params or ()) - set(self.params)
+        if unknown:
+            raise DjangoQLSchemaError('Unknown parameters: %s' % ', '.join(
+                sorted(':%s' % name for name in unknown)
+            ))
+        if isinstance(self._program[0], Truth):
+            # Optimized search that matches everything or nothing
+            return models.Q() if self._program[0].value else \
+                models.Q(pk__in=[])
+        values = []
+        for lookup in self.lookups:
+            if isinstance(lookup.param, Param):
+                value = param_value(lookup.param, lookup.operator, params)
+                lookup.validate(self.schema, value)
+            else:
+                value = self.literals[lookup.param]
+            values.append(value)
+        relations = [None] * len(values)
+        if subqueries_enabled():
+            relations = self._subquery_relations(values)
+        joined = [
+            lookup.name.parts for lookup in self.lookups
+            if lookup.operator not in NEGATED_OPERATORS
+        ]
+        # (Q-object, ToManyRelation of the subquery it belongs to or None)
+        results = []
+        for entry in self._program:
+            if isinstance(entry, tuple):
+                operator, count = entry
+                children = results[-count:]
+                del results[-count:]
+                results.append(combine_relations(operator, children))
+                continue
+            relation = relations[entry]
+            results.append((
+                self.lookups[entry].q(
+                    self.schema,
+                    values[entry],
+                    relation,
+                    joined,
+                ),
+                relation,
+            ))
+        q, relation = results[0]
+        return relation.exists(q) if relation else q
+
+    def _subquery_relations(self, values):
+        """
+        Returns ToManyRelation of the subquery of every lookup or None, see
+        subqueries.grouped_relations()
+        """
+        relations = [
+            lookup.subquery_relation(value)
+            for lookup, value in zip(self.lookups, values)
+        ]
+        postfix = []
+        for entry in self._program:
+            if isinstance(entry, tuple):
+                postfix.append(entry[1])
+            else:
+                lookup = self.lookups[entry]
+                postfix.append(
+                    (lookup.name, lookup.operator, relations[entry]),
+                )
+        grouped = grouped_relations(postfix)
+        return [r if r in grouped else None for r in relations]
+
+    def apply(self, queryset, params=None):
+        """
+        Filters queryset of the compiled model with this search
+        """
+        if queryset.model is not self.model:
+            raise ValueError('Search was compiled for %s, not for %s' % (
+                self.model.__name__,
+                queryset.model.__name__,
+            ))
+        return queryset.filter(self.q(params))
+
+
+def search_shape(ast):
+    """
+    Returns (shape, literals) for given AST.
+
+    Shape is a tuple of AST in postfix order, where values are replaced
+    with bind placeholders or indexes of literal values:
+    ('compare', name, operator, Param or index) for comparisons and
+    ('combine', operator, count) for chains of logical operators. Optimized
+    searches that match everything or nothing have ('truth', value) shape.
+    """
+    if isinstance(ast, Truth):
+        return (('truth', ast.value),), []
+    shape = []
+    literals = []
+    stack = [(ast, None)]
+    while stack:
+        node, operands = stack.pop()
+        if operands is not None:
+            shape.append(('combine', node.operator.operator, len(operands)))
+        elif isinstance(node.operator, Logical):
+            operands = logical_operands(node)
+            stack.append((node, operands))
+            stack.extend((operand, None) for operand in reversed(operands))
+        else:
+            if isinstance(node.right, Param):
+                param = node.right
+            else:
+                param = len(literals)
+                literals.append(node.right.value)
+            shape.append(('compare', node.left, node.operator.operator, param))
+    return tuple(shape), literals
+
+
+def compile_search(model, search, schema=None):
+    """
+    Parses and validates search for given model and returns CompiledSearch
+    """
+    schema = schema or DjangoQLSchema
+    schema_instance = schema(model)
+    ast = parse_search(search)
+    if optimizer_enabled():
+        # Rules need valid fields and values
+        schema_instance.validate(ast)
+        ast = optimize(ast, schema_instance)
+    shape, literals = search_shape(ast)
+    if not schema_instance.cache_introspection:
+        # Fields of such schemas may differ between instances, like fields
+        # available to current user, so plans are not shared
+        plan = CompiledSearch.build(model, schema_instance, shape)
+        return plan.with_literals(literals)
+    key = (schema_instance.introspection_key(), shape)
+    plan = plan_cache.get(key)
+    if plan is None:
+        plan = CompiledSearch.build(model, schema_instance, shape)
+        plan_cache.set(key, plan)
+    return plan.with_literals(literals)
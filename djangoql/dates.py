@@ -0,0 +1,120 @@
+"""
+Parsing of date and timestamp values in searches.
+
+Values in ISO 8601 format are matched by a regular expression, which is much
+faster than datetime.strptime(). Timestamps may have "T" or space between
+date and time, fractional seconds and timezone offsets, like
+"2017-01-30T10:20:30.5+03:00". Other formats accepted by former
+strptime()-based parsing, like "2017-1-30", are still parsed with strptime().
+
+Results are memoized, so that a value which is validated and then converted
+to lookup value, or repeated in a large "in" list, is parsed once. Lookup
+values of timestamps depend on the current timezone, which callers resolve
+once for all values they convert, and which is part of the memo key.
+"""
+from __future__ import unicode_literals
+
+import re
+from datetime import date, datetime
+
+from django.utils.timezone import get_fixed_timezone, make_naive
+
+from .cache import LRUCache
+
+
+DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})\Z')
+DATETIME_RE = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d{1,6})\d*)?)?'
+    r'(Z|[+-]\d{2}(?::?\d{2})?)?)?\Z'
+)
+
+parse_cache = LRUCache(maxsize=10000)
+
+
+def parse_date(value):
+    """
+    Parses "YYYY-MM-DD" into date. Raises ValueError for invalid values.
+    """
+    key = ('date', value)
+    result = parse_cache.get(key)
+    if result is None:
+        match = DATE_RE.match(value)
+        if match:
+            result = date(*[int(g) for g in match.groups()])
+        else:
+            result = datetime.strptime(value, '%Y-%m-%d').date()
+        parse_cache.set(key, result)
+    return result
+
+
+def parse_datetime(value):
+    """
+    Parses a timestamp into datetime. Raises ValueError for invalid values.
+
+    Returned datetime is naive, unless the value includes timezone offset.
+    """
+    key = ('datetime', value)
+    result = parse_cache.get(key)
+    if result is None:
+        result = _parse_datetime(value)
+        parse_cache.set(key, result)
+    return result
+
+
+def lookup_datetime(value, tz, use_tz):
+    """
+    Parses a timestamp into lookup value for given timezone. With use_tz,
+    naive timestamps are put into the timezone, otherwise timestamps with
+    offsets are converted to naive time of the timezone.
+    """
+    key = ('lookup', value, tz, use_tz)
+    result = parse_cache.get(key)
+    if result is None:
+        result = _parse_datetime(value)
+        if use_tz:
+            if result.tzinfo is None:
+                result = result.replace(tzinfo=tz)
+        elif result.tzinfo is not None:
+            result = make_naive(result, tz)
+        parse_cache.set(key, result)
+    return result
+
+
+def _parse_datetime(value):
+    match = DATETIME_RE.match(value)
+    if match:
+        return _datetime_from_match(match)
+    return _strptime(value)
+
+
+def _datetime_from_match(match):
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    tzinfo = None
+    if offset == 'Z':
+        tzinfo = get_fixed_timezone(0)
+    elif offset:
+        sign = -1 if offset[0] == '-' else 1
+        digits = offset[1:].replace(':', '')
+        tzinfo = get_fixed_timezone(
+            sign * (int(digits[:2]) * 60 + int(digits[2:] or 0)),
+        )
+    return datetime(
+        int(year),
+        int(month),
+        int(day),
+        int(hour or 0),
+        int(minute or 0),
+        int(second or 0),
+        int(fraction.ljust(6, '0')) if fraction else 0,
+        tzinfo,
+    )
+
+
+def _strptime(value):
+    mask = '%Y-%m-%d'
+    if len(value) > 10:
+        mask += ' %H:%M'
+    if len(value) > 16:
+        mask += ':%S'
+    return datetime.strptime(value, mask)
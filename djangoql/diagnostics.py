@@ -0,0 +1,208 @@
+"""
+Error-recovering check of DjangoQL searches.
+
+Parsers stop on the first error, which is fine for applying a search, but
+not for reporting problems to a user. diagnose() continues after errors and
+returns all lexical, syntax and schema errors it can find in one pass, each
+one with its line and column, when known.
+"""
+from __future__ import unicode_literals
+
+from .ast import Const, Expression, List, Param
+from .exceptions import (
+    DjangoQLError, DjangoQLLexerError, DjangoQLParserError,
+)
+from .rdparser import DjangoQLRDParser, DjangoQLScanner, Token
+
+
+class RecoveringScanner(DjangoQLScanner):
+    """
+    Scanner that reports illegal characters as ERROR tokens, instead of
+    raising an exception on the first one
+    """
+    def __init__(self):
+        super(RecoveringScanner, self).__init__()
+        self.errors = []
+
+    def reset(self):
+        self.errors = []
+        self.error_pos = None
+        return super(RecoveringScanner, self).reset()
+
+    def token(self):
+        try:
+            return super(RecoveringScanner, self).token()
+        except DjangoQLLexerError as e:
+            self.errors.append(e)
+            pos = self.error_pos
+            if self.text[pos] == '"':
+                # Unterminated string, the rest of input can't be trusted
+                end = len(self.text)
+            else:
+                end = pos + 1
+            self.pos = end
+            return Token('ERROR', self.text[pos:end], self.lineno, pos)
+
+    def illegal_character(self, pos):
+        self.error_pos = pos
+        super(RecoveringScanner, self).illegal_character(pos)
+
+
+class RecoveringParser(DjangoQLRDParser):
+    """
+    Parser that skips invalid parts of input and collects errors.
+
+    Instead of AST, parse() returns a list of (comparison, tokens) pairs for
+    all comparisons that were parsed successfully.
+    """
+    # Tokens where parsing can be resumed after an invalid comparison
+    sync_tokens = ('AND', 'OR', 'PAREN_R')
+
+    def __init__(self, **kwargs):
+        super(RecoveringParser, self).__init__(**kwargs)
+        self.default_lexer = RecoveringScanner()
+        self.errors = []
+
+    def parse(self, input=None, lexer=None, **kwargs):
+        lexer = lexer or self.default_lexer
+        if input is not None:
+            lexer.input(input)
+        self.lexer = lexer
+        self.errors = []
+        self.tokens = tokens = list(lexer)
+        self.index = 0
+        count = len(tokens)
+        comparisons = []
+        depth = 0
+        expect_expression = True
+        while self.index < count:
+            start = self.index
+            t = tokens[start]
+            if expect_expression:
+                self.index += 1
+                if t.type == 'PAREN_L':
+                    depth += 1
+                elif t.type == 'NAME':
+                    try:
+                        comparison = self.parse_comparison(t, self.token)
+                    except DjangoQLParserError as e:
+                        # Resume from the token that caused the error, or
+                        # from the closest token where next expression
+                        # might start
+                        self.index = self.last_index
+                        self.add_error(e, tokens[self.index:self.index + 1])
+                        sync_tokens = self.sync_tokens
+                        while self.index < count and \
+                                tokens[self.index].type not in sync_tokens:
+                            self.index += 1
+                    else:
+                        comparisons.append(
+                            (comparison, tokens[start:self.index]),
+                        )
+                    expect_expression = False
+                else:
+                    # Skip unexpected token and keep expecting an expression
+                    self.add_error(self.syntax_error(t), [t])
+            elif t.type in ('AND', 'OR'):
+                self.index += 1
+                expect_expression = True
+            elif t.type == 'PAREN_R' and depth:
+                self.index += 1
+                depth -= 1
+            elif t.type in ('NAME', 'PAREN_L'):
+                # Most likely, logical operator is missing. Report it and
+                # continue with the next expression
+                self.add_error(self.syntax_error(t), [t])
+                expect_expression = True
+            else:
+                self.index += 1
+                self.add_error(self.syntax_error(t), [t])
+        if (expect_expression or depth) and not self.errors_at_end():
+            self.add_error(self.syntax_error(None), [])
+        return comparisons
+
+    def token(self):
+        self.last_index = self.index
+        if self.index == len(self.tokens):
+            return None
+        self.index += 1
+        return self.tokens[self.last_index]
+
+    def errors_at_end(self):
+        return any(e.line is None for e in self.errors)
+
+    def add_error(self, error, tokens):
+        # Illegal characters are already reported by scanner
+        if not tokens or tokens[0].type != 'ERROR':
+            self.errors.append(error)
+
+    def syntax_error(self, token):
+        try:
+            self.error(token)
+        except DjangoQLParserError as e:
+            return e
+
+
+def diagnose(search, schema_instance=None):
+    """
+    Returns a list of all errors found in given search, ordered by position.
+
+    If schema instance is provided, fields and values of all syntactically
+    valid comparisons are checked against it, too. An empty list means that
+    the search is valid.
+    """
+    parser = RecoveringParser()
+    comparisons = parser.parse(search)
+    errors = parser.lexer.errors + parser.errors
+    if schema_instance is not None:
+        for comparison, tokens in comparisons:
+            errors.extend(schema_errors(
+                schema_instance,
+                comparison,
+                tokens,
+                parser.lexer,
+            ))
+    # Errors without position are about the end of input, so they go last
+    errors.sort(key=lambda e: (e.line is None, e.line, e.column or 0))
+    return errors
+
+
+def schema_errors(schema_instance, comparison, tokens, lexer):
+    """
+    Checks a single comparison against schema.
+
+    Errors about unknown fields point at the name, errors about values point
+    at the values themselves, and every value of a list is checked.
+    """
+    name_token = tokens[0]
+    try:
+        schema_instance.resolve_name(comparison.left)
+    except DjangoQLError as e:
+        return [set_position(e, name_token, lexer)]
+    if isinstance(comparison.right, Param):
+        return []
+    if isinstance(comparison.right, List):
+        value_tokens = [t for t in tokens[3:] if t.type in
+                        DjangoQLRDParser.list_value_types]
+        values = comparison.right.items
+    else:
+        value_tokens = tokens[-1:]
+        values = [comparison.right]
+    errors = []
+    for value, value_token in zip(values, value_tokens):
+        try:
+            schema_instance.validate_comparison(Expression(
+                left=comparison.left,
+                operator=comparison.operator,
+                right=Const(value=value.value),
+            ))
+        except DjangoQLError as e:
+            errors.append(set_position(e, value_token, lexer))
+    return errors
+
+
+def set_position(error, token, lexer):
+    if error.line is None:
+        error.line = token.lineno
+        error.column = lexer.find_column(token)
+    return error
@@ -28,5 +28,9 @@ class DjangoQLParserError(DjangoQLSyntaxError):
     pass
 
 
+class DjangoQLLimitError(DjangoQLSyntaxError):
+    pass
+
+
 class DjangoQLSchemaError(DjangoQLError):
     pass
@@ -1,14 +1,43 @@
 from __future__ import unicode_literals
 
-import ply.lex as lex
-from ply.lex import TOKEN
-
 from .exceptions import DjangoQLLexerError
 
 
+def TOKEN(regex):
+    """
+    Same as ply.lex.TOKEN, defined here to avoid importing PLY on import
+    """
+    def set_regex(f):
+        f.regex = regex
+        return f
+    return set_regex
+
+
 class DjangoQLLexer(object):
+    """
+    PLY-based lexer.
+
+    Lexing takes linear time in the length of input. Token regexes have no
+    nested or overlapping repetitions, so each of them scans at most a few
+    times the length of the token it tries, and every character is consumed
+    by one token only. Please keep it this way when changing the rules below,
+    see also djangoql.limits.
+    """
     def __init__(self, **kwargs):
-        self._lexer = lex.lex(module=self, **kwargs)
+        if kwargs:
+            import ply.lex as lex
+            self._lexer = lex.lex(module=self, **kwargs)
+        else:
+            # Building PLY lexer involves validation of rules and compilation
+            # of the master regex, so it's done once per class. Instances get
+            # clones of it, bound to their own rule methods.
+            cls = self.__class__
+            if '_lexer_template' not in cls.__dict__:
+                import ply.lex as lex
+                cls._lexer_template = lex.lex(module=self)
+            self._lexer = cls._lexer_template.clone(self)
+            # Activate rules of the clone, including error handler
+            self._lexer.begin('INITIAL')
         self.reset()
 
     def reset(self):
@@ -23,7 +52,12 @@ class DjangoQLLexer(object):
         return self
 
     def token(self):
-        return self._lexer.token()
+        t = self._lexer.token()
+        if t is not None:
+            # Tokens produced by rule functions refer to the underlying PLY
+            # lexer, which can't tell token columns in error messages
+            t.lexer = self
+        return t
 
     # Iterator interface
     def __iter__(self):
@@ -69,6 +103,7 @@ class DjangoQLLexer(object):
         'FALSE',
         'NONE',
         'NAME',
+        'PARAMETER',
         'STRING_VALUE',
         'FLOAT_VALUE',
         'INT_VALUE',
@@ -100,6 +135,13 @@ class DjangoQLLexer(object):
 
     t_ignore = whitespace
 
+    re_parameter = r':[_A-Za-z][_0-9A-Za-z]*'
+
+    @TOKEN(re_parameter)
+    def t_PARAMETER(self, t):
+        t.value = t.value[1:]  # cut leading colon
+        return t
+
     @TOKEN(r'\"(' + re_escaped_char +
            '|' + re_escaped_unicode +
            '|' + re_string_char + r')*\"')
@@ -0,0 +1,110 @@
+"""
+Limits on the size of searches, checked before they're parsed.
+
+Lexing takes linear time (see DjangoQLLexer), parsers, AST validation and
+conversion to Q-objects are iterative, so no input can make them explode.
+Still, the cost of a search grows with its size, and searches come from
+users, so the following limits can be configured in settings:
+
+- DJANGOQL_MAX_QUERY_LENGTH, in characters, off by default;
+- DJANGOQL_MAX_NESTING_DEPTH, of parenthesis, 100 by default;
+- DJANGOQL_MAX_LIST_SIZE, the number of values in "in" lists, off by
+  default.
+
+None or 0 disables a limit. Long "or" chains and lists of 100k values are
+supported workloads (see benchmarks/), so only nesting depth, which no flat
+search comes close to, is limited out of the box.
+"""
+from __future__ import unicode_literals
+
+from django.conf import settings
+
+from .exceptions import DjangoQLLimitError
+from .rdparser import DjangoQLScanner
+
+
+DEFAULT_MAX_QUERY_LENGTH = None
+DEFAULT_MAX_NESTING_DEPTH = 100
+DEFAULT_MAX_LIST_SIZE = None
+
+
+def get_limits():
+    """
+    Returns (max_length, max_depth, max_list_size) configured in settings
+    """
+    return (
+        getattr(settings, 'DJANGOQL_MAX_QUERY_LENGTH',
+                DEFAULT_MAX_QUERY_LENGTH),
+        getattr(settings, 'DJANGOQL_MAX_NESTING_DEPTH',
+                DEFAULT_MAX_NESTING_DEPTH),
+        getattr(settings, 'DJANGOQL_MAX_LIST_SIZE', DEFAULT_MAX_LIST_SIZE),
+    )
+
+
+def check_limits(search, max_length=None, max_depth=None,
+                 max_list_size=None):
+    """
+    Raises DjangoQLLimitError if search exceeds any of given limits.
+
+    Nesting depth and list sizes are counted in a single pass of the
+    hand-written scanner, which is skipped for searches without parenthesis.
+    Lexer errors found during the pass are raised as is.
+    """
+    if max_length and len(search) > max_length:
+        raise DjangoQLLimitError(
+            'Search is too long: %s characters, the limit is %s' % (
+                len(search),
+                max_length,
+            )
+        )
+    if not (max_depth or max_list_size) or '(' not in search:
+        return
+    scanner = DjangoQLScanner().input(search)
+    depth = 0
+    list_size = None  # not inside a list
+    after_in = False
+    for t in scanner:
+        token_type = t.type
+        if list_size is not None:
+            if token_type == 'PAREN_R':
+                list_size = None
+            elif token_type != 'COMMA':
+                list_size += 1
+                if max_list_size and list_size > max_list_size:
+                    raise limit_error(
+                        'List is too long, the limit is %s values' %
+                        max_list_size,
+                        t,
+                        scanner,
+                    )
+        elif token_type == 'PAREN_L':
+            if after_in:
+                list_size = 0
+            else:
+                depth += 1
+                if max_depth and depth > max_depth:
+                    raise limit_error(
+                        'Parenthesis are nested too deep, the limit is %s' %
+                        max_depth,
+                        t,
+                        scanner,
+                    )
+        elif token_type == 'PAREN_R':
+            depth -= 1
+        after_in = token_type == 'IN'
+
+
+def check_search(search):
+    """
+    Checks search against limits configured in settings
+    """
+    check_limits(search, *get_limits())
+
+
+def limit_error(message, token, scanner):
+    return DjangoQLLimitError(
+        message=message,
+        value=token.value,
+        line=token.lineno,
+        column=scanner.find_column(token),
+    )
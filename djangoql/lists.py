@@ -0,0 +1,146 @@
+"""
+Strategies for comparisons with large "in" lists.
+
+Plain "field IN (%s, %s, ...)" binds every value as a separate parameter,
+which may exceed the limit on query variables in SQLite, and makes
+PostgreSQL parse and plan huge statements. Lists longer than
+DJANGOQL_LARGE_LIST_THRESHOLD values (1000 by default) are compared with
+the "djangoql_in" lookup instead, which compiles them with a strategy chosen
+for the database vendor:
+
+- "array": "field = ANY(%s::type[])", a single array parameter. Default for
+  PostgreSQL;
+- "json": "field IN (SELECT value FROM json_each(%s))", a single JSON
+  parameter joined as a table. Default for SQLite, needs JSON1 extension,
+  which is built in since SQLite 3.38 and enabled in most earlier builds;
+- "chunks": "(field IN (...) OR field IN (...))" with up to
+  DJANGOQL_LIST_CHUNK_SIZE values (1000 by default) per IN. Default for
+  other databases.
+
+Strategies for vendors can be changed with DJANGOQL_LARGE_LIST_STRATEGIES
+setting, a dict of vendor -> strategy name or dotted path to a function
+with the same signature as strategies below. "not in" comparisons negate
+the lookup, so they use the same strategies.
+
+The lookup needs Django 2.0 or later. With older versions, lists of any
+length are compared with plain "__in".
+"""
+from __future__ import unicode_literals
+
+import json
+
+import django
+from django.conf import settings
+from django.db.models import Field
+from django.db.models.lookups import In
+from django.utils.module_loading import import_string
+
+from .compat import text_type
+
+try:
+    from django.core.exceptions import EmptyResultSet
+except ImportError:  # Django < 1.11
+    from django.db.models.sql.datastructures import EmptyResultSet
+
+
+DEFAULT_LARGE_LIST_THRESHOLD = 1000
+DEFAULT_LIST_CHUNK_SIZE = 1000
+
+# Strategies use Lookup.batch_process_rhs() and Field.cast_db_type()
+LARGE_LISTS_SUPPORTED = django.VERSION >= (2, 0)
+
+
+def array_strategy(lookup, compiler, connection):
+    lhs, params = lookup.process_lhs(compiler, connection)
+    db_type = lookup.lhs.output_field.cast_db_type(connection)
+    params.append(lookup_params(lookup, compiler, connection))
+    return '%s = ANY(%%s::%s[])' % (lhs, db_type), params
+
+
+def json_strategy(lookup, compiler, connection):
+    lhs, params = lookup.process_lhs(compiler, connection)
+    params.append(json.dumps(
+        lookup_params(lookup, compiler, connection),
+        default=text_type,
+    ))
+    return '%s IN (SELECT value FROM json_each(%%s))' % lhs, params
+
+
+def chunks_strategy(lookup, compiler, connection):
+    lhs, lhs_params = lookup.process_lhs(compiler, connection)
+    values = lookup_params(lookup, compiler, connection)
+    chunk_size = getattr(settings, 'DJANGOQL_LIST_CHUNK_SIZE',
+                         DEFAULT_LIST_CHUNK_SIZE)
+    sql = []
+    params = []
+    for offset in range(0, len(values), chunk_size):
+        chunk = values[offset:offset + chunk_size]
+        sql.append('%s IN (%s)' % (lhs, ', '.join(['%s'] * len(chunk))))
+        params.extend(lhs_params)
+        params.extend(chunk)
+    return '(%s)' % ' OR '.join(sql), params
+
+
+STRATEGIES = {
+    'array': array_strategy,
+    'chunks': chunks_strategy,
+    'json': json_strategy,
+}
+
+DEFAULT_STRATEGIES = {
+    'postgresql': 'array',
+    'sqlite': 'json',
+}
+
+
+def lookup_params(lookup, compiler, connection):
+    """
+    Returns values of the lookup prepared for the database
+    """
+    if not lookup.rhs:
+        raise EmptyResultSet
+    _, params = lookup.batch_process_rhs(compiler, connection)
+    return list(params)
+
+
+def get_strategy(vendor):
+    strategies = getattr(settings, 'DJANGOQL_LARGE_LIST_STRATEGIES', {})
+    strategy = strategies.get(vendor) or DEFAULT_STRATEGIES.get(vendor)
+    if strategy is None:
+        return chunks_strategy
+    if strategy in STRATEGIES:
+        return STRATEGIES[strategy]
+    return import_string(strategy)
+
+
+def get_large_list_threshold():
+    return getattr(settings, 'DJANGOQL_LARGE_LIST_THRESHOLD',
+                   DEFAULT_LARGE_LIST_THRESHOLD)
+
+
+def list_operator(op, values):
+    """
+    Replaces "__in" lookup suffix with "__djangoql_in" for large lists
+    """
+    if op != '__in' or not LARGE_LISTS_SUPPORTED:
+        return op
+    threshold = get_large_list_threshold()
+    if threshold and len(values) > threshold:
+        return '__' + LargeIn.lookup_name
+    return op
+
+
+class LargeIn(In):
+    """
+    "in" lookup that compiles long lists of values with a strategy
+    """
+    lookup_name = 'djangoql_in'
+
+    def as_sql(self, compiler, connection):
+        if not self.rhs_is_direct_value():
+            return super(LargeIn, self).as_sql(compiler, connection)
+        return get_strategy(connection.vendor)(self, compiler, connection)
+
+
+if LARGE_LISTS_SUPPORTED:
+    Field.register_lookup(LargeIn)
@@ -0,0 +1,144 @@
+"""
+Explicit compilation of negated comparisons, "!=", "!~" and "not in".
+
+By default they're compiled as negated Q-objects, like ~Q(rating=3), which
+Django expands into "NOT (rating = 3 AND rating IS NOT NULL)", and into
+"NOT (id IN (SELECT ...))" subqueries for paths over to-many relations.
+With DJANGOQL_EXPLICIT_NEGATION setting, they're compiled into plain
+predicates instead:
+
+- "rating <> 3 OR rating IS NULL", where "IS NULL" is added only if the
+  field, or a relation leading to it, is nullable in the schema;
+- "name NOT IN (...)" and "NOT (name LIKE ...)" for "not in" and "!~";
+- "rating IS NOT NULL" for comparisons with None;
+- "NOT EXISTS(SELECT ...)" correlated subqueries for paths over to-many
+  relations, see djangoql.subqueries.
+
+Results are the same. Lists with None, empty lists, large lists (see
+djangoql.lists), comparisons of to-many relations with None and fields with
+custom get_lookup() are compiled as before. So are comparisons over to-many
+relations that positive comparisons of the same search may JOIN, like
+'book.price in (1.5, 3) and book.rating != 4', because Django correlates
+their subqueries with the JOINed row.
+"""
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Field
+from django.db.models.lookups import Exact, IContains, In
+
+from .ast import Logical, Truth
+from .lists import list_operator
+from .subqueries import to_many_relation
+
+
+POSITIVE_OPERATORS = {
+    '!=': '=',
+    '!~': '~',
+    'not in': 'in',
+}
+
+
+@Field.register_lookup
+class NotEqual(Exact):
+    lookup_name = 'djangoql_ne'
+
+    def get_rhs_op(self, connection, rhs):
+        return '<> %s' % rhs
+
+
+@Field.register_lookup
+class NotIn(In):
+    lookup_name = 'djangoql_not_in'
+
+    def get_rhs_op(self, connection, rhs):
+        return 'NOT IN %s' % rhs
+
+    def split_parameter_list_as_sql(self, compiler, connection):
+        # Databases that limit the size of IN lists get "(a IN (...) OR
+        # a IN (...))", so it's negated as a whole
+        sql, params = In(self.lhs, self.rhs).split_parameter_list_as_sql(
+            compiler,
+            connection,
+        )
+        return 'NOT %s' % sql, params
+
+
+@Field.register_lookup
+class NotIContains(IContains):
+    lookup_name = 'djangoql_not_icontains'
+
+    def as_sql(self, compiler, connection):
+        # Compiled by IContains, so that databases apply their casts for
+        # case-insensitive comparisons
+        sql, params = IContains(self.lhs, self.rhs).as_sql(
+            compiler,
+            connection,
+        )
+        return 'NOT (%s)' % sql, params
+
+
+def explicit_negation_enabled():
+    return getattr(settings, 'DJANGOQL_EXPLICIT_NEGATION', False)
+
+
+def joined_names(ast):
+    """
+    Returns name parts of positive comparisons of given AST, which Django
+    may compile into JOINs
+    """
+    names = []
+    pending = [ast]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, Truth):
+            continue
+        if isinstance(node.operator, Logical):
+            pending.append(node.right)
+            pending.append(node.left)
+        elif node.operator.operator not in POSITIVE_OPERATORS:
+            names.append(node.left.parts)
+    return names
+
+
+def negated_lookup(schema_instance, name, field, operator, value,
+                   joined=()):
+    """
+    Returns Q-object for a negated comparison of a field with default
+    lookups, or None if it should be compiled by the field. joined are name
+    parts of positive comparisons of the search, see joined_names().
+    """
+    if isinstance(value, list) and (not value or None in value):
+        return None
+    relation = to_many_relation(schema_instance, name)
+    if relation is not None:
+        if value is None or any(
+            parts[:len(relation.prefix)] == relation.prefix
+            for parts in joined
+        ):
+            return None
+        return ~relation.exists(field.get_lookup(
+            path=list(name.parts[len(relation.prefix):-1]),
+            operator=POSITIVE_OPERATORS[operator],
+            value=value,
+        ))
+    search = '__'.join(list(name.parts[:-1]) + [field.get_lookup_name()])
+    if value is None:
+        return models.Q(**{'%s__isnull' % search: False})
+    if operator == 'not in':
+        value = field.get_list_lookup_value(value)
+        if not value or list_operator('__in', value) != '__in':
+            return None
+        lookup = NotIn.lookup_name
+    elif operator == '!~':
+        value = field.get_lookup_value(value)
+        lookup = NotIContains.lookup_name
+    else:
+        value = field.get_lookup_value(value)
+        lookup = NotEqual.lookup_name
+    q = models.Q(**{'%s__%s' % (search, lookup): value})
+    _, relations = schema_instance.resolve_path(name)
+    if field.nullable or any(relation.nullable for relation in relations):
+        q |= models.Q(**{'%s__isnull' % search: True})
+    return q
@@ -0,0 +1,484 @@
+"""
+Rule-based optimizer of DjangoQL ASTs.
+
+optimize() rewrites a validated AST into an equivalent one, which is cheaper
+to filter with. Built-in rules are:
+
+- "flatten": operands of nested chains of the same logical operator are
+  merged into the chain;
+- "dedupe": repeated operands are dropped, like the second "a != None" in
+  "a != None and a != None";
+- "merge_in": equality comparisons of the same field joined with "or" are
+  merged into "in", like "a = 1 or a = 2" into "a in (1, 2)", and
+  inequality comparisons joined with "and" are merged into "not in";
+- "contradictions": chains that can't match anything, like "a = 1 and
+  a = 2", and chains that match everything, like "a = None or a != None",
+  are replaced with Truth nodes, which are then folded into enclosing chains;
+- "order_by_cost": cheap operands go first, e.g. comparisons of the model's
+  own fields go before comparisons over relations, which need joins.
+
+Chains that compare fields over to-many relations are only flattened.
+Django correlates negated comparisons of a to-many relation with its join
+only if the join comes earlier in the same filter, so moving, merging or
+dropping such comparisons, or operands that join the relation, may change
+results.
+
+Rules are functions of (operator, operands, schema_instance), which return a
+new list of operands for a chain of the given logical operator. They are
+applied to every chain, innermost chains first, in order. Rules only rewrite
+comparisons of fields that use default lookups, see has_default_lookup(),
+because custom get_lookup() may give operators any meaning.
+
+The optimizer is disabled by default, since it changes generated SQL. Set
+DJANGOQL_OPTIMIZE to True to run it in apply_search() and compile_search(),
+between validation and building filters. DJANGOQL_OPTIMIZER_RULES setting
+lists names of the rules above or dotted paths to custom rules. For
+debugging, explain() returns every change made by rules, and report() formats
+them as text.
+"""
+from __future__ import unicode_literals
+
+import json
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .ast import (
+    Comparison, Const, Expression, List, Logical, Param, Truth,
+    logical_operands,
+)
+from .compat import text_type
+from .schema import has_default_lookup, unique
+
+
+# Change of a chain made by a rule. before and after are ASTs of the chain.
+Step = namedtuple('Step', ['rule', 'before', 'after'])
+
+# Operators merged by merge_in(), single value and list ones
+MERGED_OPERATORS = {
+    'or': ('=', 'in'),
+    'and': ('!=', 'not in'),
+}
+
+# Relative costs used by order_by_cost(). LIKE with a leading wildcard can't
+# use indexes, and every relation in a path adds a join.
+COMPARISON_COST = 1
+OPERATOR_COSTS = {
+    '~': 4,
+    '!~': 4,
+}
+JOIN_COST = 2
+LIST_VALUES_PER_COST = 100
+
+
+def flatten(operator, operands, schema_instance):
+    """
+    Splices operands of nested chains of the same operator, which appear when
+    other rules reduce a chain to a single operand
+    """
+    result = []
+    for operand in operands:
+        if isinstance(operand.operator, Logical) and \
+                operand.operator.operator == operator:
+            result.extend(logical_operands(operand))
+        else:
+            result.append(operand)
+    return result
+
+
+def dedupe(operator, operands, schema_instance):
+    """
+    Drops repeated operands, keeping the first one
+    """
+    return list(OrderedDict((operand, operand) for operand in operands))
+
+
+def merge_in(operator, operands, schema_instance):
+    """
+    Merges "a = 1 or a = 2 or a in (3, 4)" into "a in (1, 2, 3, 4)", and
+    "a != 1 and a not in (2, 3)" into "a not in (1, 2, 3)". The merged
+    comparison takes place of the first one.
+    """
+    single, many = MERGED_OPERATORS[operator]
+    groups = OrderedDict()
+    for i, operand in enumerate(operands):
+        if not isinstance(operand.operator, Comparison):
+            continue
+        op = operand.operator.operator
+        right = operand.right
+        if op == single and isinstance(right, Const) and \
+                right.value is not None or \
+                op == many and isinstance(right, List):
+            groups.setdefault(operand.left, []).append(i)
+    merged = {}
+    for name, indexes in groups.items():
+        if len(indexes) < 2:
+            continue
+        field = resolve_field(schema_instance, name)
+        if field is None or field[0] is None:
+            continue
+        values = []
+        for i in indexes:
+            right = operands[i].right
+            if isinstance(right, List):
+                values.extend(right.value)
+            else:
+                values.append(right.value)
+        merged[indexes[0]] = Expression(
+            name,
+            Comparison(many),
+            List([Const(value) for value in unique(values)]),
+        )
+        merged.update((i, None) for i in indexes[1:])
+    if not merged:
+        return operands
+    result = []
+    for i, operand in enumerate(operands):
+        if i in merged:
+            operand = merged[i]
+        if operand is not None:
+            result.append(operand)
+    return result
+
+
+def contradictions(operator, operands, schema_instance):
+    """
+    Replaces "and" chains that can't match anything, like "a = 1 and a = 2"
+    or "a in (1, 2) and a != 1 and a != 2", with Truth(False), and "or"
+    chains that match everything, like "a = 1 or a != 1", with Truth(True).
+
+    Different strings are never considered contradicting, since they may be
+    equal in case-insensitive collations. "or" chains are checked for fields
+    of the model and its single-valued relations only, because joins of
+    to-many relations may duplicate rows.
+    """
+    constraints = OrderedDict()
+    for operand in operands:
+        constraint = value_constraint(operand, schema_instance)
+        if constraint is None:
+            continue
+        name, negated, keys, many = constraint
+        allowed, excluded, _ = constraints.setdefault(
+            name,
+            ([], [], many),
+        )
+        (excluded if negated else allowed).append(keys)
+    for allowed, excluded, many in constraints.values():
+        if operator == 'and':
+            excluded = frozenset().union(*excluded)
+            if any(keys <= excluded for keys in allowed):
+                return [Truth(False)]
+            for i, keys in enumerate(allowed):
+                if any(disjoint(keys, other) for other in allowed[i + 1:]):
+                    return [Truth(False)]
+        elif not many and excluded:
+            # Negated comparisons match everything but excluded values and
+            # include NULLs, so they're complemented by these values
+            allowed = frozenset().union(*allowed)
+            if any(keys <= allowed for keys in excluded):
+                return [Truth(True)]
+    return operands
+
+
+def order_by_cost(operator, operands, schema_instance):
+    """
+    Sorts operands by estimated cost, see cost(). Operands of the same cost
+    keep their order.
+    """
+    costs = [cost(operand, schema_instance) for operand in operands]
+    order = sorted(range(len(operands)), key=costs.__getitem__)
+    return [operands[i] for i in order]
+
+
+RULES = OrderedDict([
+    ('flatten', flatten),
+    ('dedupe', dedupe),
+    ('merge_in', merge_in),
+    ('contradictions', contradictions),
+    ('order_by_cost', order_by_cost),
+])
+
+
+def optimizer_enabled():
+    return getattr(settings, 'DJANGOQL_OPTIMIZE', False)
+
+
+def get_rules():
+    """
+    Returns rules configured with DJANGOQL_OPTIMIZER_RULES setting
+    """
+    names = getattr(settings, 'DJANGOQL_OPTIMIZER_RULES', None)
+    if names is None:
+        return list(RULES.values())
+    return [
+        RULES[name] if name in RULES else import_string(name)
+        for name in names
+    ]
+
+
+def resolve_field(schema_instance, name):
+    """
+    Returns (field, relations) for names of fields with default lookups, or
+    None. Field is None for comparisons of related models with None.
+    """
+    field, relations = schema_instance.resolve_path(name)
+    if field is not None and not has_default_lookup(field):
+        return None
+    return field, relations
+
+
+def value_constraint(node, schema_instance):
+    """
+    Returns (name, negated, keys, many) for comparisons with "=", "!=",
+    "in" and "not in", where keys is a frozenset of lookup values, and many
+    is True for paths over to-many relations. Returns None for other nodes.
+    """
+    if not isinstance(node.operator, Comparison) or \
+            isinstance(node.right, Param):
+        return None
+    operator = node.operator.operator
+    if operator not in ('=', '!=', 'in', 'not in'):
+        return None
+    resolved = resolve_field(schema_instance, node.left)
+    if resolved is None:
+        return None
+    field, relations = resolved
+    if isinstance(node.right, List):
+        values = node.right.value
+        if None in values:
+            # NULL in SQL lists matches nothing
+            return None
+        if values and field is not None:
+            values = field.get_lookup_value(values)
+    else:
+        values = [node.right.value]
+        if values[0] is not None and field is not None:
+            values = [field.get_lookup_value(values[0])]
+    try:
+        keys = frozenset(values)
+    except TypeError:
+        # Unhashable lookup values of custom fields
+        return None
+    return (
+        node.left,
+        operator in ('!=', 'not in'),
+        keys,
+        any(relation.many for relation in relations),
+    )
+
+
+def to_many(node, schema_instance):
+    """
+    Tells if the expression compares any fields over to-many relations
+    """
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, Truth):
+            continue
+        if isinstance(node.operator, Logical):
+            pending.append(node.right)
+            pending.append(node.left)
+            continue
+        _, relations = schema_instance.resolve_path(node.left)
+        if any(relation.many for relation in relations):
+            return True
+    return False
+
+
+def disjoint(keys, other):
+    """
+    Tells if sets of lookup values certainly have no values in common
+    """
+    if keys & other:
+        return False
+    # Distinct strings may be equal in the database
+    return not (
+        any(isinstance(key, text_type) for key in keys) and
+        any(isinstance(key, text_type) for key in other)
+    )
+
+
+def cost(node, schema_instance):
+    """
+    Estimates relative cost of evaluating the expression
+    """
+    total = 0
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, Truth):
+            continue
+        if isinstance(node.operator, Logical):
+            pending.append(node.right)
+            pending.append(node.left)
+            continue
+        _, relations = schema_instance.resolve_path(node.left)
+        total += COMPARISON_COST + JOIN_COST * len(relations)
+        total += OPERATOR_COSTS.get(node.operator.operator, 0)
+        if isinstance(node.right, List):
+            total += len(node.right.items) // LIST_VALUES_PER_COST
+    return total
+
+
+def fold(operator, operands):
+    """
+    Folds Truth operands of a chain: "and" with Truth(False) matches nothing,
+    "or" with Truth(True) matches everything, other Truth operands are
+    dropped. Empty chains become Truth, too.
+    """
+    decisive = operator == 'or'
+    result = []
+    for operand in operands:
+        if isinstance(operand, Truth):
+            if operand.value == decisive:
+                return [operand]
+        else:
+            result.append(operand)
+    return result or [Truth(not decisive)]
+
+
+def keep_joins(operator, operands, original):
+    """
+    Folds Truth operands of a chain over to-many relations, see fold(), but
+    never drops other operands. Decisive Truth operands are replaced with
+    their original subtrees instead.
+    """
+    decisive = operator == 'or'
+    result = []
+    for operand, before in zip(operands, original):
+        if not isinstance(operand, Truth):
+            result.append(operand)
+        elif operand.value == decisive:
+            result.append(before)
+    return result
+
+
+def chain(operator, operands):
+    """
+    Joins operands with the logical operator into AST
+    """
+    result = operands[0]
+    for operand in operands[1:]:
+        result = Expression(result, Logical(operator), operand)
+    return result
+
+
+def optimize(ast, schema_instance, rules=None, steps=None):
+    """
+    Returns optimized AST. Rules default to get_rules(). If steps list is
+    given, a Step is appended to it for every change of a chain.
+
+    The tree is walked with an explicit stack, like in build_filter().
+    """
+    if rules is None:
+        rules = get_rules()
+    stack = [(ast, None)]
+    results = []
+    while stack:
+        node, operands = stack.pop()
+        if operands is not None:
+            children = results[-len(operands):]
+            del results[-len(operands):]
+            results.append(optimize_chain(
+                node.operator.operator,
+                children,
+                schema_instance,
+                rules,
+                steps,
+                original=operands,
+            ))
+        elif isinstance(node.operator, Logical):
+            operands = logical_operands(node)
+            stack.append((node, operands))
+            stack.extend((operand, None) for operand in reversed(operands))
+        else:
+            results.append(node)
+    return results[0]
+
+
+def optimize_chain(operator, operands, schema_instance, rules, steps=None,
+                   original=None):
+    before = operands
+    if any(to_many(operand, schema_instance) for operand in operands):
+        operands = keep_joins(operator, operands, original or operands)
+        rules = [flatten]
+    else:
+        operands = fold(operator, operands)
+    if steps is not None and changed(before, operands):
+        steps.append(Step('fold', chain(operator, before),
+                          chain(operator, operands)))
+    for rule in rules:
+        if len(operands) == 1:
+            break
+        before = operands
+        operands = fold(operator, rule(operator, operands, schema_instance))
+        if steps is not None and changed(before, operands):
+            steps.append(Step(
+                getattr(rule, '__name__', type(rule).__name__),
+                chain(operator, before),
+                chain(operator, operands),
+            ))
+    return chain(operator, operands)
+
+
+def changed(before, after):
+    return len(before) != len(after) or \
+        any(a is not b for a, b in zip(before, after))
+
+
+def explain(ast, schema_instance, rules=None):
+    """
+    Returns (optimized AST, steps), see optimize()
+    """
+    steps = []
+    return optimize(ast, schema_instance, rules=rules, steps=steps), steps
+
+
+def report(ast, schema_instance, rules=None):
+    """
+    Returns a text report of optimization: search before, every change made
+    by rules and search after
+    """
+    optimized, steps = explain(ast, schema_instance, rules=rules)
+    lines = ['before: %s' % to_search(ast)]
+    for step in steps:
+        lines.append('%s: %s => %s' % (
+            step.rule,
+            to_search(step.before),
+            to_search(step.after),
+        ))
+    lines.append('after: %s' % to_search(optimized))
+    return '\n'.join(lines)
+
+
+def to_search(node):
+    """
+    Formats AST as a search
+    """
+    if isinstance(node, Truth):
+        return '<everything>' if node.value else '<nothing>'
+    if isinstance(node.operator, Logical):
+        parts = []
+        for operand in logical_operands(node):
+            text = to_search(operand)
+            if isinstance(operand.operator, Logical):
+                text = '(%s)' % text
+            parts.append(text)
+        return (' %s ' % node.operator.operator).join(parts)
+    return '%s %s %s' % (
+        node.left.value,
+        node.operator.operator,
+        format_value(node.right),
+    )
+
+
+def format_value(node):
+    if isinstance(node, Param):
+        return ':%s' % node.name
+    if isinstance(node, List):
+        return '(%s)' % ', '.join(format_value(item) for item in node.items)
+    if isinstance(node.value, text_type):
+        return json.dumps(node.value, ensure_ascii=False)
+    return text_type(node.value)
@@ -1,10 +1,9 @@
 from __future__ import unicode_literals
 
 import re
+import threading
 from decimal import Decimal
 
-import ply.yacc as yacc
-
 from .ast import *  # noqa
 from .compat import binary_type, text_type
 from .exceptions import DjangoQLParserError
@@ -32,11 +31,54 @@ def unescape(value):
 
 
 class DjangoQLParser(object):
+    """
+    PLY-based parser.
+
+    By default, parsing tables are loaded from pre-generated djangoql.parsetab
+    module, without grammar reflection and signature checks. Subclasses, which
+    may change the grammar, and parsers created with debug or any other
+    keyword arguments of ply.yacc.yacc() are built with yacc.yacc() instead.
+    It uses tables of tabmodule only if their signature matches the grammar,
+    and builds new ones otherwise. Tables are never written unless requested,
+    so if the grammar changes, regenerate them with:
+
+        DjangoQLParser(write_tables=True, outputdir='djangoql')
+
+    If pre-generated tables can't be loaded, for example because they were
+    written by a newer PLY version, they're built with yacc.yacc() as well.
+    """
+    tabmodule = 'djangoql.parsetab'
+
     def __init__(self, debug=False, **kwargs):
         self.default_lexer = DjangoQLLexer()
         self.tokens = self.default_lexer.tokens
-        kwargs['debug'] = debug
-        self.yacc = yacc.yacc(module=self, **kwargs)
+        if debug or kwargs or type(self) is not DjangoQLParser:
+            import ply.yacc as yacc
+            kwargs['debug'] = debug
+            kwargs.setdefault('tabmodule', self.tabmodule)
+            kwargs.setdefault('write_tables', False)
+            self.yacc = yacc.yacc(module=self, **kwargs)
+        else:
+            self.yacc = self.load_tables()
+
+    def load_tables(self):
+        import ply.yacc as yacc
+        lr = yacc.LRTable()
+        try:
+            lr.read_table(self.tabmodule)
+        except (ImportError, yacc.VersionError):
+            return yacc.yacc(
+                module=self,
+                debug=False,
+                tabmodule=self.tabmodule,
+                write_tables=False,
+                errorlog=yacc.NullLogger(),
+            )
+        lr.bind_callables(dict(
+            (p.func, getattr(self, p.func))
+            for p in lr.lr_productions if p.func
+        ))
+        return yacc.LRParser(lr, self.p_error)
 
     def parse(self, input=None, lexer=None, **kwargs):
         lexer = lexer or self.default_lexer
@@ -66,6 +108,13 @@ class DjangoQLParser(object):
         """
         p[0] = Expression(left=p[1], operator=p[2], right=p[3])
 
+    def p_expression_parameter(self, p):
+        """
+        expression : name comparison_string parameter
+                   | name comparison_in_list parameter
+        """
+        p[0] = Expression(left=p[1], operator=p[2], right=p[3])
+
     def p_name(self, p):
         """
         name : NAME
@@ -179,6 +228,12 @@ class DjangoQLParser(object):
         """
         p[0] = Const(value=False)
 
+    def p_parameter(self, p):
+        """
+        parameter : PARAMETER
+        """
+        p[0] = Param(name=p[1])
+
     def p_const_list_value(self, p):
         """
         const_list_value : PAREN_L const_value_list PAREN_R
@@ -189,7 +244,9 @@ class DjangoQLParser(object):
         """
         const_value_list : const_value_list COMMA const_value
         """
-        p[0] = p[1] + [p[3]]
+        # Appending in place, concatenation would take quadratic time
+        p[1].append(p[3])
+        p[0] = p[1]
 
     def p_const_value_list_single(self, p):
         """
@@ -223,3 +280,38 @@ class DjangoQLParser(object):
             line=token.lineno,
             column=column,
         )
+
+
+# Parser class used by parse(), can be configured with DJANGOQL_PARSER
+# setting. Either DjangoQLParser or djangoql.rdparser.DjangoQLRDParser.
+parser_class = DjangoQLParser
+
+_local = threading.local()
+_creation_lock = threading.Lock()
+
+
+def set_parser_class(cls):
+    global parser_class
+    parser_class = cls
+
+
+def get_parser():
+    """
+    Returns a parser instance owned by current thread.
+
+    Parsers keep their state (lexer position, symbol stack) on the instance,
+    so they can't be shared between threads. Instead, each thread creates its
+    own parser on first use and reuses it for all subsequent calls.
+    """
+    parser = getattr(_local, 'parser', None)
+    if parser is None or parser.__class__ is not parser_class:
+        with _creation_lock:
+            parser = _local.parser = parser_class()
+    return parser
+
+
+def parse(input):
+    """
+    Parses input with a parser owned by current thread
+    """
+    return get_parser().parse(input)
@@ -1,20 +1,149 @@
+from collections import OrderedDict
+
+from django.db import models
 from django.db.models import QuerySet
 
-from .ast import Logical
-from .parser import DjangoQLParser
-from .schema import DjangoQLField, DjangoQLSchema
+from .ast import Logical, Param, Truth, logical_operands
+from .cache import LRUCache, get_query_cache
+from .exceptions import DjangoQLSchemaError
+from .limits import check_search
+from .negation import (
+    POSITIVE_OPERATORS, explicit_negation_enabled, joined_names,
+    negated_lookup,
+)
+from .optimizer import optimize, optimizer_enabled
+from .parser import parse
+from .schema import DjangoQLField, DjangoQLSchema, has_default_lookup
+from .subqueries import (
+    ToManyRelation, subqueries_enabled, subquery_relations,
+)
+
+
+# Recently parsed searches, query string -> AST. The size can be configured
+# with DJANGOQL_PARSE_CACHE_SIZE setting, 0 disables caching.
+parse_cache = LRUCache(maxsize=1000)
 
 
-def build_filter(expr, schema_instance):
-    if isinstance(expr.operator, Logical):
-        left = build_filter(expr.left, schema_instance)
-        right = build_filter(expr.right, schema_instance)
-        if expr.operator.operator == 'or':
-            return left | right
+def build_filter(expr, schema_instance, params=None):
+    """
+    Converts DjangoQL AST into a Q-object. Values of bind placeholders, like
+    :uid, are taken from params dict.
+
+    The tree is walked with an explicit stack, so that the size of input is
+    not limited by Python recursion limit. Chains of the same logical
+    operator, like "a = 1 or a = 2 or a = 3", are collapsed into a single
+    n-ary Q-object.
+
+    With DJANGOQL_EXISTS_SUBQUERIES setting, comparisons over to-many
+    relations are grouped into EXISTS subqueries, see djangoql.subqueries.
+    """
+    if isinstance(expr, Truth):
+        # Optimized search that matches everything or nothing
+        return models.Q() if expr.value else models.Q(pk__in=[])
+    relations = {}
+    if subqueries_enabled():
+        relations = subquery_relations(expr, schema_instance, params)
+    joined = ()
+    if explicit_negation_enabled():
+        joined = joined_names(expr)
+    stack = [(expr, None)]
+    # (Q-object, ToManyRelation of the subquery it belongs to or None)
+    results = []
+    while stack:
+        node, operands = stack.pop()
+        if operands is not None:
+            children = results[-len(operands):]
+            del results[-len(operands):]
+            results.append(combine_relations(
+                node.operator.operator,
+                children,
+            ))
+        elif isinstance(node.operator, Logical):
+            operands = logical_operands(node)
+            stack.append((node, operands))
+            stack.extend((operand, None) for operand in reversed(operands))
         else:
-            return left & right
+            relation = relations.get(id(node))
+            results.append((
+                build_lookup(
+                    node,
+                    schema_instance,
+                    params,
+                    offset=len(relation.prefix) if relation else 0,
+                    joined=joined,
+                ),
+                relation,
+            ))
+    q, relation = results[0]
+    return relation.exists(q) if relation else q
+
+
+def combine_relations(operator, children):
+    """
+    Combines (Q-object, relation) pairs of build_filter(). If all children
+    belong to the same relation, so does the result, otherwise children of
+    every relation are combined into one subquery.
+    """
+    relations = set(relation for _, relation in children)
+    if len(relations) == 1:
+        return combine(operator, [q for q, _ in children]), relations.pop()
+    grouped = OrderedDict()
+    for q, relation in children:
+        grouped.setdefault(relation or object(), []).append(q)
+    return combine(operator, [
+        relation.exists(combine(operator, qs))
+        if isinstance(relation, ToManyRelation) else qs[0]
+        for relation, qs in grouped.items()
+    ]), None
+
+
+def combine(operator, children):
+    """
+    Combines Q-objects with given logical operator into a single Q-object
+    """
+    q = models.Q()
+    q.connector = models.Q.OR if operator == 'or' else models.Q.AND
+    for child in children:
+        if isinstance(child, models.Q) and not child.negated and (
+            len(child.children) == 1 or child.connector == q.connector
+        ):
+            q.children.extend(child.children)
+        else:
+            q.children.append(child)
+    return q
+
 
+def build_lookup(expr, schema_instance, params=None, offset=0, joined=()):
+    """
+    Converts comparison into a Q-object. offset is the number of leading
+    parts of the name to skip, for lookups in subqueries of related models.
+    joined are name parts of positive comparisons of the search, for
+    DJANGOQL_EXPLICIT_NEGATION setting, see negation.negated_lookup().
+    """
     field = schema_instance.resolve_name(expr.left)
+    operator = expr.operator.operator
+    if isinstance(expr.right, Param):
+        value = param_value(expr.right, operator, params)
+        schema_instance.validate_value(
+            expr.left,
+            field,
+            value,
+            many=is_list_operator(operator),
+        )
+    else:
+        value = expr.right.value
+    if field and not offset and operator in POSITIVE_OPERATORS and \
+            explicit_negation_enabled() and has_default_lookup(field):
+        q = negated_lookup(
+            schema_instance,
+            expr.left,
+            field,
+            operator,
+            value,
+            joined,
+        )
+        if q is not None:
+            return q
     if not field:
         # That must be a reference to a model without specifying a field.
         # Let's construct an abstract lookup field for it
@@ -23,25 +152,84 @@ def build_filter(expr, schema_instance):
             nullable=True,
         )
     return field.get_lookup(
-        path=expr.left.parts[:-1],
-        operator=expr.operator.operator,
-        value=expr.right.value,
+        path=list(expr.left.parts[offset:-1]),
+        operator=operator,
+        value=value,
     )
 
 
-def apply_search(queryset, search, schema=None):
+def is_list_operator(operator):
+    return operator in ('in', 'not in')
+
+
+def param_value(param, operator, params):
     """
-    Applies search written in DjangoQL mini-language to given queryset
+    Returns value of a bind placeholder from params dict
+    """
+    if not params or param.name not in params:
+        raise DjangoQLSchemaError(
+            'Missing value for parameter :%s' % param.name,
+        )
+    value = params[param.name]
+    if is_list_operator(operator):
+        if not isinstance(value, (list, tuple)):
+            raise DjangoQLSchemaError(
+                'Parameter :%s must be a list or tuple of values, not %s' % (
+                    param.name,
+                    type(value).__name__,
+                )
+            )
+        value = list(value)
+    return value
+
+
+def parse_search(search):
+    """
+    Returns AST for given search, reusing ASTs of recently parsed searches.
+
+    Returned ASTs are shared between callers and must not be modified.
+    """
+    ast = parse_cache.get(search)
+    if ast is None:
+        check_search(search)
+        ast = parse(search)
+        parse_cache.set(search, ast)
+    return ast
+
+
+def apply_search(queryset, search, schema=None, params=None):
+    """
+    Applies search written in DjangoQL mini-language to given queryset.
+    Values of bind placeholders used in search are taken from params dict.
     """
-    ast = DjangoQLParser().parse(search)
     schema = schema or DjangoQLSchema
     schema_instance = schema(queryset.model)
-    schema_instance.validate(ast)
-    return queryset.filter(build_filter(ast, schema_instance))
+    ast = parse_cache.get(search)
+    if ast is not None:
+        schema_instance.validate(ast)
+    else:
+        query_cache = get_query_cache()
+        if query_cache is not None:
+            ast = query_cache.get(search, schema_instance)
+        if ast is None:
+            check_search(search)
+            ast = parse(search)
+            schema_instance.validate(ast)
+            if query_cache is not None:
+                query_cache.set(search, schema_instance, ast)
+        parse_cache.set(search, ast)
+    if optimizer_enabled():
+        ast = optimize(ast, schema_instance)
+    return queryset.filter(build_filter(ast, schema_instance, params))
 
 
 class DjangoQLQuerySet(QuerySet):
     djangoql_schema = None
 
-    def djangoql(self, search, schema=None):
-        return apply_search(self, search, schema=schema or self.djangoql_schema)
+    def djangoql(self, search, schema=None, params=None):
+        return apply_search(
+            self,
+            search,
+            schema=schema or self.djangoql_schema,
+            params=params,
+        )
@@ -0,0 +1,347 @@
+"""
+Hand-written scanner and parser for DjangoQL, an alternative to PLY backend.
+
+Both produce exactly the same tokens, AST nodes and error messages as
+DjangoQLLexer and DjangoQLParser, but don't depend on PLY, need no generated
+tables and have much lower per-token overhead.
+"""
+from __future__ import unicode_literals
+
+import re
+from decimal import Decimal
+
+from .ast import Comparison, Const, Expression, List, Logical, Name, Param
+from .compat import text_type
+from .exceptions import DjangoQLLexerError, DjangoQLParserError
+from .lexer import DjangoQLLexer
+from .parser import unescape
+
+
+class Token(object):
+    __slots__ = ('type', 'value', 'lineno', 'lexpos')
+
+    def __init__(self, type, value, lineno, lexpos):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __str__(self):
+        return 'Token(%s,%r,%d,%d)' % (
+            self.type,
+            self.value,
+            self.lineno,
+            self.lexpos,
+        )
+
+    __repr__ = __str__
+
+
+class DjangoQLScanner(object):
+    """
+    Drop-in replacement for DjangoQLLexer
+    """
+    whitespace = DjangoQLLexer.whitespace
+    line_terminators = DjangoQLLexer.line_terminators
+    tokens = DjangoQLLexer.tokens
+
+    name_start = '_ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+    number_start = '-0123456789'
+
+    re_string = re.compile(DjangoQLLexer.t_STRING_VALUE.regex)
+    re_float = re.compile(DjangoQLLexer.t_FLOAT_VALUE.regex)
+    re_int = re.compile(DjangoQLLexer.t_INT_VALUE.regex)
+    re_word = re.compile(r'[_A-Za-z][_0-9A-Za-z]*')
+    re_name = re.compile(DjangoQLLexer.t_NAME)
+    re_parameter = re.compile(DjangoQLLexer.re_parameter)
+
+    keywords = {
+        'or': 'OR',
+        'and': 'AND',
+        'not': 'NOT',
+        'in': 'IN',
+        'True': 'TRUE',
+        'False': 'FALSE',
+        'None': 'NONE',
+    }
+
+    punctuators = {
+        ',': 'COMMA',
+        '(': 'PAREN_L',
+        ')': 'PAREN_R',
+        '=': 'EQUALS',
+        '!=': 'NOT_EQUALS',
+        '>': 'GREATER',
+        '>=': 'GREATER_EQUAL',
+        '<': 'LESS',
+        '<=': 'LESS_EQUAL',
+        '~': 'CONTAINS',
+        '!~': 'NOT_CONTAINS',
+    }
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.text = ''
+        self.pos = 0
+        self.lineno = 1
+        return self
+
+    def input(self, s):
+        self.reset()
+        self.text = s
+        return self
+
+    def token(self):
+        text = self.text
+        pos = self.pos
+        end = len(text)
+        while pos < end:
+            char = text[pos]
+            if char in self.whitespace:
+                pos += 1
+            elif char in self.line_terminators:
+                pos += 1
+                self.lineno += 1
+            else:
+                break
+        else:
+            self.pos = pos
+            return None
+
+        if char in self.name_start:
+            word = self.re_word.match(text, pos).group()
+            token_type = self.keywords.get(word)
+            if token_type is None:
+                token_type = 'NAME'
+                value = self.re_name.match(text, pos).group()
+            else:
+                value = word
+        elif char in self.number_start:
+            m = self.re_float.match(text, pos)
+            if m:
+                token_type = 'FLOAT_VALUE'
+            else:
+                m = self.re_int.match(text, pos)
+                if not m:
+                    self.illegal_character(pos)
+                token_type = 'INT_VALUE'
+            value = m.group()
+        elif char == '"':
+            m = self.re_string.match(text, pos)
+            if not m:
+                self.illegal_character(pos)
+            token_type = 'STRING_VALUE'
+            value = m.group()
+        elif char == ':':
+            m = self.re_parameter.match(text, pos)
+            if not m:
+                self.illegal_character(pos)
+            token_type = 'PARAMETER'
+            value = m.group()
+        else:
+            value = text[pos:pos + 2]
+            token_type = self.punctuators.get(value)
+            if token_type is None:
+                value = char
+                token_type = self.punctuators.get(value)
+                if token_type is None:
+                    self.illegal_character(pos)
+
+        self.pos = pos + len(value)
+        if token_type == 'STRING_VALUE':
+            value = value[1:-1]  # cut leading and trailing quotes ""
+        elif token_type == 'PARAMETER':
+            value = value[1:]  # cut leading colon
+        return Token(token_type, value, self.lineno, pos)
+
+    # Iterator interface
+    def __iter__(self):
+        return self
+
+    def next(self):
+        t = self.token()
+        if t is None:
+            raise StopIteration
+        return t
+
+    __next__ = next
+
+    def find_column(self, t):
+        """
+        Returns token position in current text, starting from 1
+        """
+        return self.find_column_at(t.lexpos)
+
+    def find_column_at(self, pos):
+        cr = max(
+            self.text.rfind(terminator, 0, pos)
+            for terminator in self.line_terminators
+        )
+        if cr == -1:
+            return pos + 1
+        return pos - cr
+
+    def illegal_character(self, pos):
+        raise DjangoQLLexerError(
+            message='Illegal character %s' % repr(self.text[pos]),
+            value=self.text[pos:],
+            line=self.lineno,
+            column=self.find_column_at(pos),
+        )
+
+
+class DjangoQLRDParser(object):
+    """
+    Drop-in replacement for DjangoQLParser.
+
+    Nested parenthesis are handled with an explicit stack, so the depth of
+    input is not limited by Python recursion limit. Logical operators have
+    the same precedence and are right-associative, to produce the same trees
+    as the PLY grammar does.
+    """
+    comparison_operators = {
+        'EQUALS': ('INT_VALUE', 'FLOAT_VALUE', 'STRING_VALUE',
+                   'TRUE', 'FALSE', 'NONE', 'PARAMETER'),
+        'NOT_EQUALS': ('INT_VALUE', 'FLOAT_VALUE', 'STRING_VALUE',
+                       'TRUE', 'FALSE', 'NONE', 'PARAMETER'),
+        'GREATER': ('INT_VALUE', 'FLOAT_VALUE', 'STRING_VALUE', 'PARAMETER'),
+        'GREATER_EQUAL': ('INT_VALUE', 'FLOAT_VALUE', 'STRING_VALUE',
+                          'PARAMETER'),
+        'LESS': ('INT_VALUE', 'FLOAT_VALUE', 'STRING_VALUE', 'PARAMETER'),
+        'LESS_EQUAL': ('INT_VALUE', 'FLOAT_VALUE', 'STRING_VALUE',
+                       'PARAMETER'),
+        'CONTAINS': ('STRING_VALUE', 'PARAMETER'),
+        'NOT_CONTAINS': ('STRING_VALUE', 'PARAMETER'),
+    }
+
+    list_value_types = ('INT_VALUE', 'FLOAT_VALUE', 'STRING_VALUE',
+                        'TRUE', 'FALSE', 'NONE')
+
+    def __init__(self, **kwargs):
+        self.default_lexer = DjangoQLScanner()
+
+    def parse(self, input=None, lexer=None, **kwargs):
+        lexer = lexer or self.default_lexer
+        if input is not None:
+            lexer.input(input)
+        self.lexer = lexer
+        token = lexer.token
+        stack = []
+        terms = []
+        operators = []
+        while True:
+            # Expecting an expression: any number of opening parenthesis
+            # followed by a comparison
+            t = token()
+            while t is not None and t.type == 'PAREN_L':
+                stack.append((terms, operators))
+                terms = []
+                operators = []
+                t = token()
+            if t is None or t.type != 'NAME':
+                self.error(t)
+            terms.append(self.parse_comparison(t, token))
+
+            # Expression is complete. It can be followed by a logical
+            # operator, closing parenthesis, or the end of input
+            t = token()
+            while t is not None and t.type == 'PAREN_R' and stack:
+                expression = self.fold(terms, operators)
+                terms, operators = stack.pop()
+                terms.append(expression)
+                t = token()
+            if t is None:
+                if stack:
+                    self.error(t)
+                return self.fold(terms, operators)
+            if t.type not in ('AND', 'OR'):
+                self.error(t)
+            operators.append(Logical(operator=t.value))
+
+    def fold(self, terms, operators):
+        result = terms[-1]
+        for i in range(len(operators) - 1, -1, -1):
+            result = Expression(
+                left=terms[i],
+                operator=operators[i],
+                right=result,
+            )
+        return result
+
+    def parse_comparison(self, name_token, token):
+        name = Name(parts=name_token.value.split('.'))
+        t = token()
+        if t is None:
+            self.error(t)
+        if t.type in ('IN', 'NOT'):
+            if t.type == 'NOT':
+                t = token()
+                if t is None or t.type != 'IN':
+                    self.error(t)
+                operator = Comparison(operator='not in')
+            else:
+                operator = Comparison(operator=t.value)
+            return Expression(
+                left=name,
+                operator=operator,
+                right=self.parse_list(token),
+            )
+        value_types = self.comparison_operators.get(t.type)
+        if value_types is None:
+            self.error(t)
+        operator = Comparison(operator=t.value)
+        t = token()
+        if t is None or t.type not in value_types:
+            self.error(t)
+        return Expression(left=name, operator=operator, right=self.const(t))
+
+    def parse_list(self, token):
+        t = token()
+        if t is not None and t.type == 'PARAMETER':
+            return self.const(t)
+        if t is None or t.type != 'PAREN_L':
+            self.error(t)
+        items = []
+        while True:
+            t = token()
+            if t is None or t.type not in self.list_value_types:
+                self.error(t)
+            items.append(self.const(t))
+            t = token()
+            if t is None:
+                self.error(t)
+            if t.type == 'PAREN_R':
+                return List(items=items)
+            if t.type != 'COMMA':
+                self.error(t)
+
+    def const(self, t):
+        token_type = t.type
+        if token_type == 'STRING_VALUE':
+            return Const(value=unescape(t.value))
+        elif token_type == 'INT_VALUE':
+            return Const(value=int(t.value))
+        elif token_type == 'FLOAT_VALUE':
+            return Const(value=Decimal(t.value))
+        elif token_type == 'TRUE':
+            return Const(value=True)
+        elif token_type == 'FALSE':
+            return Const(value=False)
+        elif token_type == 'PARAMETER':
+            return Param(name=t.value)
+        return Const(value=None)
+
+    def error(self, token):
+        if token is None:
+            raise DjangoQLParserError('Unexpected end of input')
+        fragment = text_type(token.value)
+        if len(fragment) > 20:
+            fragment = fragment[:17] + '...'
+        raise DjangoQLParserError(
+            message='Syntax error at %s' % repr(fragment),
+            value=token.value,
+            line=token.lineno,
+            column=self.lexer.find_column(token),
+        )
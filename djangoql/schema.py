@@ -1,17 +1,113 @@
+import hashlib
 import inspect
-from collections import OrderedDict
-from datetime import datetime
+import threading
+from collections import OrderedDict, deque
+from itertools import islice
 from decimal import Decimal
 
 from django.conf import settings
 from django.db import models
 from django.db.models import FieldDoesNotExist, ManyToManyRel, ManyToOneRel
+from django.db.models.signals import class_prepared
 from django.db.models.fields.related import ForeignObjectRel
+from django.utils.functional import Promise
 from django.utils.timezone import get_current_timezone
+from django.utils.translation import get_language
 
-from .ast import Comparison, Const, List, Logical, Name, Node
+from .ast import Comparison, Const, List, Logical, Name, Node, Param
+from .cache import LRUCache, options_cache, plan_cache
 from .compat import text_type
+from .dates import lookup_datetime, parse_date
 from .exceptions import DjangoQLSchemaError
+from .lists import list_operator
+
+
+class Choices(object):
+    """
+    Bidirectional lookup tables for choices of a model field.
+
+    Grouped choices are flattened. Labels are matched exactly first, and
+    then case-insensitively. Iteration yields (code, label) pairs. Lazy
+    translated labels are kept as is, and tables for matching labels are
+    built once per active language.
+    """
+    def __init__(self, choices=()):
+        self.choices = []
+        self.by_code = {}
+        self._label_tables = {}  # language -> (by label, by lower label)
+        for code, label in self.flatten(choices):
+            self.choices.append((code, label))
+            self.by_code.setdefault(code, label)
+
+    def label_tables(self):
+        """
+        Returns dicts of codes by labels and by lowercase labels, translated
+        to the active language
+        """
+        language = get_language()
+        try:
+            return self._label_tables[language]
+        except KeyError:
+            pass
+        by_label = {}
+        by_lower_label = {}
+        for code, label in self.choices:
+            key = text_type(label)
+            by_label.setdefault(key, []).append(code)
+            by_lower_label.setdefault(key.lower(), []).append(code)
+        return self._label_tables.setdefault(
+            language,
+            (by_label, by_lower_label),
+        )
+
+    @staticmethod
+    def flatten(choices):
+        for code, label in choices:
+            if isinstance(label, (list, tuple)):
+                # Named group of choices
+                for choice in label:
+                    yield choice
+            else:
+                yield code, label
+
+    def __iter__(self):
+        return iter(self.choices)
+
+    def __len__(self):
+        return len(self.choices)
+
+    def labels(self):
+        return [label for code, label in self.choices]
+
+    def get_label(self, code, default=None):
+        return self.by_code.get(code, default)
+
+    def _codes(self, label):
+        if not isinstance(label, text_type):
+            return None
+        by_label, by_lower_label = self.label_tables()
+        codes = by_label.get(label)
+        if codes is None:
+            codes = by_lower_label.get(label.lower())
+        return codes
+
+    def get_code(self, label, default=None):
+        codes = self._codes(label)
+        return codes[0] if codes else default
+
+    def get_codes(self, labels):
+        """
+        Returns codes of given labels, in order and without duplicates.
+        Unknown labels are skipped.
+        """
+        result = []
+        seen = set()
+        for label in labels:
+            for code in self._codes(label) or ():
+                if code not in seen:
+                    seen.add(code)
+                    result.append(code)
+        return result
 
 
 class DjangoQLField(object):
@@ -37,20 +133,42 @@ class DjangoQLField(object):
         if suggest_options is not None:
             self.suggest_options = suggest_options
 
-    def as_dict(self):
+    def as_dict(self, options=True):
+        """
+        With options=False, suggestion options aren't included. Instead,
+        "options" is True for fields that provide them via get_suggestions().
+        """
+        if not self.suggest_options:
+            field_options = []
+        elif options:
+            field_options = self.get_cached_options()
+        else:
+            field_options = True
         return {
             'type': self.type,
             'nullable': self.nullable,
-            'options': list(self.get_options()) if self.suggest_options else [],
+            'options': field_options,
         }
 
     def _field_choices(self):
+        """
+        Returns Choices of the model field, looked up once per field instance
+        """
+        try:
+            return self.__dict__['_choices']
+        except KeyError:
+            pass
+        choices = Choices()
         if self.model:
             try:
-                return self.model._meta.get_field(self.name).choices
+                field = self.model._meta.get_field(self.name)
             except FieldDoesNotExist:
                 pass
-        return []
+            else:
+                if getattr(field, 'choices', None):
+                    choices = Choices(field.choices)
+        self.__dict__['_choices'] = choices
+        return choices
 
     def get_options(self):
         """
@@ -58,12 +176,80 @@ class DjangoQLField(object):
         """
         choices = self._field_choices()
         if choices:
-            return [c[1] for c in choices]
+            return choices.labels()
         else:
             return self.model.objects.\
                 order_by(self.name).\
                 values_list(self.name, flat=True)
 
+    def get_cached_options(self):
+        """
+        Returns a list of options from get_options(), cached in options_cache.
+
+        Cached options expire in DJANGOQL_OPTIONS_CACHE_TIMEOUT seconds and
+        are dropped when instances of the model are saved or deleted.
+        """
+        return options_cache.get(
+            self._options_cache_key(),
+            lambda: list(self.get_options()),
+        )
+
+    def _options_cache_key(self, *args):
+        # Fields of different classes that share get_options() share options
+        return (self.model, self.name, type(self).get_options) + args
+
+    def get_suggestions(self, prefix='', offset=0, limit=50):
+        """
+        Returns a page of suggestion options that start with given prefix,
+        case-insensitively, ranked so that the option equal to the prefix
+        goes first.
+
+        Choices and custom options from get_options() are filtered in memory
+        and keep their order otherwise. Otherwise, distinct values are
+        selected from the database with an istartswith lookup, and values
+        used by more objects go first, then the rest alphabetically. Only
+        requested page is fetched. Both options and pages are cached in
+        options_cache. Override this method if your custom options are too
+        many to be filtered in memory.
+        """
+        if self._field_choices() or \
+                type(self).get_options != DjangoQLField.get_options:
+            prefix = prefix.lower()
+            options = [
+                o for o in self.get_cached_options()
+                if text_type(o).lower().startswith(prefix)
+            ]
+            if prefix:
+                # Stable sort, which moves exact matches first
+                options.sort(key=lambda o: text_type(o).lower() != prefix)
+            return options[offset:offset + limit]
+        return options_cache.get(
+            self._options_cache_key('suggestions', prefix, offset, limit),
+            lambda: self._select_suggestions(prefix, offset, limit),
+        )
+
+    def _select_suggestions(self, prefix, offset, limit):
+        queryset = self.model.objects.exclude(**{
+            '%s__isnull' % self.name: True,
+        })
+        ordering = ['-djangoql_count', self.name]
+        if prefix:
+            queryset = queryset.filter(**{
+                '%s__istartswith' % self.name: prefix,
+            }).annotate(djangoql_exact=models.Case(
+                models.When(then=models.Value(0), **{
+                    '%s__iexact' % self.name: prefix,
+                }),
+                default=models.Value(1),
+                output_field=models.IntegerField(),
+            ))
+            ordering.insert(0, 'djangoql_exact')
+        # Grouped by values, so that every value is counted and returned once
+        rows = queryset.values(self.name).annotate(
+            djangoql_count=models.Count('pk'),
+        ).order_by(*ordering)
+        return [row[self.name] for row in rows[offset:offset + limit]]
+
     def get_lookup_name(self):
         """
         Override this method to provide custom lookup name
@@ -77,11 +263,8 @@ class DjangoQLField(object):
         choices = self._field_choices()
         if choices:
             if isinstance(value, list):
-                return [c[0] for c in choices if c[1] in value]
-            else:
-                for c in choices:
-                    if c[1] == value:
-                        return c[0]
+                return choices.get_codes(value)
+            return choices.get_code(value, value)
         return value
 
     def get_operator(self, operator):
@@ -133,9 +316,30 @@ class DjangoQLField(object):
         """
         search = '__'.join(path + [self.get_lookup_name()])
         op, invert = self.get_operator(operator)
-        q = models.Q(**{'%s%s' % (search, op): self.get_lookup_value(value)})
+        if isinstance(value, list):
+            value = self.get_list_lookup_value(value)
+            op = list_operator(op, value)
+        else:
+            value = self.get_lookup_value(value)
+        q = models.Q(**{'%s%s' % (search, op): value})
         return ~q if invert else q
 
+    def get_list_lookup_value(self, values):
+        """
+        Converts values of "in" list to lookup values in one call of
+        get_lookup_value(). Duplicates are dropped, and values are sorted if
+        DJANGOQL_SORT_LISTS setting is True, so that the same lists produce
+        the same SQL.
+        """
+        result = self.get_lookup_value(unique(values))
+        if getattr(settings, 'DJANGOQL_SORT_LISTS', False):
+            try:
+                result = sorted(result)
+            except TypeError:
+                # None or values of incomparable types
+                pass
+        return result
+
     def validate(self, value):
         if not self.nullable and value is None:
             raise DjangoQLSchemaError(
@@ -162,6 +366,59 @@ class DjangoQLField(object):
                 value=repr(value),
             ))
 
+    def validate_list(self, values):
+        """
+        Validates all values of "in" list, reporting all invalid values in
+        a single DjangoQLSchemaError.
+
+        Unless validate() is overridden, types of values are checked against
+        a set first, which is enough for valid lists. Otherwise every
+        distinct value is validated once.
+        """
+        if type(self).validate == DjangoQLField.validate:
+            allowed_types = set(self.value_types)
+            if self.nullable:
+                allowed_types.add(type(None))
+            if set(map(type, values)) <= allowed_types:
+                return
+        invalid = []
+        errors = []
+        for value in unique(values):
+            try:
+                self.validate(value)
+            except DjangoQLSchemaError as e:
+                invalid.append(value)
+                errors.append(e)
+        if len(errors) > 1:
+            shown = ', '.join(repr(v) for v in invalid[1:11])
+            if len(invalid) > 11:
+                shown += ' and %s more' % (len(invalid) - 11)
+            raise DjangoQLSchemaError(
+                message='%s. Other invalid values: %s' % (
+                    errors[0].args[0],
+                    shown,
+                ),
+                value=invalid,
+            )
+        elif errors:
+            raise errors[0]
+
+
+def has_default_lookup(field):
+    """
+    Tells if the field builds lookups with DjangoQLField.get_lookup(), so
+    that lookups can be derived from its lookup name and operators
+    """
+    return type(field).get_lookup == DjangoQLField.get_lookup
+
+
+def unique(values):
+    """
+    Returns values without duplicates, in order. Values of different types
+    are never duplicates, even if they're equal, like 1 and True.
+    """
+    return list(OrderedDict(((type(v), v), v) for v in values).values())
+
 
 class IntField(DjangoQLField):
     type = 'int'
@@ -206,7 +463,9 @@ class DateField(DjangoQLField):
             )
 
     def get_lookup_value(self, value):
-        return datetime.strptime(value, '%Y-%m-%d').date()
+        if isinstance(value, list):
+            return [parse_date(v) for v in value]
+        return parse_date(value)
 
 
 class DateTimeField(DjangoQLField):
@@ -228,15 +487,13 @@ class DateTimeField(DjangoQLField):
             )
 
     def get_lookup_value(self, value):
-        mask = '%Y-%m-%d'
-        if len(value) > 10:
-            mask += ' %H:%M'
-        if len(value) > 16:
-            mask += ':%S'
-        dt = datetime.strptime(value, mask)
-        if settings.USE_TZ:
-            dt = dt.replace(tzinfo=get_current_timezone())
-        return dt
+        # Current timezone is looked up once for all values of a list, and
+        # lookup values are memoized by value and timezone
+        tz = get_current_timezone()
+        use_tz = settings.USE_TZ
+        if isinstance(value, list):
+            return [lookup_datetime(v, tz, use_tz) for v in value]
+        return lookup_datetime(value, tz, use_tz)
 
     def get_lookup(self, path, operator, value):
         search = '__'.join(path + [self.get_lookup_name()])
@@ -253,7 +510,13 @@ class DateTimeField(DjangoQLField):
         # and resulting comparison would look like
         #       'created LIKE %2017-01-30 00:00:00%'
         # which is not what we want for this case.
-        val = value if operator in ('~', '!~') else self.get_lookup_value(value)
+        if operator in ('~', '!~'):
+            val = value
+        elif isinstance(value, list):
+            val = self.get_list_lookup_value(value)
+            op = list_operator(op, val)
+        else:
+            val = self.get_lookup_value(value)
 
         q = models.Q(**{'%s%s' % (search, op): val})
         return ~q if invert else q
@@ -276,16 +539,126 @@ class RelationField(DjangoQLField):
     def relation(self):
         return DjangoQLSchema.model_label(self.related_model)
 
-    def as_dict(self):
-        dikt = super(RelationField, self).as_dict()
+    @property
+    def many(self):
+        """
+        True for relations that may lead to several objects, like reverse
+        foreign keys and many-to-many relations
+        """
+        try:
+            field = self.model._meta.get_field(self.name)
+        except (AttributeError, FieldDoesNotExist):
+            return True
+        return bool(field.many_to_many or field.one_to_many)
+
+    def as_dict(self, options=True):
+        dikt = super(RelationField, self).as_dict(options=options)
         dikt['relation'] = self.relation
         return dikt
 
 
+class LazyStrField(DjangoQLField):
+    """
+    Mixin for fields that turn into string fields if any of their suggestion
+    options is string.
+
+    Used when the field type depends on data, which may come from the
+    database. Classes are made with lazy_str_field_cls(), so that fields stay
+    instances of their declared classes and keep their lookups. Options are
+    checked on first use of type-dependent attributes and methods, rather
+    than on schema construction, and the result is kept.
+    """
+    def is_str(self):
+        try:
+            return self.__dict__['_is_str']
+        except KeyError:
+            pass
+        options = self.get_cached_options()
+        is_str = any(
+            isinstance(option, (text_type, Promise)) for option in options
+        )
+        self.__dict__['_is_str'] = is_str
+        return is_str
+
+    @property
+    def type(self):
+        if self.is_str():
+            return StrField.type
+        return super(LazyStrField, self).type
+
+    @property
+    def value_types(self):
+        if self.is_str():
+            return StrField.value_types
+        return super(LazyStrField, self).value_types
+
+    @property
+    def value_types_description(self):
+        if self.is_str():
+            return StrField.value_types_description
+        return super(LazyStrField, self).value_types_description
+
+    def validate(self, value):
+        if self.is_str():
+            return DjangoQLField.validate(self, value)
+        return super(LazyStrField, self).validate(value)
+
+    def get_lookup_value(self, value):
+        if self.is_str():
+            return DjangoQLField.get_lookup_value(self, value)
+        return super(LazyStrField, self).get_lookup_value(value)
+
+
+_lazy_str_field_classes = {}
+
+
+def lazy_str_field_cls(field_cls):
+    """
+    Returns a subclass of given field class and LazyStrField, made once per
+    field class
+    """
+    try:
+        return _lazy_str_field_classes[field_cls]
+    except KeyError:
+        pass
+    cls = type(str('Lazy%s' % field_cls.__name__), (LazyStrField, field_cls), {
+        '__module__': field_cls.__module__,
+    })
+    return _lazy_str_field_classes.setdefault(field_cls, cls)
+
+
 class DjangoQLSchema(object):
+    """
+    Describes models and fields available for search.
+
+    Introspection results are cached at class level and shared by all
+    instances with the same schema class, model, include, exclude and
+    suggest_options, so creating a schema instance per search is cheap. The
+    cache is cleared when new models are registered, or with clear_cache().
+    Cached models and fields are shared between threads and must not be
+    modified. If get_fields() or other methods of your schema depend on
+    instance state, like current user, set cache_introspection to False.
+
+    With lazy_introspection enabled, fields of a model are introspected only
+    when a search or as_dict() reaches that model. Unlike eager introspection,
+    which drops relations to models that were already visited, lazy mode
+    follows all relations to models that aren't excluded, so back references
+    like "author.book_set" become available.
+    """
     include = ()  # models to include into introspection
     exclude = ()  # models to exclude from introspection
     suggest_options = None
+    cache_introspection = True
+    lazy_introspection = False
+
+    _introspection_cache = {}
+    _fields_cache = {}
+    _version_cache = {}
+    _path_indexes = {}
+    _choices_cache = {}
+    _cache_lock = threading.Lock()
+    # Max number of resolved names kept per schema, see resolve_path()
+    path_index_size = 10000
 
     def __init__(self, model):
         if not inspect.isclass(model) or not issubclass(model, models.Model):
@@ -305,6 +678,9 @@ class DjangoQLSchema(object):
             )
         self.current_model = model
         self._models = None
+        self._fields = {}
+        self._path_index = None
+        self._version = None
         if self.suggest_options is None:
             self.suggest_options = {}
 
@@ -315,40 +691,244 @@ class DjangoQLSchema(object):
     @property
     def models(self):
         if not self._models:
-            self._models = self.introspect(
-                model=self.current_model,
-                exclude=tuple(self.model_label(m) for m in self.exclude),
-            )
+            if self.cache_introspection:
+                key = self.introspection_key()
+                models = self._introspection_cache.get(key)
+                if models is None:
+                    models = self.introspect_models()
+                    with self._cache_lock:
+                        models = self._introspection_cache.setdefault(
+                            key,
+                            models,
+                        )
+                self._models = models
+            else:
+                self._models = self.introspect_models()
         return self._models
 
+    def introspect_models(self):
+        if self.lazy_introspection:
+            return self.introspect_reachable(self.current_model)
+        return self.introspect(
+            model=self.current_model,
+            exclude=tuple(self.model_label(m) for m in self.exclude),
+        )
+
+    def introspection_key(self, model=None):
+        """
+        Returns a key of introspection results in class-level cache
+        """
+        return (
+            self.__class__,
+            model or self.current_model,
+            tuple(self.include),
+            tuple(self.exclude),
+            tuple(sorted(
+                (self.model_label(model), tuple(fields))
+                for model, fields in self.suggest_options.items()
+            )),
+        )
+
     @classmethod
-    def model_label(self, model):
-        return text_type(model._meta)
+    def clear_cache(cls):
+        """
+        Clears cached introspection results of all schemas, and compiled
+        plans of searches, which refer to them
+        """
+        with cls._cache_lock:
+            DjangoQLSchema._introspection_cache.clear()
+            DjangoQLSchema._fields_cache.clear()
+            DjangoQLSchema._version_cache.clear()
+            DjangoQLSchema._path_indexes.clear()
+            DjangoQLSchema._choices_cache.clear()
+            plan_cache.clear()
 
-    def introspect(self, model, exclude=()):
+    def get_model_fields(self, model):
+        """
+        Returns an ordered dict of searchable fields of given model
         """
-        Start with given model and recursively walk through its relationships.
+        if not self.lazy_introspection:
+            return self.models[self.model_label(model)]
+        fields = self._fields.get(model)
+        if fields is None:
+            if self.cache_introspection:
+                key = self.introspection_key(model)
+                fields = self._fields_cache.get(key)
+                if fields is None:
+                    fields = self.introspect_model(model)
+                    with self._cache_lock:
+                        fields = self._fields_cache.setdefault(key, fields)
+            else:
+                fields = self.introspect_model(model)
+            self._fields[model] = fields
+        return fields
 
-        Returns a dict with all model labels and their fields found.
+    def introspect_model(self, model):
+        """
+        Returns fields of a single model, without walking its relations
         """
         fields = OrderedDict()
-        result = {self.model_label(model): fields}
         for field in self.get_fields(model):
             if not isinstance(field, DjangoQLField):
                 field = self.get_field_instance(model, field)
             if not field:
                 continue
-            if isinstance(field, RelationField):
-                if field.relation not in exclude:
+            if isinstance(field, RelationField) and \
+                    self.excluded(field.related_model):
+                continue
+            fields[field.name] = field
+        return fields
+
+    def introspect_reachable(self, model):
+        """
+        Returns a dict with labels and fields of all models reachable from
+        given one, introspected lazily
+        """
+        result = OrderedDict()
+        pending = deque([model])
+        while pending:
+            model = pending.popleft()
+            label = self.model_label(model)
+            if label in result:
+                continue
+            result[label] = fields = self.get_model_fields(model)
+            for field in fields.values():
+                if isinstance(field, RelationField):
+                    pending.append(field.related_model)
+        return result
+
+    @classmethod
+    def model_label(self, model):
+        return text_type(model._meta)
+
+    def introspect(self, model, exclude=()):
+        """
+        Start with given model and walk through its relationships, depth-first.
+
+        Returns a dict with all model labels and their fields found.
+
+        A relation is followed unless its model is in exclude or it has been
+        visited before the current model. Since the current model isn't
+        visited before itself, self-referencing models are visited twice,
+        and the second visit, without relations, determines their fields.
+        The walk uses an explicit stack and remembers when each model was
+        visited first, so it takes linear time in the number of fields.
+        """
+        exclude = set(exclude)
+        result = OrderedDict()
+        first_visits = {}
+        counter = [0]
+
+        def visit(model):
+            label = self.model_label(model)
+            seq = counter[0]
+            counter[0] += 1
+            first_visits.setdefault(label, seq)
+            result[label] = fields = OrderedDict()
+            return model, fields, seq, iter(self.get_fields(model))
+
+        stack = [visit(model)]
+        while stack:
+            model, fields, seq, field_names = stack[-1]
+            for field in field_names:
+                if not isinstance(field, DjangoQLField):
+                    field = self.get_field_instance(model, field)
+                if not field:
+                    continue
+                if isinstance(field, RelationField):
+                    relation = field.relation
+                    if relation not in exclude and \
+                            first_visits.get(relation, seq) >= seq:
+                        fields[field.name] = field
+                        stack.append(visit(field.related_model))
+                        break
+                else:
                     fields[field.name] = field
-                    result.update(self.introspect(
-                        model=field.related_model,
-                        exclude=tuple(exclude) + tuple(result.keys()),
-                    ))
             else:
-                fields[field.name] = field
+                stack.pop()
         return result
 
+    def get_version(self):
+        """
+        Returns a fingerprint of models and fields available in the schema.
+
+        It changes whenever the schema changes, and is used in cache keys of
+        validated queries. It's computed once per introspection key from
+        names returned by get_fields() and Django model metadata, without
+        introspecting the schema or querying the database, so that lazy
+        introspection stays lazy.
+        """
+        if self._version is None and self.cache_introspection:
+            self._version = self._version_cache.get(self.introspection_key())
+        if self._version is None:
+            self._version = self.compute_version()
+            if self.cache_introspection:
+                with self._cache_lock:
+                    self._version = self._version_cache.setdefault(
+                        self.introspection_key(),
+                        self._version,
+                    )
+        return self._version
+
+    def compute_version(self):
+        schema_cls = self.__class__
+        digest = hashlib.sha1()
+        digest.update(('%s.%s:%s:%s:%s:%s;' % (
+            schema_cls.__module__,
+            schema_cls.__name__,
+            self.model_label(self.current_model),
+            sorted(self.model_label(m) for m in self.include),
+            sorted(self.model_label(m) for m in self.exclude),
+            sorted(
+                (self.model_label(model), sorted(fields))
+                for model, fields in self.suggest_options.items()
+            ),
+        )).encode('utf8'))
+        visited = set()
+        pending = deque([self.current_model])
+        while pending:
+            model = pending.popleft()
+            if model in visited:
+                continue
+            visited.add(model)
+            model_label = self.model_label(model)
+            for field in self.get_fields(model):
+                if isinstance(field, DjangoQLField):
+                    related_model = getattr(field, 'related_model', None)
+                    signature = (
+                        field.name,
+                        field.__class__.__name__,
+                        field.type,
+                        field.nullable,
+                    )
+                else:
+                    try:
+                        model_field = model._meta.get_field(field)
+                    except FieldDoesNotExist:
+                        # Reported by get_field_instance() on introspection
+                        digest.update(('%s.%s:?;' % (
+                            model_label,
+                            field,
+                        )).encode('utf8'))
+                        continue
+                    related_model = model_field.related_model
+                    signature = (
+                        field,
+                        model_field.__class__.__name__,
+                        getattr(model_field, 'null', True),
+                        bool(getattr(model_field, 'choices', None)),
+                    )
+                if related_model is not None and \
+                        not self.excluded(related_model):
+                    signature += (self.model_label(related_model),)
+                    pending.append(related_model)
+                digest.update(('%s.%s:%s;' % (
+                    model_label,
+                    signature[0],
+                    ':'.join(text_type(v) for v in signature[1:]),
+                )).encode('utf8'))
+        return digest.hexdigest()
+
     def get_fields(self, model):
         """
         By default, returns all field names of a given model.
@@ -383,12 +963,24 @@ class DjangoQLSchema(object):
             field.name in self.suggest_options.get(model, [])
         )
         field_instance = field_cls(**field_kwargs)
-        # Check if suggested options conflict with field type
-        if field_cls != StrField and field_instance.suggest_options:
-            for option in field_instance.get_options():
-                if isinstance(option, text_type):
-                    # Convert to StrField
-                    field_instance = StrField(**field_kwargs)
+        # Look up choices now, so searches don't have to
+        choices = field_instance._field_choices()
+        if field_cls == StrField or not field_instance.suggest_options:
+            return field_instance
+        # Check if suggested options conflict with field type. Schema
+        # construction must not query the database, so options are checked
+        # here only when they're known from metadata: labels of choices, or
+        # values of the model field, which match typed field classes.
+        # Otherwise, they're checked on first use, see LazyStrField.
+        if field_cls.get_options != DjangoQLField.get_options or \
+                field_cls == DjangoQLField and not choices:
+            field_instance = lazy_str_field_cls(field_cls)(**field_kwargs)
+            field_instance.__dict__['_choices'] = choices
+        elif choices:
+            if any(isinstance(label, (text_type, Promise))
+                   for label in choices.labels()):
+                field_instance = StrField(**field_kwargs)
+                field_instance.__dict__['_choices'] = choices
         return field_instance
 
     def get_field_cls(self, field):
@@ -407,12 +999,19 @@ class DjangoQLSchema(object):
             return DateField
         return DjangoQLField
 
-    def as_dict(self):
+    def as_dict(self, options=True):
+        """
+        Returns introspection for completion widget.
+
+        With options=False, suggestion options aren't included, so that the
+        widget could fetch them on demand.
+        """
         models = {}
         for model_label, fields in self.models.items():
-            models[model_label] = OrderedDict(
-                [(name, field.as_dict()) for name, field in fields.items()]
-            )
+            models[model_label] = OrderedDict([
+                (name, field.as_dict(options=options))
+                for name, field in fields.items()
+            ])
         return {
             'current_model': self.model_label(self.current_model),
             'models': models,
@@ -420,45 +1019,127 @@ class DjangoQLSchema(object):
 
     def resolve_name(self, name):
         assert isinstance(name, Name)
-        model = self.model_label(self.current_model)
+        return self.resolve_path(name)[0]
+
+    def resolve_path(self, name):
+        """
+        Returns (field, relations) for given Name, where relations is a tuple
+        of relation fields leading to the field.
+
+        Results, including errors, are memoized in a path index shared by
+        schema instances the same way as introspection results.
+        """
+        index = self.path_index()
+        entry = index.get(name)
+        if entry is None:
+            try:
+                entry = self.find_path(name)
+            except DjangoQLSchemaError as e:
+                entry = text_type(e)
+            index.set(name, entry)
+        if not isinstance(entry, tuple):
+            raise DjangoQLSchemaError(entry)
+        return entry
+
+    def path_index(self):
+        if self._path_index is None:
+            if self.cache_introspection:
+                key = self.introspection_key()
+                index = self._path_indexes.get(key)
+                if index is None:
+                    with self._cache_lock:
+                        index = self._path_indexes.setdefault(
+                            key,
+                            LRUCache(maxsize=self.path_index_size),
+                        )
+            else:
+                index = LRUCache(maxsize=self.path_index_size)
+            self._path_index = index
+        return self._path_index
+
+    def find_path(self, name):
+        model = self.current_model
         field = None
+        relations = []
         for name_part in name.parts:
-            field = self.models[model].get(name_part)
+            fields = self.get_model_fields(model)
+            field = fields.get(name_part)
             if not field:
                 raise DjangoQLSchemaError(
                     'Unknown field: %s. Possible choices are: %s' % (
                         name_part,
-                        ', '.join(sorted(self.models[model].keys())),
+                        self.field_choices(model, fields),
                     )
                 )
             if field.type == 'relation':
-                model = field.relation
+                relations.append(field)
+                model = field.related_model
                 field = None
-        return field
+        return field, tuple(relations)
+
+    def field_choices(self, model, fields):
+        """
+        Returns sorted field names of given model, for error messages
+        """
+        key = (self.introspection_key(), model)
+        choices = self._choices_cache.get(key)
+        if choices is None:
+            choices = ', '.join(sorted(fields.keys()))
+            if self.cache_introspection:
+                self._choices_cache[key] = choices
+        return choices
 
     def validate(self, node):
         """
         Validate DjangoQL AST tree vs. current schema
         """
         assert isinstance(node, Node)
-        if isinstance(node.operator, Logical):
-            self.validate(node.left)
-            self.validate(node.right)
-            return
+        # Explicit stack instead of recursion, to support huge queries
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            if isinstance(node.operator, Logical):
+                pending.append(node.right)
+                pending.append(node.left)
+            else:
+                self.validate_comparison(node)
+
+    def validate_comparison(self, node):
         assert isinstance(node.left, Name)
         assert isinstance(node.operator, Comparison)
-        assert isinstance(node.right, (Const, List))
+        assert isinstance(node.right, (Const, List, Param))
 
-        # Check that field and value types are compatible
         field = self.resolve_name(node.left)
-        value = node.right.value
+        if isinstance(node.right, Param):
+            # Value is not known until the search is applied
+            return
+        self.validate_value(
+            node.left,
+            field,
+            node.right.value,
+            many=isinstance(node.right, List),
+        )
+
+    def validate_value(self, name, field, value, many=False):
+        """
+        Checks that field resolved for given name can be compared to value,
+        or to a list of values if many is True
+        """
         if field is None:
             if value is not None:
                 raise DjangoQLSchemaError(
                     'Related model %s can be compared to None only, but not to '
-                    '%s' % (node.left.value, type(value).__name__)
+                    '%s' % (name.value, type(value).__name__)
                 )
+        elif many:
+            field.validate_list(value)
         else:
-            values = value if isinstance(node.right, List) else [value]
-            for v in values:
-                field.validate(v)
+            field.validate(value)
+
+
+def clear_schema_cache(sender, **kwargs):
+    DjangoQLSchema.clear_cache()
+
+
+# New models may appear in relations of already introspected ones
+class_prepared.connect(clear_schema_cache)
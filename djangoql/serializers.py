@@ -0,0 +1,140 @@
+"""
+Serialization of DjangoQL ASTs, for storing parsed queries outside of process.
+
+Two formats are supported, both versioned:
+
+- JSON, compact and human-readable, see dumps() and loads();
+- binary, based on marshal, which is faster and, unlike pickle, can't execute
+  arbitrary code on load. See dumps_binary() and loads_binary().
+
+Both formats encode the same structure. Comparisons are encoded as
+[operator, dotted_name, value], where value is a scalar, {"d": "1.5"} for
+decimals, {"p": "name"} for bind placeholders, or a list of scalars and
+decimals for List nodes. Chains of the same logical
+operator are flattened into [operator, [operand, ...]], which keeps encoded
+trees shallow for long "a or b or c ..." queries.
+"""
+import json
+import marshal
+import sys
+from decimal import Decimal
+
+from .ast import Comparison, Const, Expression, List, Logical, Name, Param
+from .compat import binary_type, text_type
+
+
+# 2: bind placeholders of compiled searches, {"p": "name"}
+FORMAT_VERSION = 2
+
+LOGICAL_OPERATORS = ('and', 'or')
+COMPARISON_OPERATORS = (
+    '=', '!=', '>', '>=', '<', '<=', '~', '!~', 'in', 'not in',
+)
+
+# marshal format may change between Python versions, so binary data produced
+# by a different Python version is rejected
+BINARY_HEADER = ('djangoql:%s:py%s%s:' % (
+    (FORMAT_VERSION,) + tuple(sys.version_info[:2])
+)).encode('ascii')
+
+
+def encode_value(value):
+    if isinstance(value, Decimal):
+        return {'d': text_type(value)}
+    return value
+
+
+def decode_value(data):
+    if isinstance(data, dict):
+        return Decimal(data['d'])
+    if isinstance(data, (list, tuple)):
+        raise ValueError('Unexpected list value: %r' % (data,))
+    return data
+
+
+def encode(node):
+    """
+    Converts AST into a structure of lists, dicts and scalars
+    """
+    operator = node.operator.operator
+    if isinstance(node.operator, Logical):
+        operands = [encode(node.left)]
+        right = node.right
+        while isinstance(right.operator, Logical) and \
+                right.operator.operator == operator:
+            operands.append(encode(right.left))
+            right = right.right
+        operands.append(encode(right))
+        return [operator, operands]
+    if isinstance(node.right, List):
+        value = [encode_value(i.value) for i in node.right.items]
+    elif isinstance(node.right, Param):
+        value = {'p': node.right.name}
+    else:
+        value = encode_value(node.right.value)
+    return [operator, node.left.value, value]
+
+
+def decode(data):
+    """
+    Restores AST from a structure produced by encode()
+    """
+    try:
+        if len(data) == 2:
+            operator, operands = data
+            if operator not in LOGICAL_OPERATORS or len(operands) < 2:
+                raise ValueError('Invalid logical expression: %r' % (data,))
+            operator = Logical(operator=operator)
+            result = decode(operands[-1])
+            for operand in reversed(operands[:-1]):
+                result = Expression(
+                    left=decode(operand),
+                    operator=operator,
+                    right=result,
+                )
+            return result
+        operator, name, value = data
+        if operator not in COMPARISON_OPERATORS:
+            raise ValueError('Invalid comparison: %r' % (data,))
+        if isinstance(value, (list, tuple)):
+            value = List(items=[Const(value=decode_value(v)) for v in value])
+        elif isinstance(value, dict) and 'p' in value:
+            value = Param(name=value['p'])
+        else:
+            value = Const(value=decode_value(value))
+        return Expression(
+            left=Name(parts=name.split('.')),
+            operator=Comparison(operator=operator),
+            right=value,
+        )
+    except (TypeError, KeyError, AttributeError) as e:
+        raise ValueError('Invalid AST data: %s' % e)
+
+
+def dumps(node):
+    return json.dumps(
+        {'v': FORMAT_VERSION, 'ast': encode(node)},
+        separators=(',', ':'),
+    )
+
+
+def loads(s):
+    if isinstance(s, binary_type):
+        s = s.decode('utf8')
+    data = json.loads(s)
+    if not isinstance(data, dict) or data.get('v') != FORMAT_VERSION:
+        raise ValueError('Unsupported AST format')
+    return decode(data['ast'])
+
+
+def dumps_binary(node):
+    return BINARY_HEADER + marshal.dumps(encode(node))
+
+
+def loads_binary(data):
+    if not data.startswith(BINARY_HEADER):
+        raise ValueError('Unsupported AST format')
+    try:
+        return decode(marshal.loads(data[len(BINARY_HEADER):]))
+    except EOFError as e:
+        raise ValueError('Invalid AST data: %s' % e)
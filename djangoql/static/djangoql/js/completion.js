@@ -120,6 +120,9 @@
 
     prefix: '',
     suggestions: [],
+    suggestionsUrl: null,
+    fieldOptions: {},
+    fieldOptionsKey: null,
     savedQueries: [],
     selected: null,
     valuesCaseSensitive: false,
@@ -142,6 +145,9 @@
       }
       this.loadIntrospections(options.introspections);
       this.loadSavedQueries(options.savedqueries);
+      if (typeof options.suggestions === 'string') {
+        this.suggestionsUrl = options.suggestions;
+      }
       this.textarea = document.querySelector(options.selector);
       if (!this.textarea) {
         this.logError('Element not found by selector: ' + options.selector);
@@ -364,6 +370,12 @@
       this.savedQueriesUL = document.createElement('ul');
       this.savedQueriesUL.id = 'savedQueriesUL';
       this.completionFirstTab.appendChild(this.completionUL);
+      this.completionUL.addEventListener('scroll', function () {
+        var ul = this.completionUL;
+        if (ul.scrollTop + ul.clientHeight >= ul.scrollHeight - 20) {
+          this.loadMoreFieldOptions();
+        }
+      }.bind(this));
       this.completionSecondTab.appendChild(this.savedQueriesUL);
       if (typeof options.syntaxHelp === 'string') {
         syntaxHelp = document.createElement('p');
@@ -462,6 +474,103 @@
       }
     },
 
+    loadFieldOptions: function (name, prefix) {
+      // Returns options of a field which start with given prefix,
+      // case-insensitively. Options are fetched from the server on demand,
+      // page by page, and cached, so an empty list is returned until the
+      // first page is loaded. Next pages are requested by
+      // loadMoreFieldOptions() when the completion box is scrolled down.
+      var i;
+      var cached;
+      var key = name + '\n' + prefix;
+      var lowerPrefix = prefix.toLowerCase();
+      if (this.fieldOptions.hasOwnProperty(key)) {
+        this.fieldOptionsKey = key;
+        return this.fieldOptions[key].items;
+      }
+      // If all options for a shorter prefix are loaded, there's no need to
+      // ask the server again
+      for (i = prefix.length - 1; i >= 0; i--) {
+        cached = this.fieldOptions[name + '\n' + prefix.slice(0, i)];
+        if (cached && !cached.hasNext) {
+          return cached.items.filter(function (item) {
+            return String(item).toLowerCase()
+                .lastIndexOf(lowerPrefix, 0) === 0;
+          });
+        }
+      }
+      if (!this.suggestionsUrl) {
+        return [];
+      }
+      this.fieldOptions[key] = {
+        name: name,
+        prefix: prefix,
+        items: [],
+        page: 0,
+        hasNext: true,
+        loading: false
+      };
+      this.fieldOptionsKey = key;
+      this.requestFieldOptions(key);
+      return [];
+    },
+
+    loadMoreFieldOptions: function () {
+      // Requests the next page of options shown in the completion box, if any
+      var cached = this.fieldOptionsKey &&
+          this.fieldOptions[this.fieldOptionsKey];
+      if (cached && cached.hasNext && !cached.loading) {
+        this.requestFieldOptions(this.fieldOptionsKey);
+      }
+    },
+
+    requestFieldOptions: function (key) {
+      var onLoadError;
+      var request;
+      var cached = this.fieldOptions[key];
+      var url = this.suggestionsUrl +
+          '?field=' + encodeURIComponent(cached.name) +
+          '&prefix=' + encodeURIComponent(cached.prefix) +
+          '&page=' + (cached.page + 1);
+      cached.loading = true;
+      onLoadError = function () {
+        cached.loading = false;
+        if (!cached.page) {
+          // Nothing is loaded, so the first page is requested again next time
+          delete this.fieldOptions[key];
+        }
+        this.logError('failed to load suggestions from ' + url);
+      }.bind(this);
+      request = new XMLHttpRequest();
+      request.open('GET', url, true);
+      request.onload = function () {
+        var response;
+        var selected;
+        if (request.status === 200) {
+          response = JSON.parse(request.responseText);
+          cached.items = cached.items.concat(response.items);
+          cached.page = response.page;
+          cached.hasNext = response.has_next;
+          cached.loading = false;
+          if (document.activeElement === this.textarea) {
+            // Keep the selected item when next pages are appended
+            selected = this.selected;
+            this.generateSuggestions();
+            if (selected !== null && selected < this.suggestions.length) {
+              this.selected = selected;
+            }
+            this.renderCompletion();
+          }
+        } else {
+          onLoadError();
+        }
+      }.bind(this);
+      request.ontimeout = onLoadError;
+      request.onerror = onLoadError;
+      request.onprogress = function () {};
+      window.setTimeout(request.send.bind(request));
+    },
+
     getCookie: function (name) {
       var cookieValue = null;
       var cookies;
@@ -799,6 +908,9 @@
           currentLi.className = '';
         }
       }
+      if (this.selected === suggestionsLen - 1) {
+        this.loadMoreFieldOptions();
+      }
       // Remove redundant elements
       while (liLen > suggestionsLen) {
         liLen--;
@@ -1067,11 +1179,12 @@
     },
 
     getContext: function (text, cursorPos) {
-      // This function returns an object with the following 4 properties:
+      // This function returns an object with the following 5 properties:
       var prefix;        // text already entered by user in the current scope
       var scope = null;  // 'field', 'comparison', 'value', 'logical' or null
       var model = null;  // model, set for 'field', 'comparison' and 'value'
       var field = null;  // field, set for 'comparison' and 'value'
+      var name = null;   // full name of the field, set for 'value'
 
       var whitespace;
       var nameParts;
@@ -1142,6 +1255,7 @@
           scope = 'value';
           model = resolvedName.model;
           field = resolvedName.field;
+          name = nextToLastToken.value;
           if (prefix[0] === '"' && this.models[model][field].type === 'str') {
             prefix = prefix.slice(1);
           }
@@ -1158,7 +1272,13 @@
               .indexOf(lastToken.name) >= 0) {
         scope = 'logical';
       }
-      return { prefix: prefix, scope: scope, model: model, field: field };
+      return {
+        prefix: prefix,
+        scope: scope,
+        model: model,
+        field: field,
+        name: name
+      };
     },
 
     generateSuggestions: function () {
@@ -1167,12 +1287,14 @@
       var model;
       var field;
       var suggestions;
+      var options;
       var snippetBefore;
       var snippetAfter;
       var searchFilter;
       var textBefore;
       var textAfter;
 
+      this.fieldOptionsKey = null;
       if (!this.completionEnabled) {
         this.prefix = '';
         this.suggestions = [];
@@ -1265,7 +1387,14 @@
               }.bind(this);
             }
             this.highlightCaseSensitive = this.valuesCaseSensitive;
-            this.suggestions = field.options.map(function (f) {
+            if (field.options === true) {
+              // Options are not included into introspections and should be
+              // loaded from the server
+              options = this.loadFieldOptions(context.name, this.prefix);
+            } else {
+              options = field.options;
+            }
+            this.suggestions = options.map(function (f) {
               return suggestion(f, snippetBefore, snippetAfter);
             });
           } else if (field.type === 'bool') {
@@ -0,0 +1,259 @@
+"""
+EXISTS subqueries for comparisons over to-many relations.
+
+Django compiles comparisons like 'book.name ~ "x"' on User into JOINs, which
+repeat a user for every matching book, so that results need DISTINCT. With
+DJANGOQL_EXISTS_SUBQUERIES setting, build_filter() compiles them into
+correlated subqueries instead:
+
+    EXISTS(SELECT ... FROM "core_book" U0
+           WHERE U0."author_id" = "auth_user"."id" AND U0."name" LIKE %x%)
+
+Results are the same as with JOINs, where all comparisons of a relation
+are matched by the same related object. Comparisons of the same relation
+in a chain of "and" or "or", including nested chains that compare nothing
+else, share a subquery, so that 'book.name ~ "x" and book.rating > 3'
+still looks for a single book that matches both. Subqueries can't express
+the same for comparisons mixed with other ones at different levels, like
+'book.name ~ "x" and (book.rating > 3 or id = 1)', or for relations
+compared by Django anyway, like in 'book.name ~ "x" or book.rating = None'
+and 'book.name ~ "x" and book.rating != 4', so relations of such searches
+are JOINed as before, see grouped_relations().
+
+Negated comparisons and comparisons with None are left to Django, which
+compiles them into subqueries and outer joins, and so are relations
+without a reverse query name, like many-to-many fields with
+related_name="+". needs_distinct() tells whether a search may still return
+duplicates.
+
+Django before 1.11 doesn't support correlated subqueries, so "pk IN
+(SELECT ...)" is used there instead.
+"""
+from __future__ import unicode_literals
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import models
+from django.db.models import (
+    Field, FieldDoesNotExist, Lookup, ManyToManyRel, ManyToOneRel,
+)
+
+from .ast import Logical, Param, Truth, logical_operands
+
+try:
+    from django.db.models import Exists, OuterRef
+except ImportError:  # Django < 1.11
+    Exists = OuterRef = None
+
+
+NEGATED_OPERATORS = ('!=', '!~', 'not in')
+
+
+class ToManyRelation(namedtuple('ToManyRelation', [
+    'prefix', 'model', 'reverse', 'outer',
+])):
+    """
+    To-many relation that comparisons are compiled into a subquery for.
+
+    prefix is a tuple of name parts up to and including the relation, model
+    is the related model, reverse is the lookup from related model to the
+    searched one, and outer is the lookup of the searched model it refers to.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_field(cls, relation, path):
+        """
+        Returns ToManyRelation for a RelationField of the schema, preceded
+        by relations of given path, or None if it has no reverse lookup
+        """
+        try:
+            field = relation.model._meta.get_field(relation.name)
+        except (AttributeError, FieldDoesNotExist):
+            return None
+        if isinstance(field, ManyToManyRel):
+            reverse, target = field.field.name, 'pk'
+        elif isinstance(field, ManyToOneRel):
+            reverse, target = field.field.name, field.field_name
+        elif isinstance(field, models.ManyToManyField) and \
+                not field.remote_field.is_hidden():
+            reverse, target = field.related_query_name(), 'pk'
+        else:
+            return None
+        return cls(
+            prefix=tuple(path) + (relation.name,),
+            model=field.related_model,
+            reverse=reverse,
+            outer='__'.join(list(path) + [target]),
+        )
+
+    def exists(self, q):
+        """
+        Returns Q-object that matches objects with related objects matching
+        q, which should use lookups relative to the related model
+        """
+        queryset = self.model._base_manager.filter(q)
+        if Exists is None:
+            return models.Q(**{
+                '%s__in' % self.outer: queryset.values(self.reverse),
+            })
+        subquery = queryset.filter(**{self.reverse: OuterRef(self.outer)})
+        return models.Q(pk__djangoql_exists=Exists(subquery.values('pk')))
+
+
+@Field.register_lookup
+class ExistsLookup(Lookup):
+    """
+    Lookup with Exists() expression as value, which compiles into the
+    expression alone. Before Django 3.0 expressions can't be used in
+    filters directly.
+    """
+    lookup_name = 'djangoql_exists'
+    prepare_rhs = False
+
+    def get_prep_lookup(self):
+        return self.rhs
+
+    def as_sql(self, compiler, connection):
+        return compiler.compile(self.rhs)
+
+
+def subqueries_enabled():
+    return getattr(settings, 'DJANGOQL_EXISTS_SUBQUERIES', False)
+
+
+def to_many_relation(schema_instance, name):
+    """
+    Returns ToManyRelation of the first to-many relation in the name, or
+    None. Comparisons of relations themselves, like "groups = None", are
+    not compiled into subqueries, so None is returned for them too.
+    """
+    field, relations = schema_instance.resolve_path(name)
+    if field is None:
+        return None
+    for i, relation in enumerate(relations):
+        if relation.many:
+            return ToManyRelation.from_field(relation, name.parts[:i])
+    return None
+
+
+def subquery_relation(node, schema_instance, params=None):
+    """
+    Returns ToManyRelation for comparisons that can be compiled into EXISTS
+    subquery, or None
+    """
+    if node.operator.operator in NEGATED_OPERATORS:
+        return None
+    if isinstance(node.right, Param):
+        value = (params or {}).get(node.right.name)
+    else:
+        value = node.right.value
+    if value is None:
+        return None
+    return to_many_relation(schema_instance, node.left)
+
+
+def grouped_relations(postfix):
+    """
+    Returns a set of relations whose comparisons can be compiled into
+    subqueries with the same results as JOINs.
+
+    postfix is a sequence of comparisons, (name, operator, relation) tuples
+    with relations of subquery_relation(), and numbers of operands of
+    chains of logical operators, in postfix order. Comparisons of a relation
+    are grouped, if all of them are in subtrees that compare nothing else,
+    which are operands of the same chain, and no other comparison of the
+    relation is left to Django: comparisons with None JOIN the relation,
+    and Django correlates subqueries of negated comparisons with relations
+    JOINed in the same filter, so they match other rows without the JOIN.
+    """
+    # Relation of every subtree that compares nothing else, or None
+    stack = []
+    parents = {}  # relation -> chains with its subtrees among operands
+    # Names of comparisons left to Django
+    joined = []
+    for chain, entry in enumerate(postfix):
+        if isinstance(entry, tuple):
+            name, operator, relation = entry
+            if relation is None:
+                joined.append(name.parts)
+            stack.append(relation)
+            continue
+        operands = stack[-entry:]
+        del stack[-entry:]
+        if operands[0] is not None and \
+                operands.count(operands[0]) == len(operands):
+            stack.append(operands[0])
+            continue
+        for relation in operands:
+            if relation is not None:
+                parents.setdefault(relation, set()).add(chain)
+        stack.append(None)
+    relations = set(parents)
+    if stack and stack[0] is not None:
+        relations.add(stack[0])
+    return set(
+        relation for relation in relations
+        if len(parents.get(relation, ())) <= 1 and not any(
+            parts[:len(relation.prefix)] == relation.prefix
+            for parts in joined
+        )
+    )
+
+
+def subquery_relations(ast, schema_instance, params=None):
+    """
+    Returns a dict of id() of comparisons of given AST -> ToManyRelation of
+    the subquery they are compiled into, see grouped_relations()
+    """
+    if isinstance(ast, Truth):
+        return {}
+    postfix = []
+    comparisons = []
+    stack = [(ast, None)]
+    while stack:
+        node, operands = stack.pop()
+        if operands is not None:
+            postfix.append(len(operands))
+        elif isinstance(node.operator, Logical):
+            operands = logical_operands(node)
+            stack.append((node, operands))
+            stack.extend((operand, None) for operand in reversed(operands))
+        else:
+            relation = subquery_relation(node, schema_instance, params)
+            postfix.append((node.left, node.operator.operator, relation))
+            comparisons.append((node, relation))
+    grouped = grouped_relations(postfix)
+    return dict(
+        (id(node), relation) for node, relation in comparisons
+        if relation in grouped
+    )
+
+
+def needs_distinct(ast, schema_instance):
+    """
+    Tells if filtering with given AST may return duplicate objects, because
+    of JOINs of to-many relations
+    """
+    subqueries = {}
+    if subqueries_enabled():
+        subqueries = subquery_relations(ast, schema_instance)
+    pending = [ast]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, Truth):
+            continue
+        if isinstance(node.operator, Logical):
+            pending.append(node.right)
+            pending.append(node.left)
+            continue
+        if node.operator.operator in NEGATED_OPERATORS:
+            continue
+        field, relations = schema_instance.resolve_path(node.left)
+        if field is None or not any(r.many for r in relations):
+            continue
+        if id(node) in subqueries:
+            continue
+        return True
+    return False
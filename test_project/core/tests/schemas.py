@@ -0,0 +1,54 @@
+"""
+Schemas shared by several test modules
+"""
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import User
+
+from djangoql.schema import DjangoQLSchema, FloatField, IntField
+
+from ..models import Book
+
+
+class WrittenInYearField(IntField):
+    model = Book
+    name = 'written_in_year'
+
+    def get_lookup_name(self):
+        return 'written__year'
+
+
+class BookCustomSearchSchema(DjangoQLSchema):
+    suggest_options = {
+        Book: ['genre'],
+    }
+
+    def get_fields(self, model):
+        if model == Book:
+            return [
+                'genre', WrittenInYearField(),
+            ]
+
+
+class GenreSchema(DjangoQLSchema):
+    suggest_options = {
+        Book: ['genre'],
+    }
+
+
+class RatingLabelField(FloatField):
+    def get_options(self):
+        return ['low', 'high']
+
+
+class AllOptionsSchema(DjangoQLSchema):
+    cache_introspection = False
+    suggest_options = {
+        Book: ['name', 'genre', 'written', 'is_published', 'rating', 'price'],
+        User: ['id', 'username', 'last_login'],
+    }
+
+    def get_field_cls(self, field):
+        if field.name == 'rating':
+            return RatingLabelField
+        return super(AllOptionsSchema, self).get_field_cls(field)
@@ -1,8 +1,11 @@
+import gzip
+import io
 import json
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Group, User
 from django.test import TestCase
 
+from djangoql.admin import introspection_cache
 from djangoql.models import SavedQuery
 
 try:
@@ -30,6 +33,95 @@ class DjangoQLAdminTest(TestCase):
         for model in ('core.book', 'auth.user', 'auth.group'):
             self.assertIn(model, introspections['models'])
 
+    def test_introspection_caching(self):
+        introspection_cache.clear()
+        url = reverse('admin:core_book_djangoql_introspect')
+        self.assertTrue(self.client.login(**self.credentials))
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn(b'\n', response.content)  # compact encoding
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response['ETag'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(200, response.status_code)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('gzip', response['Content-Encoding'])
+        # Gzipped body gets a weak ETag
+        self.assertEqual('W/' + etag, response['ETag'])
+        content = gzip.GzipFile(fileobj=io.BytesIO(response.content)).read()
+        introspections = json.loads(content.decode('utf8'))
+        self.assertEqual('core.book', introspections['current_model'])
+
+        # ETags are compared weakly, so either one matches either body
+        for if_none_match in (etag, 'W/' + etag, '"other", W/' + etag):
+            response = self.client.get(
+                url,
+                HTTP_IF_NONE_MATCH=if_none_match,
+                HTTP_ACCEPT_ENCODING='gzip',
+            )
+            self.assertEqual(304, response.status_code)
+            self.assertEqual('W/' + etag, response['ETag'])
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=if_none_match)
+            self.assertEqual(304, response.status_code)
+            self.assertEqual(etag, response['ETag'])
+
+
+class DjangoQLSuggestionsTest(TestCase):
+    def setUp(self):
+        self.credentials = {'username': 'test', 'password': 'lol'}
+        User.objects.create_superuser(email='herp@derp.rr', **self.credentials)
+        for i in range(55):
+            Group.objects.create(name='name%02d' % i)
+        self.url = reverse('admin:auth_user_djangoql_suggestions')
+
+    def test_introspections_without_options(self):
+        self.assertTrue(self.client.login(**self.credentials))
+        url = reverse('admin:core_book_djangoql_introspect')
+        response = self.client.get(url)
+        introspections = json.loads(response.content.decode('utf8'))
+        book = introspections['models']['core.book']
+        self.assertIs(True, book['genre']['options'])
+        self.assertEqual([], book['name']['options'])
+
+    def test_suggestions(self):
+        response = self.client.get(self.url, {'field': 'groups.name'})
+        self.assertEqual(302, response.status_code)
+        self.assertTrue(self.client.login(**self.credentials))
+        response = self.client.get(self.url, {'field': 'groups.name'})
+        self.assertEqual(200, response.status_code)
+        data = json.loads(response.content.decode('utf8'))
+        self.assertEqual(50, len(data['items']))
+        self.assertEqual('name00', data['items'][0])
+        self.assertTrue(data['has_next'])
+        response = self.client.get(self.url, {
+            'field': 'groups.name',
+            'page': '2',
+        })
+        data = json.loads(response.content.decode('utf8'))
+        self.assertEqual(['name%s' % i for i in range(50, 55)], data['items'])
+        self.assertFalse(data['has_next'])
+        response = self.client.get(self.url, {
+            'field': 'groups.name',
+            'prefix': 'name1',
+        })
+        data = json.loads(response.content.decode('utf8'))
+        self.assertEqual(['name%s' % i for i in range(10, 20)], data['items'])
+
+    def test_errors(self):
+        self.assertTrue(self.client.login(**self.credentials))
+        for field in ('gav', 'username', 'groups'):
+            response = self.client.get(self.url, {'field': field})
+            self.assertEqual(400, response.status_code)
+            self.assertIn('error', json.loads(response.content.decode('utf8')))
+
 
 class DjangoQLSavedQueryTest(TestCase):
     def setUp(self):
@@ -113,4 +205,21 @@ class DjangoQLSavedQueryTest(TestCase):
         response = self.client.delete(url)
         self.assertEqual(200, response.status_code)
         count_after = SavedQuery.objects.count()
-        self.assertEqual(count_before, count_after+1)
\ No newline at end of file
+        self.assertEqual(count_before, count_after+1)
+
+
+class DjangoQLSearchErrorsTest(TestCase):
+    def setUp(self):
+        self.credentials = {'username': 'test', 'password': 'lol'}
+        User.objects.create_superuser(email='herp@derp.rr', **self.credentials)
+
+    def test_all_errors_reported(self):
+        self.assertTrue(self.client.login(**self.credentials))
+        url = reverse('admin:core_book_changelist')
+        response = self.client.get(url, {'q': 'foo = 1 and name = 2 or id'})
+        self.assertEqual(200, response.status_code)
+        msgs = [m.message for m in response.context['messages']]
+        self.assertEqual(3, len(msgs))
+        self.assertIn('Unknown field: foo', msgs[0])
+        self.assertIn('Field "name" has "str" type', msgs[1])
+        self.assertEqual('Unexpected end of input', msgs[2])
@@ -1,6 +1,8 @@
+import pickle
+from decimal import Decimal
 from unittest import TestCase
 
-from djangoql.ast import Expression, Name, Comparison, Const
+from djangoql.ast import Comparison, Const, Expression, List, Logical, Name
 
 
 class DjangoQLASTTest(TestCase):
@@ -13,3 +15,81 @@ class DjangoQLASTTest(TestCase):
             Expression(Name('age'), Comparison('='), Const(42)),
             Expression(Name('age'), Comparison('='), Const(18)),
         )
+
+    def test_hashing(self):
+        ast = Expression(
+            Name(['author', 'name']),
+            Comparison('in'),
+            List([Const('Tolstoy'), Const(Decimal('1.5')), Const(None)]),
+        )
+        same_ast = Expression(
+            Name('author.name'.split('.')),
+            Comparison('in'),
+            List((Const('Tolstoy'), Const(Decimal('1.5')), Const(None))),
+        )
+        self.assertEqual(hash(ast), hash(same_ast))
+        cache = {ast: 'compiled'}
+        self.assertEqual('compiled', cache[same_ast])
+        self.assertNotIn(
+            Expression(Name('author'), Comparison('in'), List([Const(1)])),
+            cache,
+        )
+
+    def test_value_types(self):
+        # Unlike Python numbers, constants of different types are different
+        for a, b in ((1, True), (1, 1.0), (0, False), (1, Decimal(1))):
+            self.assertNotEqual(Const(a), Const(b))
+            self.assertNotEqual(hash(Const(a)), hash(Const(b)))
+        self.assertNotEqual(
+            Expression(Name('a'), Comparison('in'), List([Const(1)])),
+            Expression(Name('a'), Comparison('in'), List([Const(True)])),
+        )
+        self.assertEqual(1, len({Const(1), Const(1)}))
+
+    def test_deep_trees(self):
+        def chain(n):
+            ast = Expression(Name('a'), Comparison('='), Const(0))
+            for i in range(1, n):
+                ast = Expression(
+                    Expression(Name('a'), Comparison('='), Const(i)),
+                    Logical('or'),
+                    ast,
+                )
+            return ast
+        self.assertEqual(chain(10000), chain(10000))
+        self.assertEqual(hash(chain(10000)), hash(chain(10000)))
+
+    def test_immutability(self):
+        name = Name(['author', 'name'])
+        self.assertRaises(AttributeError, setattr, name, 'parts', ('id',))
+        const = Const(42)
+        self.assertRaises(AttributeError, setattr, const, 'value', 43)
+        self.assertRaises(AttributeError, delattr, const, 'value')
+        self.assertRaises(AttributeError, setattr, const, 'foo', 1)
+
+    def test_interning(self):
+        self.assertIs(Name(['author', 'name']), Name('author.name'.split('.')))
+        self.assertIs(Comparison('='), Comparison('='))
+        self.assertIs(Logical('and'), Logical('and'))
+        self.assertIsNot(Comparison('and'), Logical('and'))
+        self.assertNotEqual(Comparison('and'), Logical('and'))
+
+    def test_pickle(self):
+        ast = Expression(
+            Expression(Name('age'), Comparison('>='), Const(18)),
+            Logical('and'),
+            Expression(Name('name'), Comparison('not in'),
+                       List([Const('Ivan'), Const(True)])),
+        )
+        restored = pickle.loads(pickle.dumps(ast, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(ast, restored)
+        self.assertIs(ast.left.left, restored.left.left)
+
+    def test_str(self):
+        self.assertEqual(
+            '<Expression: left=<Name: parts=[a, b]>, '
+            'operator=<Comparison: operator=in>, '
+            'right=<List: items=[<Const: value=1>]>>',
+            str(Expression(Name(['a', 'b']), Comparison('in'),
+                           List([Const(1)]))),
+        )
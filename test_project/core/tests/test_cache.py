@@ -0,0 +1,265 @@
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+from django.db.models.signals import post_save
+from django.test import TestCase as DjangoTestCase, override_settings
+from django.test.utils import isolate_apps
+
+from django.contrib.auth.models import User
+
+from djangoql.cache import (
+    LRUCache, OptionsCache, QueryCache, get_query_cache, options_cache,
+)
+from djangoql.parser import DjangoQLParser
+from djangoql.queryset import apply_search, parse_cache
+from djangoql.schema import DjangoQLSchema, StrField
+
+from ..models import Book
+
+
+class LRUCacheTest(TestCase):
+    def test_get_set(self):
+        cache = LRUCache(maxsize=2)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1)
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual({'hits': 1, 'misses': 1, 'maxsize': 2, 'size': 1},
+                         cache.info())
+
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')  # now 'b' is the least recently used item
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+
+    def test_resize(self):
+        cache = LRUCache(maxsize=3)
+        for key in 'abc':
+            cache.set(key, key)
+        cache.resize(1)
+        self.assertEqual(1, len(cache))
+        self.assertIn('c', cache)
+        cache.resize(0)
+        cache.set('d', 'd')
+        self.assertEqual(0, len(cache))
+
+
+class OptionsCacheTest(TestCase):
+    def loader(self, value):
+        self.loads.append(value)
+        return value
+
+    def setUp(self):
+        self.loads = []
+
+    def test_get(self):
+        cache = OptionsCache(maxsize=2)
+        self.assertEqual(1, cache.get((Book, 'a'), lambda: self.loader(1)))
+        self.assertEqual(1, cache.get((Book, 'a'), lambda: self.loader(2)))
+        self.assertEqual([1], self.loads)
+        cache.get((Book, 'b'), lambda: self.loader(3))
+        cache.get((Book, 'c'), lambda: self.loader(4))
+        self.assertEqual(2, len(cache))
+        self.assertNotIn((Book, 'a'), cache)
+
+    def test_disabled(self):
+        cache = OptionsCache(maxsize=0)
+        cache.get((Book, 'a'), lambda: self.loader(1))
+        cache.get((Book, 'a'), lambda: self.loader(2))
+        self.assertEqual([1, 2], self.loads)
+
+    def test_stale_while_revalidate(self):
+        cache = OptionsCache(timeout=-1)
+        cache.get((Book, 'a'), lambda: self.loader(1))
+        refreshed = threading.Event()
+
+        def refresh():
+            refreshed.wait()
+            return self.loader(2)
+
+        # Expired value is returned at once, and refreshed in background
+        self.assertEqual(1, cache.get((Book, 'a'), refresh))
+        refreshed.set()
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and thread.daemon:
+                thread.join(5)
+        self.assertEqual([1, 2], self.loads)
+        cache.timeout = 60
+        self.assertEqual(2, cache.get((Book, 'a'), lambda: self.loader(3)))
+
+    def test_single_refresh_thread(self):
+        cache = OptionsCache(timeout=-1)
+        for key in 'abc':
+            cache.get((Book, key), lambda: self.loader(1))
+        refreshed = threading.Event()
+        threads = set()
+
+        def refresh():
+            refreshed.wait()
+            threads.add(threading.current_thread())
+            return self.loader(2)
+
+        for key in 'abc':
+            cache.get((Book, key), refresh)
+        thread = cache._refresh_thread
+        refreshed.set()
+        thread.join(5)
+        self.assertEqual({thread}, threads)
+        self.assertEqual([1, 1, 1, 2, 2, 2], self.loads)
+
+    def test_refresh_in_place(self):
+        cache = OptionsCache(timeout=-1, background_refresh=False)
+        cache.get((Book, 'a'), lambda: self.loader(1))
+        self.assertEqual(2, cache.get((Book, 'a'), lambda: self.loader(2)))
+
+    def test_invalidate(self):
+        cache = OptionsCache()
+        cache.set((Book, 'a'), 1)
+        cache.set((User, 'a'), 1)
+        cache.invalidate(Book)
+        self.assertNotIn((Book, 'a'), cache)
+        self.assertIn((User, 'a'), cache)
+
+    def test_watch(self):
+        cache = OptionsCache()
+        cache.set((Book, 'a'), 1)
+        # Signals are connected for models with cached options only
+        self.assertEqual({Book}, set(cache._families))
+        self.assertTrue(post_save.has_listeners(Book))
+
+
+class OptionsCacheSignalsTest(DjangoTestCase):
+    def setUp(self):
+        options_cache.clear()
+        self.author = User.objects.create(username='author')
+
+    def test_save_and_delete(self):
+        field = StrField(model=Book, name='name', suggest_options=True)
+        Book.objects.create(name='a', author=self.author)
+        self.assertEqual(['a'], field.get_cached_options())
+        with self.assertNumQueries(0):
+            self.assertEqual(['a'], field.as_dict()['options'])
+        book = Book.objects.create(name='b', author=self.author)
+        self.assertEqual(['a', 'b'], field.get_cached_options())
+        self.assertEqual(['b'], field.get_suggestions('b'))
+        with self.assertNumQueries(0):
+            field.get_suggestions('b')
+        book.delete()
+        self.assertEqual(['a'], field.get_cached_options())
+        self.assertEqual([], field.get_suggestions('b'))
+
+    @isolate_apps('core')
+    def test_proxy(self):
+        class BookProxy(Book):
+            class Meta:
+                proxy = True
+
+        proxy_field = StrField(model=BookProxy, name='name',
+                               suggest_options=True)
+        field = StrField(model=Book, name='name', suggest_options=True)
+        Book.objects.create(name='a', author=self.author)
+        self.assertEqual(['a'], proxy_field.get_cached_options())
+        self.assertEqual(['a'], field.get_cached_options())
+        book = BookProxy.objects.create(name='b', author=self.author)
+        self.assertEqual(['a', 'b'], field.get_cached_options())
+        self.assertEqual(['a', 'b'], proxy_field.get_cached_options())
+        Book.objects.get(pk=book.pk).delete()
+        self.assertEqual(['a'], proxy_field.get_cached_options())
+        self.assertEqual(['a'], field.get_cached_options())
+
+
+class QueryCacheTest(DjangoTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        parse_cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def backends(self):
+        return [
+            {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': self.tmp_dir,
+            },
+        ]
+
+    def test_get_set(self):
+        ast = DjangoQLParser().parse('name = "foo"')
+        schema_instance = DjangoQLSchema(Book)
+        for backend in self.backends():
+            with override_settings(CACHES={'default': backend}):
+                query_cache = QueryCache()
+                self.assertIsNone(query_cache.get('name = "foo"',
+                                                  schema_instance))
+                query_cache.set('name = "foo"', schema_instance, ast)
+                self.assertEqual(
+                    ast,
+                    query_cache.get('name = "foo"', schema_instance),
+                )
+                query_cache.cache.clear()
+
+    def test_schema_in_key(self):
+        query_cache = QueryCache()
+        self.assertNotEqual(
+            query_cache.make_key('id = 1', DjangoQLSchema(Book)),
+            query_cache.make_key('id = 1', BookIdSchema(Book)),
+        )
+
+    def test_version_in_key(self):
+        DjangoQLSchema.clear_cache()
+        schema_instance = LazyBookSchema(Book)
+        with self.assertNumQueries(0):
+            key = QueryCache().make_key('id = 1', schema_instance)
+        # Computed without introspection, once per schema
+        self.assertIsNone(schema_instance._models)
+        self.assertEqual({}, DjangoQLSchema._fields_cache)
+        self.assertEqual(key, QueryCache().make_key(
+            'id = 1',
+            LazyBookSchema(Book),
+        ))
+        self.assertNotEqual(key, QueryCache().make_key(
+            'id = 1',
+            DjangoQLSchema(Book),
+        ))
+
+    def test_setting(self):
+        self.assertIsNone(get_query_cache())
+        with override_settings(DJANGOQL_QUERY_CACHE='default'):
+            self.assertIsInstance(get_query_cache(), QueryCache)
+
+    def test_apply_search(self):
+        search = 'name = "foo" and genre = 1'
+        for backend in self.backends():
+            with override_settings(
+                CACHES={'default': backend},
+                DJANGOQL_QUERY_CACHE='default',
+            ):
+                parse_cache.clear()
+                apply_search(Book.objects.all(), search)
+                query_cache = get_query_cache()
+                ast = query_cache.get(search, DjangoQLSchema(Book))
+                self.assertEqual(DjangoQLParser().parse(search), ast)
+                # Another process would pick the query from shared cache
+                parse_cache.clear()
+                qs = apply_search(Book.objects.all(), search)
+                self.assertIn('"core_book"."genre" = 1', str(qs.query))
+                query_cache.cache.clear()
+
+
+class BookIdSchema(DjangoQLSchema):
+    def get_fields(self, model):
+        return ['id']
+
+
+class LazyBookSchema(DjangoQLSchema):
+    lazy_introspection = True
+    suggest_options = {Book: ['name', 'genre']}
@@ -0,0 +1,164 @@
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from djangoql.ast import Param, Truth
+from djangoql.compiler import compile_search, plan_cache, search_shape
+from djangoql.exceptions import DjangoQLSchemaError
+from djangoql.parser import parse
+from djangoql.queryset import apply_search
+from djangoql.schema import DjangoQLSchema
+
+from ..models import Book
+from .schemas import AllOptionsSchema
+
+
+class CompileSearchTest(TestCase):
+    def setUp(self):
+        plan_cache.clear()
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        for name, author in (('a', self.alice), ('b', self.alice),
+                             ('c', self.bob)):
+            Book.objects.create(name=name, author=author)
+
+    def names(self, qs):
+        return sorted(qs.values_list('name', flat=True))
+
+    def test_params(self):
+        plan = compile_search(Book, 'author.id = :uid and name in :names')
+        self.assertEqual(('uid', 'names'), plan.params)
+        qs = Book.objects.all()
+        self.assertEqual(['a', 'b'], self.names(plan.apply(qs, {
+            'uid': self.alice.id,
+            'names': ['a', 'b', 'c'],
+        })))
+        self.assertEqual(['c'], self.names(plan.apply(qs, {
+            'uid': self.bob.id,
+            'names': ('c',),
+        })))
+
+    def test_param_errors(self):
+        plan = compile_search(Book, 'author.id = :uid or id in :ids')
+        qs = Book.objects.all()
+        with self.assertRaises(DjangoQLSchemaError) as cm:
+            plan.apply(qs, {'uid': 1})
+        self.assertEqual('Missing value for parameter :ids', str(cm.exception))
+        self.assertRaises(DjangoQLSchemaError, plan.apply, qs, {
+            'uid': 'alice',
+            'ids': [],
+        })
+        self.assertRaises(DjangoQLSchemaError, plan.apply, qs, {
+            'uid': 1,
+            'ids': 1,
+        })
+        with self.assertRaises(DjangoQLSchemaError) as cm:
+            plan.apply(qs, {'uid': 1, 'ids': [], 'foo': 1})
+        self.assertEqual('Unknown parameters: :foo', str(cm.exception))
+        self.assertRaises(ValueError, plan.apply, User.objects.all(), {
+            'uid': 1,
+            'ids': [],
+        })
+
+    def test_same_results(self):
+        for search in (
+                'name = "a" or (author.username = "bob" and id > 0)',
+                'name not in ("a", "b") and author != None',
+                'written ~ "2017-01-01" or genre = None'):
+            self.assertEqual(
+                self.names(apply_search(Book.objects.all(), search)),
+                self.names(compile_search(Book, search).apply(
+                    Book.objects.all(),
+                )),
+            )
+
+    @override_settings(DJANGOQL_OPTIMIZE=True)
+    def test_optimize(self):
+        plan = compile_search(Book, 'name = "a" or name = "b" or name = "a"')
+        self.assertEqual(['name__in'], [
+            lookup.lookup for lookup in plan.lookups
+        ])
+        self.assertEqual((['a', 'b'],), plan.literals)
+        qs = Book.objects.all()
+        self.assertEqual(['a', 'b'], self.names(plan.apply(qs)))
+        plan = compile_search(Book, 'id = 1 and id = 2')
+        self.assertEqual((), plan.lookups)
+        with self.assertNumQueries(0):
+            self.assertEqual([], list(plan.apply(qs)))
+        plan = compile_search(Book, 'name = "a" or name != "a"')
+        self.assertEqual(3, plan.apply(qs).count())
+        # Plans are cached by shapes of optimized searches
+        self.assertEqual(
+            (('truth', False),),
+            search_shape(Truth(False))[0],
+        )
+        self.assertEqual(3, len(plan_cache))
+        self.assertRaises(DjangoQLSchemaError, compile_search, Book, 'x = 1')
+
+    def test_shape(self):
+        shape, literals = search_shape(
+            parse('a = 1 and (b in (1, 2) or c = :c)'),
+        )
+        self.assertEqual(
+            ['compare', 'compare', 'compare', 'combine', 'combine'],
+            [entry[0] for entry in shape],
+        )
+        self.assertEqual(Param(name='c'), shape[2][3])
+        self.assertEqual([1, [1, 2]], literals)
+
+    def test_plan_cache(self):
+        plan1 = compile_search(Book, 'name = "a"')
+        plan2 = compile_search(Book, 'name  =  "b"')
+        self.assertEqual(1, len(plan_cache))
+        self.assertIs(plan1.lookups, plan2.lookups)
+        self.assertEqual(('a',), plan1.literals)
+        self.assertEqual(('b',), plan2.literals)
+        qs = Book.objects.all()
+        self.assertEqual(['b'], self.names(plan2.apply(qs)))
+        # Literals are validated for each search
+        self.assertRaises(
+            DjangoQLSchemaError,
+            compile_search,
+            Book,
+            'name = 1',
+        )
+        self.assertRaises(AttributeError, setattr, plan1, 'literals', ())
+
+    def test_plan_cache_clear(self):
+        compile_search(Book, 'name = "a"')
+        # Plans of schemas without introspection caching aren't shared
+        compile_search(Book, 'rating = "low"', schema=AllOptionsSchema)
+        self.assertEqual(1, len(plan_cache))
+        DjangoQLSchema.clear_cache()
+        self.assertEqual(0, len(plan_cache))
+
+    def test_lookups(self):
+        plan = compile_search(
+            Book,
+            'author.username ~ "a" and id not in :ids and '
+            'written > "2017-01-01"',
+        )
+        self.assertEqual(
+            ['author__username__icontains', 'id__in', None],
+            [lookup.lookup for lookup in plan.lookups],
+        )
+        self.assertEqual(
+            [False, True, None],
+            [lookup.invert for lookup in plan.lookups],
+        )
+        self.assertEqual('username', plan.lookups[0].field.name)
+
+    def test_lazy_field(self):
+        plan = compile_search(Book, 'rating = "low"', schema=AllOptionsSchema)
+        self.assertEqual(
+            ['rating'],
+            [lookup.lookup for lookup in plan.lookups],
+        )
+
+    def test_queryset_params(self):
+        qs = Book.objects.djangoql(
+            'author.id = :uid',
+            params={'uid': self.bob.id},
+        )
+        self.assertEqual(['c'], self.names(qs))
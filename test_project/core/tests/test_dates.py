@@ -0,0 +1,108 @@
+from __future__ import unicode_literals
+
+from datetime import date, datetime, timedelta
+
+from django.test import TestCase, override_settings
+from django.utils.timezone import get_fixed_timezone, override
+
+from djangoql.dates import parse_cache, parse_date, parse_datetime
+from djangoql.exceptions import DjangoQLSchemaError
+from djangoql.schema import DateField, DateTimeField
+
+from ..models import Book
+
+
+class ParseDatesTest(TestCase):
+    def setUp(self):
+        parse_cache.clear()
+
+    def test_parse_date(self):
+        self.assertEqual(date(2017, 1, 30), parse_date('2017-01-30'))
+        # Former strptime() format is still supported
+        self.assertEqual(date(2017, 1, 5), parse_date('2017-1-5'))
+        for value in ('2017-02-30', '2017-01-30 10:00', '30.01.2017', '',
+                      '2017-01-30\n'):
+            self.assertRaises(ValueError, parse_date, value)
+
+    def test_parse_datetime(self):
+        self.assertEqual(datetime(2017, 1, 30), parse_datetime('2017-01-30'))
+        self.assertEqual(
+            datetime(2017, 1, 30, 10, 20),
+            parse_datetime('2017-01-30 10:20'),
+        )
+        self.assertEqual(
+            datetime(2017, 1, 30, 10, 20, 30, 500000),
+            parse_datetime('2017-01-30T10:20:30.5'),
+        )
+        self.assertEqual(
+            datetime(2017, 1, 30, 10, 20, 30, 123456),
+            parse_datetime('2017-01-30 10:20:30,1234567'),
+        )
+        for value in ('2017-01-30 25:00', '2017-01-30 10', '2017-01-30T',
+                      '2017-01-30\n', '2017-01-30 10:20Z\n'):
+            self.assertRaises(ValueError, parse_datetime, value)
+
+    def test_offsets(self):
+        for value, minutes in (
+                ('2017-01-30T10:20Z', 0),
+                ('2017-01-30 10:20:30+03:00', 180),
+                ('2017-01-30 10:20:30.5-0530', -330),
+                ('2017-01-30T10:20+01', 60)):
+            self.assertEqual(
+                timedelta(minutes=minutes),
+                parse_datetime(value).utcoffset(),
+            )
+
+    def test_memoized(self):
+        parse_datetime('2017-01-30 10:20')
+        parse_datetime('2017-01-30 10:20')
+        self.assertEqual(1, parse_cache.info()['hits'])
+
+
+class DateFieldsTest(TestCase):
+    def test_date_list(self):
+        field = DateField(name='day')
+        self.assertEqual(
+            [date(2017, 1, 30), date(2017, 1, 31)],
+            field.get_lookup_value(['2017-01-30', '2017-01-31']),
+        )
+        self.assertRaises(DjangoQLSchemaError, field.validate, '2017-01-32')
+
+    def test_timezones(self):
+        field = DateTimeField(name='written')
+        with override('Europe/Moscow'):
+            dt = field.get_lookup_value('2017-01-30 10:20')
+            self.assertEqual('Europe/Moscow', str(dt.tzinfo))
+        dt = field.get_lookup_value('2017-01-30 10:20+03:00')
+        self.assertEqual(get_fixed_timezone(180), dt.tzinfo)
+        with override_settings(USE_TZ=False):
+            self.assertEqual(
+                datetime(2017, 1, 30, 7, 20),
+                field.get_lookup_value('2017-01-30 10:20+03:00'),
+            )
+
+    def test_memoized_timezones(self):
+        parse_cache.clear()
+        field = DateTimeField(name='written')
+        with override('Europe/Moscow'):
+            field.get_lookup_value(['2017-01-30 10:20', '2017-01-30 10:20'])
+            self.assertEqual(1, parse_cache.info()['hits'])
+        # Timezone is a part of the memo key
+        with override('America/Chicago'):
+            dt = field.get_lookup_value('2017-01-30 10:20')
+            self.assertEqual('America/Chicago', str(dt.tzinfo))
+        with override_settings(USE_TZ=False):
+            dt = field.get_lookup_value('2017-01-30 10:20')
+            self.assertIsNone(dt.tzinfo)
+        self.assertEqual(1, parse_cache.info()['hits'])
+
+    def test_in_list(self):
+        qs = Book.objects.djangoql(
+            'written in ("2017-01-30", "2017-01-30T10:20:30Z")',
+        )
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        self.assertEqual(
+            '"core_book"."written" IN '
+            '(2017-01-30 00:00:00, 2017-01-30 10:20:30)',
+            where_clause,
+        )
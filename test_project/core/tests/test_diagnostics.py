@@ -0,0 +1,73 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase
+
+from djangoql.diagnostics import diagnose
+from djangoql.exceptions import (
+    DjangoQLLexerError, DjangoQLParserError, DjangoQLSchemaError,
+)
+from djangoql.schema import DjangoQLSchema
+
+from ..models import Book
+
+
+class DiagnosticsTest(TestCase):
+    def setUp(self):
+        self.schema = DjangoQLSchema(Book)
+
+    def positions(self, errors):
+        return [(e.__class__, e.line, e.column) for e in errors]
+
+    def test_valid_search(self):
+        self.assertEqual([], diagnose('name = "x" and id in (1, 2)'))
+        self.assertEqual(
+            [],
+            diagnose('name = "x" and author.username ~ "y"', self.schema),
+        )
+
+    def test_lexer_errors(self):
+        errors = diagnose('id = $ and name = "x" and rating = @')
+        self.assertEqual([
+            (DjangoQLLexerError, 1, 6),
+            (DjangoQLLexerError, 1, 36),
+        ], self.positions(errors))
+        self.assertEqual("Illegal character '$'", errors[0].args[0])
+
+    def test_parser_errors(self):
+        errors = diagnose('name = and id = 1 id = 2 and (rating > 1')
+        self.assertEqual([
+            (DjangoQLParserError, 1, 8),
+            (DjangoQLParserError, 1, 19),
+            (DjangoQLParserError, None, None),
+        ], self.positions(errors))
+        self.assertEqual('Unexpected end of input', text(errors[-1]))
+
+    def test_schema_errors(self):
+        errors = diagnose(
+            'name = 1 and\n  foo = 2 and rating in (1, "x", 2, "y")',
+            self.schema,
+        )
+        self.assertEqual([
+            (DjangoQLSchemaError, 1, 8),
+            (DjangoQLSchemaError, 2, 3),
+            (DjangoQLSchemaError, 2, 29),
+            (DjangoQLSchemaError, 2, 37),
+        ], self.positions(errors))
+        self.assertIn('Unknown field: foo', text(errors[1]))
+
+    def test_all_kinds_of_errors(self):
+        errors = diagnose('foo = 1 or id = $ or name ~', self.schema)
+        self.assertEqual([
+            (DjangoQLSchemaError, 1, 1),
+            (DjangoQLLexerError, 1, 17),
+            (DjangoQLParserError, None, None),
+        ], self.positions(errors))
+
+    def test_no_cascading_errors(self):
+        # Illegal characters are reported once, not as syntax errors too
+        self.assertEqual(1, len(diagnose('id = $')))
+        self.assertEqual(1, len(diagnose('name = "unterminated and id = 1')))
+
+
+def text(error):
+    return error.args[0]
@@ -76,6 +76,13 @@ class DjangoQLLexerTest(TestCase):
                 [('STRING_VALUE', s.strip('"'))]
             )
 
+    def test_parameter(self):
+        self.assert_output(
+            self.lexer.input('a = :uid'),
+            [('NAME', 'a'), ('EQUALS', '='), ('PARAMETER', 'uid')],
+        )
+        self.assertRaises(DjangoQLLexerError, list, self.lexer.input(':1'))
+
     def test_illegal_chars(self):
         for s in ('"', '^'):
             try:
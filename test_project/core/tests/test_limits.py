@@ -0,0 +1,81 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase, override_settings
+
+from djangoql.exceptions import (
+    DjangoQLLexerError, DjangoQLLimitError, DjangoQLSyntaxError,
+)
+from djangoql.limits import check_limits, check_search, get_limits
+from djangoql.parser import DjangoQLParser
+from djangoql.queryset import parse_cache
+from djangoql.rdparser import DjangoQLRDParser
+
+from ..models import Book
+
+
+class LimitsTest(TestCase):
+    def test_max_length(self):
+        check_limits('name = "%s"' % ('x' * 90), max_length=100)
+        with self.assertRaises(DjangoQLLimitError) as cm:
+            check_limits('name = "%s"' % ('x' * 100), max_length=100)
+        self.assertIn('109 characters, the limit is 100', str(cm.exception))
+        check_limits('name = "%s"' % ('x' * 100), max_length=None)
+
+    def test_max_depth(self):
+        query = '((id = 1 and (id = 2)) or (id = 3))'
+        check_limits(query, max_depth=3)
+        with self.assertRaises(DjangoQLLimitError) as cm:
+            check_limits(query, max_depth=2)
+        self.assertEqual((1, 14), (cm.exception.line, cm.exception.column))
+        # Parenthesis in strings and lists don't count
+        check_limits('(name = "((((" and id in (1, 2))', max_depth=1)
+        check_limits('(' * 1000 + 'id = 1' + ')' * 1000, max_depth=0)
+
+    def test_max_list_size(self):
+        check_limits('id in (1, 2, 3) or id not in (4, 5, 6)', max_list_size=3)
+        with self.assertRaises(DjangoQLLimitError) as cm:
+            check_limits('id in (1, 2) or\nid not in (4, 5, 6)',
+                         max_list_size=2)
+        self.assertEqual((2, 18), (cm.exception.line, cm.exception.column))
+        check_limits('name in ("a,b,c", "d")', max_list_size=2)
+
+    def test_lexer_errors(self):
+        self.assertRaises(
+            DjangoQLLexerError,
+            check_limits,
+            '(id = $)',
+            max_depth=10,
+        )
+
+    def test_defaults(self):
+        self.assertEqual((None, 100, None), get_limits())
+        with override_settings(DJANGOQL_MAX_NESTING_DEPTH=None):
+            self.assertEqual((None, None, None), get_limits())
+
+    def test_defaults_accept_large_searches(self):
+        # Long "or" chains and large lists are optimized for, so they must
+        # pass the default limits
+        check_search(' or '.join('id = %s' % i for i in range(10000)))
+        check_search('id in (%s)' % ', '.join(str(i) for i in range(50000)))
+        check_search('id in (%s)' % ', '.join(str(i) for i in range(100000)))
+
+    @override_settings(DJANGOQL_MAX_NESTING_DEPTH=5, DJANGOQL_MAX_LIST_SIZE=5)
+    def test_apply_search(self):
+        parse_cache.clear()
+        query = '(' * 6 + 'id = 1' + ')' * 6
+        self.assertRaises(DjangoQLSyntaxError, Book.objects.djangoql, query)
+        self.assertRaises(
+            DjangoQLLimitError,
+            Book.objects.djangoql,
+            'id in (1, 2, 3, 4, 5, 6)',
+        )
+        Book.objects.djangoql('id in (1, 2, 3, 4, 5)')
+
+    def test_parsers_scale(self):
+        # Both parsers handle large lists and deep nesting
+        items = ', '.join(['1'] * 50000)
+        nested = '(' * 5000 + 'id = 1' + ')' * 5000
+        for parser in (DjangoQLParser(), DjangoQLRDParser()):
+            ast = parser.parse('a in (%s)' % items)
+            self.assertEqual(50000, len(ast.right.items))
+            self.assertEqual('id', parser.parse(nested).left.value)
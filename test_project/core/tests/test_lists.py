@@ -0,0 +1,73 @@
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from djangoql import lists
+from djangoql.lists import chunks_strategy, list_operator
+
+from ..models import Book
+
+
+def chunk_strategy_of_two(lookup, compiler, connection):
+    with override_settings(DJANGOQL_LIST_CHUNK_SIZE=2):
+        return chunks_strategy(lookup, compiler, connection)
+
+
+@override_settings(DJANGOQL_LARGE_LIST_THRESHOLD=3)
+class LargeListsTest(TestCase):
+    def setUp(self):
+        author = User.objects.create(username='author')
+        for i in range(6):
+            Book.objects.create(name=str(i), author=author, rating=i or None)
+
+    def where(self, qs):
+        return str(qs.query).split('WHERE')[1].strip()
+
+    def test_threshold(self):
+        self.assertEqual('__in', list_operator('__in', [1, 2, 3]))
+        self.assertEqual('__djangoql_in', list_operator('__in', [1, 2, 3, 4]))
+        self.assertEqual('__gt', list_operator('__gt', [1, 2, 3, 4]))
+        with override_settings(DJANGOQL_LARGE_LIST_THRESHOLD=None):
+            self.assertEqual('__in', list_operator('__in', [1, 2, 3, 4]))
+
+    def test_unsupported(self):
+        # Django < 2.0
+        lists.LARGE_LISTS_SUPPORTED = False
+        try:
+            self.assertEqual('__in', list_operator('__in', [1, 2, 3, 4]))
+            qs = Book.objects.djangoql('rating in (1, 2, 3, 4)')
+            self.assertEqual([1, 2, 3, 4], sorted(b.rating for b in qs))
+        finally:
+            lists.LARGE_LISTS_SUPPORTED = True
+
+    def test_json(self):
+        qs = Book.objects.djangoql('name in ("1", "3", "5", "7")')
+        self.assertIn(
+            '"core_book"."name" IN (SELECT value FROM json_each(',
+            self.where(qs),
+        )
+        self.assertEqual(['1', '3', '5'], sorted(b.name for b in qs))
+        qs = Book.objects.djangoql('rating not in (1, 3, 5, 7)')
+        self.assertEqual(['0', '2', '4'], sorted(b.name for b in qs))
+
+    @override_settings(DJANGOQL_LARGE_LIST_STRATEGIES={
+        'sqlite': 'core.tests.test_lists.chunk_strategy_of_two',
+    })
+    def test_custom_strategy(self):
+        qs = Book.objects.djangoql('name in ("1", "3", "5", "7", "9")')
+        self.assertEqual(
+            '("core_book"."name" IN (1, 3) OR "core_book"."name" IN (5, 7) OR '
+            '"core_book"."name" IN (9))',
+            self.where(qs),
+        )
+        self.assertEqual(['1', '3', '5'], sorted(b.name for b in qs))
+
+    @override_settings(DJANGOQL_LARGE_LIST_STRATEGIES={'sqlite': 'array'})
+    def test_array(self):
+        # Can't be executed on SQLite, so only SQL is checked
+        qs = Book.objects.djangoql('id in (1, 2, 3, 4)')
+        self.assertEqual(
+            '"core_book"."id" = ANY([1, 2, 3, 4]::integer[])',
+            self.where(qs),
+        )
@@ -0,0 +1,155 @@
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+
+from djangoql.compiler import compile_search
+from djangoql.queryset import apply_search
+
+from ..models import Book
+from .schemas import GenreSchema
+
+
+class ExplicitNegationTest(TestCase):
+    def setUp(self):
+        alice = User.objects.create(username='alice', email='a@a')
+        bob = User.objects.create(username='bob', email='b@b')
+        User.objects.create(username='carol')
+        user_type = ContentType.objects.get_for_model(User)
+        for i, (name, author) in enumerate((('war', alice),
+                                            ('peace', alice),
+                                            ('War2', bob),
+                                            ('other', bob))):
+            Book.objects.create(
+                name=name,
+                author=author,
+                rating=i or None,
+                genre=i or None,
+                content_type=user_type if i % 2 else None,
+            )
+
+    def where(self, search, model=Book):
+        qs = apply_search(model.objects.all(), search, schema=GenreSchema)
+        return str(qs.query).split('WHERE', 1)[1].strip()
+
+    def ids(self, search, model=Book):
+        qs = apply_search(model.objects.all(), search, schema=GenreSchema)
+        return sorted(qs.values_list('id', flat=True))
+
+    def test_same_results(self):
+        searches = [
+            (Book, 'name != "war"'),
+            (Book, 'rating != 2'),
+            (Book, 'rating != None'),
+            (Book, 'name !~ "war"'),
+            (Book, 'rating not in (1, 2)'),
+            (Book, 'genre not in ("Drama", "Other")'),
+            (Book, 'genre not in ("Unknown")'),
+            (Book, 'genre != "Comics" and name != "other"'),
+            (Book, 'author.email != "a@a"'),
+            (Book, 'content_type.model != "user"'),
+            (User, 'book.name !~ "war" and book.name != "peace"'),
+            (User, 'book.name != "war"'),
+            (User, 'book.rating not in (1, 2) or username = "bob"'),
+            (User, 'book.rating != None'),
+            (User, 'book != None'),
+        ]
+        for model, search in searches:
+            with override_settings(DJANGOQL_EXPLICIT_NEGATION=False):
+                expected = self.ids(search, model)
+            with override_settings(DJANGOQL_EXPLICIT_NEGATION=True):
+                self.assertEqual(expected, self.ids(search, model), search)
+
+    def test_joined_relations(self):
+        u1 = User.objects.create(username='u1')
+        u2 = User.objects.create(username='u2')
+        for price, rating, author in ((1.5, 4, u1), (3, 1, u1), (3, 1, u2)):
+            Book.objects.create(name='b', price=price, rating=rating,
+                                author=author)
+        users = User.objects.filter(username__in=['u1', 'u2'])
+        for search in ('book.price in (1.5, 3.0) and book.rating != 4.0',
+                       'book.rating != 4.0 and book.price in (1.5, 3.0)',
+                       'book.price > 2 and book.rating not in (4.0, 5.0)',
+                       'book.price = 1.5 or book.name !~ "b"'):
+            results = []
+            for explicit in (False, True):
+                with override_settings(DJANGOQL_EXPLICIT_NEGATION=explicit):
+                    qs = apply_search(users, search, schema=GenreSchema)
+                    results.append(sorted(set(u.username for u in qs)))
+                    plan = compile_search(User, search, GenreSchema)
+                    results.append(sorted(set(
+                        u.username for u in plan.apply(users)
+                    )))
+            self.assertEqual([results[0]] * 4, results, search)
+        with override_settings(DJANGOQL_EXPLICIT_NEGATION=True):
+            self.assertEqual(['u1', 'u2'], sorted(set(
+                u.username for u in apply_search(
+                    users,
+                    'book.price in (1.5, 3.0) and book.rating != 4.0',
+                )
+            )))
+
+    def test_compiled(self):
+        searches = [
+            (Book, 'rating != :rating and name !~ "war"', {'rating': 2}),
+            (Book, 'genre not in :genres', {'genres': ['Drama', 'Other']}),
+            (Book, 'rating != :rating', {'rating': None}),
+            (User, 'book.name != :name', {'name': 'war'}),
+        ]
+        for model, search, params in searches:
+            plan = compile_search(model, search, GenreSchema)
+            for explicit in (False, True):
+                with override_settings(DJANGOQL_EXPLICIT_NEGATION=explicit):
+                    expected = apply_search(
+                        model.objects.all(),
+                        search,
+                        schema=GenreSchema,
+                        params=params,
+                    )
+                    qs = plan.apply(model.objects.all(), params)
+                    self.assertEqual(str(expected.query), str(qs.query))
+                    self.assertEqual(
+                        sorted(expected.values_list('id', flat=True)),
+                        sorted(qs.values_list('id', flat=True)),
+                    )
+
+    @override_settings(DJANGOQL_EXPLICIT_NEGATION=True)
+    def test_sql(self):
+        self.assertEqual(
+            '"core_book"."name" <> war',
+            self.where('name != "war"'),
+        )
+        # IS NULL is added for nullable fields only
+        self.assertEqual(
+            '("core_book"."rating" <> 2.0 OR "core_book"."rating" IS NULL)',
+            self.where('rating != 2'),
+        )
+        self.assertEqual(
+            '("core_book"."genre" NOT IN (1, 3) OR '
+            '"core_book"."genre" IS NULL)',
+            self.where('genre not in ("Drama", "Other")'),
+        )
+        self.assertEqual(
+            'NOT ("core_book"."name" LIKE %war% ESCAPE \'\\\')',
+            self.where('name !~ "war"'),
+        )
+        # Nullable relations
+        self.assertEqual(
+            '"auth_user"."email" <> a@a',
+            self.where('author.email != "a@a"'),
+        )
+        self.assertIn(
+            'OR "django_content_type"."model" IS NULL',
+            self.where('content_type.model != "user"'),
+        )
+        # To-many relations
+        self.assertEqual(
+            'NOT (EXISTS(SELECT U0."id" FROM "core_book" U0 WHERE '
+            '(U0."name" = war AND U0."author_id" = ("auth_user"."id"))))',
+            self.where('book.name != "war"', User),
+        )
+        self.assertEqual(
+            '"core_book"."rating" IS NOT NULL',
+            self.where('rating != None'),
+        )
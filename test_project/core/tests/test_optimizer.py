@@ -0,0 +1,286 @@
+from __future__ import unicode_literals
+
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from djangoql.ast import Truth
+from djangoql.optimizer import (
+    contradictions, dedupe, explain, flatten, merge_in, optimize,
+    order_by_cost, report, to_search,
+)
+from djangoql.parser import parse
+from djangoql.queryset import apply_search
+from djangoql.schema import DjangoQLSchema
+
+from ..models import Book
+from .schemas import BookCustomSearchSchema, GenreSchema
+
+
+def reverse_rule(operator, operands, schema_instance):
+    return list(reversed(operands))
+
+
+class OptimizerRulesTest(TestCase):
+    def optimize(self, search, rules, model=Book, schema=DjangoQLSchema):
+        return to_search(optimize(parse(search), schema(model), rules=rules))
+
+    def test_flatten(self):
+        self.assertEqual(
+            'id = 1 or id = 2 or id = 3',
+            self.optimize(
+                'id = 1 or (id = 2 and id = 2) or id = 3',
+                [dedupe, flatten],
+            ),
+        )
+
+    def test_dedupe(self):
+        self.assertEqual(
+            'rating != None and id = 1',
+            self.optimize(
+                'rating != None and id = 1 and rating != None',
+                [dedupe],
+            ),
+        )
+
+    def test_merge_in(self):
+        self.assertEqual(
+            'id in (1, 2, 3) or name = "a"',
+            self.optimize(
+                'id = 1 or name = "a" or id in (2, 1) or id = 3',
+                [merge_in],
+            ),
+        )
+        self.assertEqual(
+            'name not in ("a", "b") and id = 1',
+            self.optimize('name != "a" and id = 1 and name != "b"',
+                          [merge_in]),
+        )
+        # None, placeholders and other operators are left alone
+        for search in ('rating = None or rating = 1',
+                       'id = :a or id = 2',
+                       'id = 1 and id = 2',
+                       'id > 1 or id > 2'):
+            self.assertEqual(search, self.optimize(search, [merge_in]))
+        # Custom lookups too
+        search = 'written = "2017-01-01" or written = "2018-01-01"'
+        self.assertEqual(search, self.optimize(search, [merge_in]))
+        self.assertEqual(
+            'written_in_year in (2017, 2018)',
+            self.optimize(
+                'written_in_year = 2017 or written_in_year = 2018',
+                [merge_in],
+                schema=BookCustomSearchSchema,
+            ),
+        )
+
+    def test_contradictions(self):
+        for search in ('id = 1 and id = 2',
+                       'rating = None and rating != None',
+                       'id in (1, 2) and id != 1 and id != 2',
+                       'id in (1, 2) and id in (3, 4)',
+                       'name = "a" and name != "a"',
+                       'name = "a" and name = None',
+                       'genre = "Drama" and genre = 2'):
+            self.assertEqual(
+                '<nothing>',
+                self.optimize(search, [contradictions]),
+            )
+        for search in ('id = 1 or id != 1',
+                       'rating = None or rating != None',
+                       'id in (1, 2) or id not in (2, 1)',
+                       'author.email = "a" or author.email != "a"'):
+            self.assertEqual(
+                '<everything>',
+                self.optimize(search, [contradictions]),
+            )
+        # Strings may be equal in case-insensitive collations, NULL doesn't
+        # match lists, and joins of to-many relations duplicate rows
+        for search in ('name = "a" and name = "A"',
+                       'genre in (1, None) and genre = None',
+                       'id = 1 and rating = 2',
+                       'id = 1 or id != 2'):
+            self.assertEqual(search, self.optimize(search, [contradictions]))
+        self.assertEqual(
+            'book.id = 1 or book.id != 1',
+            self.optimize('book.id = 1 or book.id != 1', [contradictions],
+                          model=User),
+        )
+
+    def test_folding(self):
+        self.assertEqual(
+            'name = "b"',
+            self.optimize('(id = 1 and id = 2) or name = "b"',
+                          [contradictions]),
+        )
+        self.assertEqual(
+            '<nothing>',
+            self.optimize('(id = 1 or id != 1) and (id = 1 and id = 2)',
+                          [contradictions]),
+        )
+
+    def test_order_by_cost(self):
+        self.assertEqual(
+            'name = "a" and (id = 2 or id = 3) and author.email = "b" and '
+            'name ~ "c"',
+            self.optimize(
+                'name ~ "c" and author.email = "b" and name = "a" and '
+                '(id = 2 or id = 3)',
+                [order_by_cost],
+            ),
+        )
+
+    def test_report(self):
+        optimized, steps = explain(
+            parse('id = 1 or id = 2 or id = 1'),
+            DjangoQLSchema(Book),
+        )
+        self.assertEqual(
+            ['dedupe', 'merge_in'],
+            [step.rule for step in steps],
+        )
+        self.assertEqual(
+            'before: id = 1 or id = 2 or id = 1\n'
+            'dedupe: id = 1 or id = 2 or id = 1 => id = 1 or id = 2\n'
+            'merge_in: id = 1 or id = 2 => id in (1, 2)\n'
+            'after: id in (1, 2)',
+            report(parse('id = 1 or id = 2 or id = 1'), DjangoQLSchema(Book)),
+        )
+
+    @override_settings(DJANGOQL_OPTIMIZER_RULES=[
+        'dedupe',
+        'core.tests.test_optimizer.reverse_rule',
+    ])
+    def test_rules_setting(self):
+        self.assertEqual(
+            'name = "a" and id = 1',
+            self.optimize('id = 1 and name = "a" and id = 1', None),
+        )
+
+
+@override_settings(DJANGOQL_OPTIMIZE=True)
+class OptimizedSearchTest(TestCase):
+    def setUp(self):
+        alice = User.objects.create(username='alice', email='alice@a')
+        bob = User.objects.create(username='bob')
+        for i in range(6):
+            Book.objects.create(
+                name='book%s' % i,
+                author=alice if i % 2 else bob,
+                rating=i or None,
+                genre=i % 4 or None,
+            )
+
+    def ids(self, search):
+        qs = apply_search(Book.objects.all(), search, schema=GenreSchema)
+        return sorted(qs.values_list('id', flat=True))
+
+    def test_same_results(self):
+        searches = [
+            'id = 1 or id = 2 or id = 3 or name ~ "4"',
+            'rating != None and rating != None and rating != 3',
+            'rating != 1 and rating != 2 and genre != None',
+            'name = "book1" and name = "book2"',
+            'rating = None or rating != None',
+            'rating in (1, 2) or rating not in (2, 1)',
+            '(genre = "Drama" or genre = "Comics") and author.email = ""',
+            'author.email ~ "a" and (genre = "drama" or genre = None) and '
+            'id > 1',
+            'genre != "Drama" and genre != "Other" or rating > 4',
+            'id = 1 and (id = 2 or rating = None)',
+        ]
+        for search in searches:
+            with override_settings(DJANGOQL_OPTIMIZE=False):
+                expected = self.ids(search)
+            self.assertEqual(expected, self.ids(search), search)
+
+    def test_sql(self):
+        qs = Book.objects.djangoql('id = 1 or id = 2 or id = 3')
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        self.assertEqual('"core_book"."id" IN (1, 2, 3)', where_clause)
+        with self.assertNumQueries(0):
+            qs = Book.objects.djangoql('id = 1 and id = 2')
+            self.assertEqual([], list(qs))
+        qs = Book.objects.djangoql('rating = None or rating != None')
+        self.assertNotIn('WHERE', str(qs.query))
+        self.assertEqual(6, qs.count())
+
+    def test_truth(self):
+        self.assertEqual(Truth(False), Truth(0))
+        self.assertNotEqual(Truth(False), Truth(True))
+
+
+@override_settings(DJANGOQL_OPTIMIZE=True)
+class OptimizedToManySearchTest(TestCase):
+    # Comparisons of users and their books, which are a to-many relation
+    ATOMS = [
+        'book.name != "x"',
+        'book.name = "x"',
+        'book.name ~ "y"',
+        'book.price != 1.5',
+        'book.price < 1.5',
+        'book.price = None',
+        'book.rating != 4',
+        'book.rating in (1, 4)',
+        'book.rating not in (1, 4)',
+        'is_staff = True',
+        'is_staff in (False, True)',
+        'id > 3',
+    ]
+
+    def setUp(self):
+        books = [
+            [],
+            [('x', 1, 1)],
+            [('x', 1.5, 4), ('y', 3, 1)],
+            [('y', None, None)],
+            [('x', 3, 4), ('x', 1.5, 1)],
+            [('xy', 1.5, None)],
+            [('y', 1, 4), ('x', 3, None)],
+            [('z', 2, 2)],
+        ]
+        for i, user_books in enumerate(books):
+            user = User.objects.create(username='u%s' % i, is_staff=i % 3 == 0)
+            for name, price, rating in user_books:
+                Book.objects.create(
+                    name=name,
+                    author=user,
+                    price=None if price is None else Decimal(str(price)),
+                    rating=rating,
+                )
+
+    def usernames(self, search):
+        qs = apply_search(User.objects.all(), search)
+        return sorted(set(qs.values_list('username', flat=True)))
+
+    def assertSameResults(self, search):
+        with override_settings(DJANGOQL_OPTIMIZE=False):
+            expected = self.usernames(search)
+        self.assertEqual(expected, self.usernames(search), search)
+
+    def test_same_results(self):
+        searches = [
+            '((book.name != "x" or is_staff in (False, True)) and '
+            'book.price != 1.5 and is_staff = True) or book.price < 1.5',
+            'book.name ~ "y" and book.rating != 4 and id > 3',
+            'book.rating != 1 and book.rating != 4 or is_staff = True',
+            'book.name = "x" or book.name = "y" or book.price = None',
+        ]
+        for search in searches:
+            self.assertSameResults(search)
+
+    def test_fuzz(self):
+        rnd = random.Random(0)
+
+        def expression(depth):
+            if depth > 2 or rnd.random() < 0.3:
+                return rnd.choice(self.ATOMS)
+            operator = rnd.choice([' and ', ' or '])
+            return '(%s)' % operator.join(
+                expression(depth + 1) for _ in range(rnd.randint(2, 4))
+            )
+
+        for _ in range(200):
+            self.assertSameResults(expression(0))
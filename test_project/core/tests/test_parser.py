@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+import threading
+import types
 import unittest.util
+from decimal import Decimal
 from unittest import TestCase
 
+import djangoql
 from djangoql.ast import Expression, Name, Comparison, Logical, Const, List
 from djangoql.exceptions import DjangoQLParserError
-from djangoql.parser import DjangoQLParser
+from djangoql.parser import (
+    DjangoQLParser, get_parser, parse, parser_class, set_parser_class,
+)
+from djangoql.rdparser import DjangoQLRDParser
 
 
 # Show full contents in assertions when comparing long text strings
@@ -59,7 +69,11 @@ class DjangoQLParseTest(TestCase):
             self.parser.parse('pk > 5')
         )
         self.assertEqual(
-            Expression(Name('rating'), Comparison('<='), Const(523)),
+            Expression(
+                Name('rating'),
+                Comparison('<='),
+                Const(Decimal('523')),
+            ),
             self.parser.parse('rating <= 5.23e2')
         )
 
@@ -100,3 +114,122 @@ class DjangoQLParseTest(TestCase):
                        Const(5)),
             self.parser.parse('user.group.id = 5'),
         )
+
+
+class DjangoQLThreadedParseTest(TestCase):
+    queries = [
+        'age >= 18 and age <= 45',
+        '(city = "Ivanovo" and age <= 35) or (city = "Paris" and age <= 45)',
+        'married in (True, False) and smile != None',
+        'job.best.title > "none" or rating <= 5.23e2',
+        'name ~ "%s"' % ('x' * 200),
+    ]
+
+    def tearDown(self):
+        set_parser_class(parser_class)
+
+    def run_threads(self, threads_count=16, iterations=100):
+        expected = [DjangoQLParser().parse(q) for q in self.queries]
+        errors = []
+        parsers = []
+
+        def worker(offset):
+            try:
+                for i in range(iterations):
+                    n = (offset + i) % len(self.queries)
+                    ast = parse(self.queries[n])
+                    if ast != expected[n]:
+                        errors.append((self.queries[n], ast))
+                parsers.append(get_parser())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=worker, args=(i,))
+            for i in range(threads_count)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([], errors)
+        self.assertEqual(threads_count, len(set(map(id, parsers))))
+
+    def test_ply_parser(self):
+        set_parser_class(DjangoQLParser)
+        self.run_threads()
+
+    def test_rd_parser(self):
+        set_parser_class(DjangoQLRDParser)
+        self.run_threads()
+        self.assertIsInstance(get_parser(), DjangoQLRDParser)
+
+
+class DjangoQLParserStartupTest(TestCase):
+    def test_lazy_ply_import(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(
+            djangoql.__file__,
+        )))
+        output = subprocess.check_output([
+            sys.executable,
+            '-c',
+            'import sys; import djangoql.parser, djangoql.rdparser; '
+            'print("ply" in sys.modules)',
+        ], cwd=root)
+        self.assertEqual(b'False', output.strip())
+
+    def test_frozen_tables(self):
+        parsetab = os.path.join(
+            os.path.dirname(os.path.abspath(djangoql.__file__)),
+            'parsetab.py',
+        )
+        mtime = os.path.getmtime(parsetab)
+        parser = DjangoQLParser()
+        self.assertEqual(
+            DjangoQLParser(write_tables=False).parse('a = 1 or b in (2, 3)'),
+            parser.parse('a = 1 or b in (2, 3)'),
+        )
+        self.assertEqual(mtime, os.path.getmtime(parsetab))
+
+    def test_subclass_tables(self):
+        # Frozen tables of the base grammar must not be used for a subclass
+        # that changes it
+        class NotParser(DjangoQLParser):
+            def p_expression_not(self, p):
+                """
+                expression : NOT PAREN_L expression PAREN_R
+                """
+                p[0] = Expression(
+                    left=p[3],
+                    operator=Logical('and'),
+                    right=p[3],
+                )
+
+        ast = NotParser().parse('not (a = 1)')
+        self.assertEqual(Name('a'), ast.left.left)
+        self.assertRaises(
+            DjangoQLParserError,
+            DjangoQLParser().parse,
+            'not (a = 1)',
+        )
+
+    def test_tables_fallback(self):
+        # Tables of other PLY versions, or missing ones, are built instead
+        old_parsetab = types.ModuleType(str('djangoql_old_parsetab'))
+        old_parsetab._tabversion = '3.8'
+        sys.modules['djangoql_old_parsetab'] = old_parsetab
+        default_tabmodule = DjangoQLParser.tabmodule
+        try:
+            for tabmodule in ('djangoql_old_parsetab',
+                              'djangoql_missing_parsetab'):
+                DjangoQLParser.tabmodule = tabmodule
+                try:
+                    parser = DjangoQLParser()
+                finally:
+                    DjangoQLParser.tabmodule = default_tabmodule
+                self.assertEqual(
+                    parse('a = 1 or b in (2, 3)'),
+                    parser.parse('a = 1 or b in (2, 3)'),
+                )
+        finally:
+            del sys.modules['djangoql_old_parsetab']
@@ -1,30 +1,14 @@
 from django.contrib.auth.models import User
 from django.test import TestCase, override_settings
 
-from djangoql.queryset import apply_search
-from djangoql.schema import DjangoQLSchema, IntField
+from djangoql.parser import parse
+from djangoql.queryset import (
+    apply_search, build_filter, parse_cache, parse_search,
+)
+from djangoql.schema import DjangoQLSchema
 
 from ..models import Book
-
-
-class WrittenInYearField(IntField):
-    model = Book
-    name = 'written_in_year'
-
-    def get_lookup_name(self):
-        return 'written__year'
-
-
-class BookCustomSearchSchema(DjangoQLSchema):
-    suggest_options = {
-        Book: ['genre'],
-    }
-
-    def get_fields(self, model):
-        if model == Book:
-            return [
-                'genre', WrittenInYearField(),
-            ]
+from .schemas import BookCustomSearchSchema
 
 
 class DjangoQLQuerySetTest(TestCase):
@@ -75,6 +59,26 @@ class DjangoQLQuerySetTest(TestCase):
         )
         where_clause = str(qs.query).split('WHERE')[1].strip()
         self.assertEqual('"core_book"."genre" IN (1, 2)', where_clause)
+        qs = Book.objects.djangoql(
+            'genre in ("comics", "Drama", "COMICS")',
+            schema=BookCustomSearchSchema,
+        )
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        self.assertEqual('"core_book"."genre" IN (2, 1)', where_clause)
+
+    def test_in_list(self):
+        qs = Book.objects.djangoql('id in (3, 1, 2, 1, 3)')
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        self.assertEqual('"core_book"."id" IN (3, 1, 2)', where_clause)
+        with override_settings(DJANGOQL_SORT_LISTS=True):
+            qs = Book.objects.djangoql('id in (3, 1, 2, 1, 3)')
+            where_clause = str(qs.query).split('WHERE')[1].strip()
+            self.assertEqual('"core_book"."id" IN (1, 2, 3)', where_clause)
+            qs = Book.objects.djangoql('rating in (2, 1.5)')
+            self.assertIn('IN (1.5, 2.0)', str(qs.query))
+            # Lists with None are left unsorted
+            qs = Book.objects.djangoql('rating in (2, None, 1.5)')
+            self.assertIn('IN (2.0, None, 1.5)', str(qs.query))
 
     def test_custom_field_query(self):
         qs = Book.objects.djangoql(
@@ -85,3 +89,51 @@ class DjangoQLQuerySetTest(TestCase):
         self.assertTrue(
             where_clause.startswith('"core_book"."written" BETWEEN 2017-01-01')
         )
+
+    def test_parse_cache(self):
+        parse_cache.clear()
+        search = 'name = "foo" and is_published = True'
+        ast = parse_search(search)
+        self.assertIs(ast, parse_search(search))
+        self.assertEqual(1, parse_cache.hits)
+        self.assertEqual(1, parse_cache.misses)
+        Book.objects.djangoql(search)
+        self.assertEqual(2, parse_cache.hits)
+
+    def test_huge_queries(self):
+        terms = ['id = %s' % i for i in range(10000)]
+        query = ' or '.join(terms)
+        q = build_filter(parse(query), DjangoQLSchema(Book))
+        self.assertEqual('OR', q.connector)
+        self.assertEqual(10000, len(q.children))
+        # Django itself spends quadratic time adding children to WHERE
+        # clause, so SQL is checked with fewer terms
+        query = ' or '.join(terms[:2000])
+        sql = str(Book.objects.djangoql(query).query)
+        self.assertEqual(1999, sql.count(' OR '))
+
+        # Mixed operators with parenthesis
+        query = ' and '.join(
+            '(id = %s or name = "x%s")' % (i, i) for i in range(5000)
+        )
+        q = build_filter(parse(query), DjangoQLSchema(Book))
+        self.assertEqual('AND', q.connector)
+        self.assertEqual(5000, len(q.children))
+        self.assertEqual('OR', q.children[-1].connector)
+        self.assertEqual(
+            [('id', 4999), ('name', 'x4999')],
+            q.children[-1].children,
+        )
+
+    def test_flattened_filter_sql(self):
+        qs = Book.objects.djangoql(
+            '(name = "a" or name = "b") or '
+            '(name = "c" and (id = 1 and id = 2))'
+        )
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        self.assertEqual(
+            '("core_book"."name" = a OR "core_book"."name" = b OR '
+            '("core_book"."name" = c AND "core_book"."id" = 1 AND '
+            '"core_book"."id" = 2))',
+            where_clause,
+        )
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from djangoql.exceptions import DjangoQLSyntaxError
+from djangoql.parser import DjangoQLParser
+from djangoql.rdparser import DjangoQLRDParser, DjangoQLScanner
+
+from . import test_lexer, test_parser
+
+
+class DjangoQLScannerTest(test_lexer.DjangoQLLexerTest):
+    lexer = DjangoQLScanner()
+
+
+class DjangoQLRDParseTest(test_parser.DjangoQLParseTest):
+    parser = DjangoQLRDParser()
+
+
+class DjangoQLParserParityTest(TestCase):
+    ply_parser = DjangoQLParser()
+    rd_parser = DjangoQLRDParser()
+
+    samples = [
+        'a = 1',
+        'a.b.c != "x" and d > 5.5 or e in (1, 2.0, "3", None, True, False)',
+        'a=1 and b=2 or c=3',
+        '((a = 1) and (b = 2 or (c = 3)))',
+        'a not in ("x")',
+        'a ~ "\\u0041\\"b" and\n b !~ "\\\\"',
+        'rating <= 5.23e2 and price >= -0.5e+42',
+        u'name = "年年有余"',
+        'True_story = True and inspect = None',
+        'a.id = :uid and b in :ids or c ~ :_q1',
+        # bind placeholders
+        'a in (:b)',
+        'a = :',
+        'a = :1',
+        # syntax errors
+        '',
+        'a',
+        'a =',
+        'a = 1 b',
+        'a = 1 or',
+        'a = 1)',
+        '(a = 1',
+        '((a = 1)',
+        'a in ()',
+        'a in (1 2)',
+        'a in (1,',
+        'a in 1',
+        'a not = 1',
+        'a > True',
+        'a ~ 5',
+        'a = b',
+        '1 = 1',
+        'or.x = 1',
+        'a = 1 and\n  (b = "looooooooooooooooooooong string" c)',
+        'a = 1 and ) or b = 2',
+        # lexer errors
+        'a = "unterminated',
+        'a = 1 and b ^ 2',
+        'a..b = 1',
+        'a = 1\r\n and b = $',
+        'a = -',
+        'a = 1 b $',
+    ]
+
+    def parse(self, parser, text):
+        try:
+            return parser.parse(text)
+        except DjangoQLSyntaxError as e:
+            return type(e), str(e), e.value, e.line, e.column
+
+    def test_parity(self):
+        for text in self.samples:
+            self.assertEqual(
+                self.parse(self.ply_parser, text),
+                self.parse(self.rd_parser, text),
+                'Parsers disagree on %r' % text,
+            )
+
+    def test_long_chain(self):
+        text = ' or '.join(['a = %s' % i for i in range(5000)])
+        self.assertEqual(
+            self.ply_parser.parse(text).right.right.left,
+            self.rd_parser.parse(text).right.right.left,
+        )
+
+    def test_deep_nesting(self):
+        text = '(' * 2000 + 'a = 1' + ')' * 2000
+        self.assertEqual(
+            self.ply_parser.parse(text),
+            self.rd_parser.parse(text),
+        )
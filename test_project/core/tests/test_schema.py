@@ -1,12 +1,26 @@
+import threading
+from collections import OrderedDict
+
 from django.apps import apps
 from django.contrib.auth.models import Group, User
+from django.db.models.signals import class_prepared
 from django.test import TestCase
+from django.utils import translation
+from django.utils.functional import lazy
+from django.utils.translation import get_language
 
+from djangoql.ast import Name
+from djangoql.cache import options_cache
+from djangoql.compat import text_type
 from djangoql.exceptions import DjangoQLSchemaError
 from djangoql.parser import DjangoQLParser
-from djangoql.schema import DjangoQLSchema, IntField
+from djangoql.schema import (
+    Choices, DjangoQLField, DjangoQLSchema, IntField, LazyStrField,
+    RelationField, StrField, has_default_lookup, lazy_str_field_cls,
+)
 
 from ..models import Book
+from .schemas import AllOptionsSchema, RatingLabelField
 
 
 class ExcludeUserSchema(DjangoQLSchema):
@@ -45,6 +59,59 @@ class BookCustomSearchSchema(DjangoQLSchema):
             ]
 
 
+class UserStateSchema(DjangoQLSchema):
+    cache_introspection = False
+
+    def __init__(self, model, fields):
+        self.fields = fields
+        super(UserStateSchema, self).__init__(model)
+
+    def get_fields(self, model):
+        return self.fields
+
+
+class BookOptionsSchema(DjangoQLSchema):
+    suggest_options = {Book: ['genre']}
+
+
+class LazyBookSchema(DjangoQLSchema):
+    lazy_introspection = True
+
+    def get_fields(self, model):
+        self.introspected.append(self.model_label(model))
+        return super(LazyBookSchema, self).get_fields(model)
+
+    @property
+    def introspected(self):
+        return self.__dict__.setdefault('_introspected', [])
+
+
+class RecursiveSchema(DjangoQLSchema):
+    """
+    Former recursive implementation of introspection, for reference
+    """
+    cache_introspection = False
+
+    def introspect(self, model, exclude=()):
+        fields = OrderedDict()
+        result = OrderedDict([(self.model_label(model), fields)])
+        for field in self.get_fields(model):
+            if not isinstance(field, DjangoQLField):
+                field = self.get_field_instance(model, field)
+            if not field:
+                continue
+            if isinstance(field, RelationField):
+                if field.relation not in exclude:
+                    fields[field.name] = field
+                    result.update(self.introspect(
+                        model=field.related_model,
+                        exclude=tuple(exclude) + tuple(result.keys()),
+                    ))
+            else:
+                fields[field.name] = field
+        return result
+
+
 class DjangoQLSchemaTest(TestCase):
     def all_models(self):
         models = []
@@ -108,6 +175,22 @@ class DjangoQLSchemaTest(TestCase):
         self.assertEqual('auth.user', book_author_field['relation'])
         self.assertNotIn('book', models['auth.user'])
 
+    def test_introspection_order(self):
+        for exclude in ((), (Group,), (User,)):
+            for model in (Book, User, Group):
+                if model in exclude:
+                    continue
+                schema = type(str('Schema'), (DjangoQLSchema,), {
+                    'exclude': exclude,
+                })(model)
+                reference = type(str('Reference'), (RecursiveSchema,), {
+                    'exclude': exclude,
+                })(model)
+                self.assertEqual(
+                    [(k, list(v)) for k, v in reference.models.items()],
+                    [(k, list(v)) for k, v in schema.models.items()],
+                )
+
     def test_custom_search(self):
         custom = BookCustomSearchSchema(Book).as_dict()['models']['core.book']
         self.assertListEqual(list(custom.keys()), ['written_in_year'])
@@ -165,3 +248,348 @@ class DjangoQLSchemaTest(TestCase):
                 self.fail('This query should\'t pass validation: %s' % query)
             except DjangoQLSchemaError as e:
                 pass
+
+    def test_validation_list(self):
+        schema = DjangoQLSchema(Book)
+        ids = ', '.join(str(i) for i in range(50000))
+        schema.validate(DjangoQLParser().parse('id in (%s)' % ids))
+        schema.validate(DjangoQLParser().parse('rating in (1, 2.5, None)'))
+        ast = DjangoQLParser().parse(
+            'id in (1, "a", 2, None, "a", True, %s)' % ', '.join(
+                '"%s"' % i for i in range(12)
+            ),
+        )
+        with self.assertRaises(DjangoQLSchemaError) as cm:
+            schema.validate(ast)
+        self.assertEqual(15, len(cm.exception.value))
+        message = str(cm.exception)
+        self.assertTrue(message.startswith('Field "id" has "int" type'))
+        self.assertIn("Other invalid values: None, True, '0'", message)
+        self.assertTrue(message.endswith("'7' and 4 more"))
+        ast = DjangoQLParser().parse('written in ("2017-01-01", "2017-13-01")')
+        with self.assertRaises(DjangoQLSchemaError) as cm:
+            schema.validate(ast)
+        self.assertIn("'2017-13-01'", str(cm.exception))
+
+    def test_validation_huge_query(self):
+        query = ' or '.join('id = %s' % i for i in range(10000))
+        ast = DjangoQLParser().parse(query)
+        DjangoQLSchema(Book).validate(ast)
+        ast = DjangoQLParser().parse(query + ' or gav = 1')
+        self.assertRaises(
+            DjangoQLSchemaError,
+            DjangoQLSchema(Book).validate,
+            ast,
+        )
+
+
+class DjangoQLSchemaCacheTest(TestCase):
+    def setUp(self):
+        DjangoQLSchema.clear_cache()
+
+    def test_shared_between_instances(self):
+        schema = DjangoQLSchema(Book)
+        self.assertIs(schema.models, DjangoQLSchema(Book).models)
+        self.assertEqual(
+            schema.get_version(),
+            DjangoQLSchema(Book).get_version(),
+        )
+        self.assertIsNot(schema.models, DjangoQLSchema(User).models)
+
+    def test_key(self):
+        models = DjangoQLSchema(Book).models
+        for schema in (
+            ExcludeUserSchema(Book),
+            BookCustomFieldsSchema(Book),
+            BookOptionsSchema(Book),
+        ):
+            self.assertIsNot(models, schema.models)
+            self.assertIs(schema.models, schema.__class__(Book).models)
+        options_models = BookOptionsSchema(Book).models
+        self.assertTrue(options_models['core.book']['genre'].suggest_options)
+        self.assertFalse(models['core.book']['genre'].suggest_options)
+
+    def test_clear_cache(self):
+        models = DjangoQLSchema(Book).models
+        DjangoQLSchema.clear_cache()
+        self.assertIsNot(models, DjangoQLSchema(Book).models)
+        models = DjangoQLSchema(Book).models
+        # New models could be related to already introspected ones
+        class_prepared.send(sender=Book)
+        self.assertIsNot(models, DjangoQLSchema(Book).models)
+
+    def test_disabled(self):
+        first = UserStateSchema(Book, ['name'])
+        second = UserStateSchema(Book, ['id', 'name'])
+        self.assertEqual(['name'], list(first.models['core.book']))
+        self.assertEqual(['id', 'name'], list(second.models['core.book']))
+        self.assertNotEqual(first.get_version(), second.get_version())
+
+    def test_threads(self):
+        results = []
+
+        def introspect():
+            results.append(DjangoQLSchema(Book).models)
+
+        threads = [threading.Thread(target=introspect) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(8, len(results))
+        for models in results:
+            self.assertIs(results[0], models)
+
+
+class DjangoQLLazySchemaTest(TestCase):
+    def setUp(self):
+        DjangoQLSchema.clear_cache()
+
+    def test_resolve_name(self):
+        schema = LazyBookSchema(Book)
+        self.assertEqual('name', schema.resolve_name(Name('name')).name)
+        self.assertEqual(['core.book'], schema.introspected)
+        field = schema.resolve_name(Name(['author', 'username']))
+        self.assertEqual('username', field.name)
+        self.assertEqual(['core.book', 'auth.user'], schema.introspected)
+        # Field maps are memoized in class-level cache
+        schema = LazyBookSchema(Book)
+        schema.resolve_name(Name(['author', 'username']))
+        self.assertEqual([], schema.introspected)
+
+    def test_back_references(self):
+        schema = LazyBookSchema(Book)
+        field = schema.resolve_name(Name(['author', 'book', 'name']))
+        self.assertEqual('name', field.name)
+        self.assertRaises(
+            DjangoQLSchemaError,
+            DjangoQLSchema(Book).resolve_name,
+            Name(['author', 'book', 'name']),
+        )
+
+    def test_unknown_field(self):
+        self.assertEqual(
+            str(self.resolve_error(LazyBookSchema(Book), 'gav')),
+            str(self.resolve_error(DjangoQLSchema(Book), 'gav')),
+        )
+        self.assertIn(
+            'Possible choices are: book, date_joined',
+            str(self.resolve_error(LazyBookSchema(Book), 'author.gav')),
+        )
+
+    def test_as_dict(self):
+        lazy = LazyBookSchema(Book).as_dict()
+        eager = DjangoQLSchema(Book).as_dict()
+        self.assertEqual(sorted(eager['models']), sorted(lazy['models']))
+        self.assertIn('book', lazy['models']['auth.user'])
+
+    def test_validate(self):
+        schema = LazyBookSchema(Book)
+        schema.validate(DjangoQLParser().parse('author.username ~ "a"'))
+        self.assertRaises(
+            DjangoQLSchemaError,
+            schema.validate,
+            DjangoQLParser().parse('author.username = 1'),
+        )
+
+    def resolve_error(self, schema, name):
+        try:
+            schema.resolve_name(Name(name.split('.')))
+        except DjangoQLSchemaError as e:
+            return e
+
+
+class DjangoQLPathIndexTest(TestCase):
+    def setUp(self):
+        DjangoQLSchema.clear_cache()
+
+    def test_resolve_path(self):
+        schema = DjangoQLSchema(Book)
+        field, relations = schema.resolve_path(Name(['author', 'username']))
+        self.assertEqual('username', field.name)
+        self.assertEqual(['author'], [r.name for r in relations])
+        self.assertEqual(
+            (None, (schema.models['core.book']['author'],)),
+            schema.resolve_path(Name('author')),
+        )
+        self.assertEqual((schema.models['core.book']['name'], ()),
+                         schema.resolve_path(Name('name')))
+
+    def test_memoized(self):
+        name = Name(['author', 'groups', 'name'])
+        resolved = DjangoQLSchema(Book).resolve_path(name)
+        schema = DjangoQLSchema(Book)
+        schema.find_path = None  # must not be called
+        self.assertIs(resolved, schema.resolve_path(name))
+        self.assertIs(resolved[0], schema.resolve_name(name))
+
+    def test_errors(self):
+        name = Name(['author', 'gav'])
+        with self.assertRaises(DjangoQLSchemaError) as cm:
+            DjangoQLSchema(Book).resolve_name(name)
+        message = str(cm.exception)
+        self.assertTrue(message.startswith(
+            'Unknown field: gav. Possible choices are: date_joined, email,'
+        ))
+        schema = DjangoQLSchema(Book)
+        schema.find_path = None
+        with self.assertRaises(DjangoQLSchemaError) as cm:
+            schema.resolve_name(name)
+        self.assertEqual(message, str(cm.exception))
+
+    def test_disabled_cache(self):
+        first = UserStateSchema(Book, ['name'])
+        second = UserStateSchema(Book, ['id'])
+        self.assertEqual('name', first.resolve_name(Name('name')).name)
+        self.assertRaises(
+            DjangoQLSchemaError,
+            second.resolve_name,
+            Name('name'),
+        )
+
+
+class BookNameField(StrField):
+    model = Book
+    name = 'name'
+    suggest_options = True
+
+    def get_options(self):
+        return ['Foo', 'bar', 'Baz']
+
+
+class BookPrefixField(BookNameField):
+    def get_options(self):
+        return ['bar', 'Ba', 'baz']
+
+
+class DjangoQLSuggestionsTest(TestCase):
+    def setUp(self):
+        author = User.objects.create(username='author')
+        for name in ('b', 'a', 'ab', 'b', 'Ab', 'abc'):
+            Book.objects.create(name=name, author=author)
+
+    def test_database(self):
+        field = StrField(model=Book, name='name', suggest_options=True)
+        # Values of more books go first
+        self.assertEqual(
+            ['b', 'Ab', 'a', 'ab', 'abc'],
+            field.get_suggestions(),
+        )
+        self.assertEqual(['b'], field.get_suggestions('b'))
+        self.assertEqual(['abc'], field.get_suggestions('abc'))
+        self.assertEqual(['Ab', 'a'], field.get_suggestions(offset=1, limit=2))
+        self.assertEqual([], field.get_suggestions('x'))
+        # Prefixes are matched case-insensitively, and exact match goes first
+        self.assertEqual(['Ab', 'ab', 'abc'], field.get_suggestions('AB'))
+        self.assertEqual(['a', 'Ab', 'ab', 'abc'], field.get_suggestions('A'))
+
+    def test_choices(self):
+        schema = DjangoQLSchema(Book)
+        field = schema.resolve_name(Name('genre'))
+        self.assertEqual(['Comics'], field.get_suggestions('co'))
+        self.assertEqual(
+            ['Drama', 'Comics', 'Other'],
+            field.get_suggestions(),
+        )
+
+    def test_custom_options(self):
+        field = BookNameField()
+        self.assertEqual(['bar', 'Baz'], field.get_suggestions('B'))
+        self.assertEqual(['Baz'], field.get_suggestions('b', offset=1))
+        field = BookPrefixField()
+        self.assertEqual(['Ba', 'bar', 'baz'], field.get_suggestions('bA'))
+
+    def test_as_dict(self):
+        field = BookNameField()
+        self.assertEqual(['Foo', 'bar', 'Baz'], field.as_dict()['options'])
+        self.assertIs(True, field.as_dict(options=False)['options'])
+        field = StrField(model=Book, name='name')
+        self.assertEqual([], field.as_dict(options=False)['options'])
+
+
+class DjangoQLSchemaQueriesTest(TestCase):
+    def setUp(self):
+        options_cache.clear()
+
+    def test_construction_is_query_free(self):
+        with self.assertNumQueries(0):
+            schema = AllOptionsSchema(Book)
+            fields = schema.models['core.book']
+        # Types known from metadata
+        self.assertEqual('str', fields['genre'].type)
+        self.assertEqual('datetime', fields['written'].type)
+        self.assertEqual('float', fields['price'].type)
+        self.assertEqual('int', schema.models['auth.user']['id'].type)
+        # Custom options are checked on first use, once
+        rating = fields['rating']
+        self.assertIsInstance(rating, LazyStrField)
+        self.assertIsInstance(rating, RatingLabelField)
+        self.assertTrue(has_default_lookup(rating))
+        self.assertEqual('str', rating.type)
+        rating.validate('low')
+        self.assertRaises(DjangoQLSchemaError, rating.validate, 1)
+
+    def test_lazy_field_keeps_declared_type(self):
+        field = lazy_str_field_cls(IntField)(
+            model=Book,
+            name='rating',
+            suggest_options=True,
+        )
+        self.assertIs(type(field), lazy_str_field_cls(IntField))
+        with self.assertNumQueries(1):
+            self.assertEqual('int', field.type)
+            self.assertEqual('int', field.as_dict(options=False)['type'])
+        field.validate(5)
+        self.assertRaises(DjangoQLSchemaError, field.validate, 'low')
+
+
+class ChoicesTest(TestCase):
+    def test_field_choices(self):
+        field = StrField(model=Book, name='genre')
+        self.assertEqual(['Drama', 'Comics', 'Other'], field.get_options())
+        self.assertEqual(3, field.get_lookup_value('other'))
+        self.assertEqual([2], field.get_lookup_value(['Comics', 'Sci-fi']))
+
+    def test_grouped_choices(self):
+        choices = Choices([
+            ('EUR', 'Euro'),
+            ('Americas', [('USD', 'Dollar'), ('CAD', 'Canadian dollar')]),
+        ])
+        self.assertEqual(
+            ['Euro', 'Dollar', 'Canadian dollar'],
+            choices.labels(),
+        )
+        self.assertEqual('CAD', choices.get_code('canadian dollar'))
+
+    def test_get_code(self):
+        choices = Choices([
+            ('EUR', 'Euro'),
+            ('euro', 'euro'),
+            ('USD', 'Dollar'),
+        ])
+        self.assertEqual('EUR', choices.get_code('Euro'))
+        self.assertEqual('euro', choices.get_code('euro'))
+        self.assertEqual('USD', choices.get_code('DOLLAR'))
+        self.assertIsNone(choices.get_code('Pound'))
+        self.assertEqual('Euro', choices.get_label('EUR'))
+
+    def test_get_codes(self):
+        choices = Choices((str(i), 'Label %s' % i) for i in range(5000))
+        labels = ['label %s' % i for i in range(4999, -1, -2)]
+        codes = choices.get_codes(labels + labels + ['Unknown'])
+        self.assertEqual([str(i) for i in range(4999, -1, -2)], codes)
+
+    def test_lazy_labels(self):
+        def label():
+            return {'en': 'Money', 'de': 'Geld'}[get_language()]
+
+        lazy_label = lazy(label, text_type)()
+        choices = Choices([('EUR', lazy_label)])
+        self.assertEqual([lazy_label], choices.labels())
+        with translation.override('en'):
+            self.assertEqual('EUR', choices.get_code('money'))
+            self.assertIsNone(choices.get_code('Geld'))
+        with translation.override('de'):
+            self.assertEqual('EUR', choices.get_code('geld'))
+            self.assertIsNone(choices.get_code('Money'))
+            self.assertEqual('Geld', text_type(choices.get_label('EUR')))
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import json
+from unittest import TestCase
+
+from djangoql.parser import DjangoQLParser
+from djangoql.serializers import dumps, dumps_binary, loads, loads_binary
+
+
+class DjangoQLSerializersTest(TestCase):
+    parser = DjangoQLParser()
+
+    samples = [
+        'age >= 18',
+        u'name ~ "Contains a \\"quoted\\" str, 年年有余"',
+        'rating <= 5.23e2 and price > -0.5 and genre not in (1, 2.5, None)',
+        'is_published = True or is_published = False or written = None',
+        '(a = 1 or b = 2) or (c = 3 and (d = 4 or e = 5)) and f in ("x")',
+        'author.id = :uid and id not in :ids',
+    ]
+
+    def test_json(self):
+        for query in self.samples:
+            ast = self.parser.parse(query)
+            restored = loads(dumps(ast))
+            self.assertEqual(ast, restored)
+            self.assertEqual(str(ast), str(restored))
+
+    def test_binary(self):
+        for query in self.samples:
+            ast = self.parser.parse(query)
+            restored = loads_binary(dumps_binary(ast))
+            self.assertEqual(ast, restored)
+            self.assertEqual(str(ast), str(restored))
+
+    def test_flattened_chains(self):
+        ast = self.parser.parse(' or '.join(['a = %s' % i for i in range(5)]))
+        data = json.loads(dumps(ast))
+        self.assertEqual(2, data['v'])
+        self.assertEqual(
+            ['or', [['=', 'a', i] for i in range(5)]],
+            data['ast'],
+        )
+
+    def test_invalid_data(self):
+        for data in (
+            '{"v":999,"ast":["=","a",1]}',
+            # Written before bind placeholders were supported
+            '{"v":1,"ast":["=","a",1]}',
+            '{"v":2,"ast":["and",[["=","a",1]]]}',
+            '{"v":2,"ast":["is","a",1]}',
+            '{"v":2,"ast":["=","a",[[1]]]}',
+            '{"v":2,"ast":42}',
+        ):
+            self.assertRaises(ValueError, loads, data)
+        self.assertRaises(ValueError, loads_binary, b'garbage')
+        data = dumps_binary(self.parser.parse('a = 1'))
+        self.assertRaises(ValueError, loads_binary, data[:-3])
@@ -0,0 +1,212 @@
+from __future__ import unicode_literals
+
+from django.contrib import admin
+from django.contrib.auth.models import Group, User
+from django.test import RequestFactory, TestCase, override_settings
+
+from djangoql.compiler import compile_search
+from djangoql.parser import parse
+from djangoql.queryset import apply_search
+from djangoql.schema import DjangoQLSchema
+from djangoql.subqueries import needs_distinct
+
+from ..models import Book
+
+
+class ExistsSubqueriesTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        User.objects.create(username='carol')
+        for name, rating, author in (('war', 5, self.alice),
+                                     ('peace', 1, self.alice),
+                                     ('war2', 2, self.alice),
+                                     ('peace', 4, self.bob)):
+            Book.objects.create(name=name, rating=rating, author=author)
+        staff = Group.objects.create(name='staff')
+        admins = Group.objects.create(name='admins')
+        self.alice.groups.add(staff, admins)
+
+    def search(self, search, model=User):
+        return apply_search(model.objects.all(), search)
+
+    def usernames(self, search):
+        return sorted(u.username for u in self.search(search))
+
+    def assert_same_results(self, search):
+        with override_settings(DJANGOQL_EXISTS_SUBQUERIES=False):
+            expected = sorted(set(self.usernames(search)))
+        with override_settings(DJANGOQL_EXISTS_SUBQUERIES=True):
+            self.assertEqual(expected, self.usernames(search), search)
+
+    def test_results(self):
+        for search in ('book.name ~ "war"',
+                       'book.name = "peace" and book.rating > 3',
+                       'book.name = "war" or book.rating > 3',
+                       'book.name ~ "war" and (book.rating < 3 or id = 0)',
+                       '(book.name = "war" and book.rating > 3) or '
+                       'username = "carol"',
+                       'groups.name in ("staff", "admins")',
+                       'book.name ~ "war" and groups.name = "staff"',
+                       'book.name != "war" and book.rating = None',
+                       'book = None or groups = None'):
+            self.assert_same_results(search)
+
+    def test_mixed_chains(self):
+        u1 = User.objects.create(username='u1')
+        u2 = User.objects.create(username='u2')
+        for name, rating, author in (('x', 1, u1), ('y', 5, u1), ('x', 5, u2)):
+            Book.objects.create(name=name, rating=rating, author=author)
+        # Separate subqueries would match u1 with different books
+        search = 'book.name ~ "x" and (book.rating > 3 or id = 0)'
+        for optimize in (False, True):
+            with override_settings(DJANGOQL_OPTIMIZE=optimize):
+                for subqueries in (False, True):
+                    with override_settings(
+                        DJANGOQL_EXISTS_SUBQUERIES=subqueries,
+                    ):
+                        self.assertEqual(['u2'], self.usernames(search))
+                        plan = compile_search(User, search)
+                        self.assertEqual(['u2'], sorted(
+                            u.username
+                            for u in plan.apply(User.objects.all())
+                        ))
+        for search in ('book.name ~ "x" or book.rating = None',
+                       'book.name ~ "war" and (username = "alice" or '
+                       '(book.rating > 3 and id > 0))'):
+            results = []
+            for subqueries in (False, True):
+                with override_settings(DJANGOQL_EXISTS_SUBQUERIES=subqueries):
+                    results.append(sorted(set(self.usernames(search))))
+            self.assertEqual(results[0], results[1], search)
+        with override_settings(DJANGOQL_EXISTS_SUBQUERIES=True):
+            for search in ('book.name ~ "x" and (book.rating > 3 or id = 0)',
+                           'book.name ~ "x" or book.rating = None'):
+                sql = str(self.search(search).query)
+                self.assertNotIn('EXISTS', sql)
+                self.assertTrue(needs_distinct(parse(search),
+                                               DjangoQLSchema(User)))
+            # Other relations still get subqueries
+            sql = str(self.search(
+                'groups.name = "staff" and '
+                '(book.name ~ "x" and (book.rating > 3 or id = 0))',
+            ).query)
+            self.assertEqual(1, sql.count('EXISTS('))
+
+    def test_mixed_negations(self):
+        u1 = User.objects.create(username='u1')
+        u2 = User.objects.create(username='u2')
+        for price, rating, author in ((1.5, 4, u1), (3, 1, u1), (3, 1, u2)):
+            Book.objects.create(name='b', price=price, rating=rating,
+                                author=author)
+        for search in ('book.price in (1.5, 3.0) and book.rating != 4.0',
+                       'book.rating != 4.0 and book.price in (1.5, 3.0)',
+                       'book.price > 2 and book.rating not in (4.0, 5.0)',
+                       'book.price = 1.5 or book.name !~ "b"',
+                       'book.price < 2 and (book.rating != 4.0 or '
+                       'username = "u2")'):
+            results = []
+            for subqueries in (False, True):
+                with override_settings(DJANGOQL_EXISTS_SUBQUERIES=subqueries):
+                    plan = compile_search(User, search)
+                    results.append(sorted(set(self.usernames(search))))
+                    results.append(sorted(set(
+                        u.username for u in plan.apply(User.objects.all())
+                    )))
+            self.assertEqual([results[0]] * 4, results, search)
+        with override_settings(DJANGOQL_EXISTS_SUBQUERIES=True):
+            self.assertEqual(['u1', 'u2'], self.usernames(
+                'book.price in (1.5, 3.0) and book.rating != 4.0',
+            ))
+
+    @override_settings(DJANGOQL_EXISTS_SUBQUERIES=True)
+    def test_compiled(self):
+        plan = compile_search(
+            User,
+            '(book.name = "peace" and book.rating = :rating) or '
+            'username = "carol"',
+        )
+        for rating, expected in ((4, ['bob', 'carol']),
+                                 (1, ['alice', 'carol'])):
+            qs = plan.apply(User.objects.all(), {'rating': rating})
+            self.assertEqual(1, str(qs.query).count('EXISTS('))
+            self.assertEqual(expected, sorted(u.username for u in qs))
+        # Comparisons with None are JOINed, and so are others of the relation
+        qs = plan.apply(User.objects.all(), {'rating': None})
+        self.assertNotIn('EXISTS', str(qs.query))
+        self.assertEqual(['carol'], [u.username for u in qs])
+
+    @override_settings(DJANGOQL_EXISTS_SUBQUERIES=True)
+    def test_sql(self):
+        sql = str(self.search('book.name ~ "war"').query)
+        self.assertEqual(1, sql.count('EXISTS('))
+        self.assertNotIn('JOIN', sql)
+        self.assertIn(
+            'WHERE EXISTS(SELECT U0."id" FROM "core_book" U0 WHERE '
+            '(U0."name" LIKE %war% ESCAPE \'\\\' AND '
+            'U0."author_id" = ("auth_user"."id")))',
+            sql,
+        )
+        # Comparisons of the same relation share a subquery
+        sql = str(self.search(
+            'book.name = "peace" and username != "bob" and book.rating > 3',
+        ).query)
+        self.assertEqual(1, sql.count('EXISTS('))
+        self.assertEqual(
+            ['alice'],
+            [u.username for u in self.search(
+                'book.name = "peace" and (book.rating < 3 or id = 0)',
+            )],
+        )
+        # Relations after single-valued ones, and many-to-many relations
+        sql = str(self.search('author.groups.name = "staff"', Book).query)
+        self.assertIn('U1."user_id" = ("core_book"."author_id")', sql)
+        self.assertNotIn('JOIN "auth_user"', sql)
+        self.assertEqual(
+            ['peace', 'war', 'war2'],
+            sorted(b.name for b in self.search('author.groups.name ~ "s"',
+                                               Book)),
+        )
+        # Negations and comparisons with None are left to Django
+        sql = str(self.search('book.name != "war" or book.rating = None')
+                  .query)
+        self.assertNotIn('EXISTS', sql)
+
+    def test_needs_distinct(self):
+        schema = DjangoQLSchema(User)
+        for search, expected in (('book.name ~ "war"', True),
+                                 ('username = "a" or groups.name = "a"', True),
+                                 ('book.name != "war"', False),
+                                 ('book = None', False),
+                                 ('book.rating = None', True),
+                                 ('username = "bob"', False)):
+            self.assertEqual(
+                expected,
+                needs_distinct(parse(search), schema),
+                search,
+            )
+        with override_settings(DJANGOQL_EXISTS_SUBQUERIES=True):
+            self.assertFalse(needs_distinct(parse('book.name ~ "war"'),
+                                            schema))
+            self.assertTrue(needs_distinct(parse('book.rating = None'),
+                                           schema))
+
+    def test_admin_use_distinct(self):
+        model_admin = admin.site._registry[User]
+        request = RequestFactory().get('/', {'q-l': 'on'})
+        queryset = model_admin.get_queryset(request)
+        search = 'groups.name = "staff"'
+        results, use_distinct = model_admin.get_search_results(
+            request,
+            queryset,
+            search,
+        )
+        self.assertTrue(use_distinct)
+        with override_settings(DJANGOQL_EXISTS_SUBQUERIES=True):
+            results, use_distinct = model_admin.get_search_results(
+                request,
+                queryset,
+                search,
+            )
+            self.assertFalse(use_distinct)
+            self.assertEqual(['alice'], [u.username for u in results])